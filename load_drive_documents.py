@@ -14,6 +14,11 @@ local_path = os.path.join(os.getcwd(), "exports")
 if not os.path.exists(local_path):
     os.makedirs(local_path)
 
+# Drive metadata of every exported file (relative path -> id, mimeType, modifiedTime, drive_folder).
+# Saved next to the exports so the Qdrant ingestion can use it as payload.
+DRIVE_MANIFEST_FILE = "drive_manifest.json"
+drive_manifest = {}
+
 def get_service_account_credentials():
     """
     Create credentials using service account file
@@ -44,32 +49,66 @@ def sanitize_filename(filename):
     filename = (filename[:255]) if len(filename) > 255 else filename
     return filename
 
-def download_file(drive_service, file_id, file_name, local_folder_path, mime_type):
-    file_name = sanitize_filename(file_name)
+def save_drive_manifest():
+    """
+    Merge the collected Drive metadata into the manifest next to the exports
+    """
+    manifest_file = os.path.join(local_path, DRIVE_MANIFEST_FILE)
+    manifest = {}
+    if os.path.exists(manifest_file):
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    manifest.update(drive_manifest)
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
 
-    # Mapping for Google Drive document types to Microsoft Office formats
-    google_mime_map = {
-        'application/vnd.google-apps.document': ('application/vnd.openxmlformats-officedocument.wordprocessingml.document', '.docx'),
-        'application/vnd.google-apps.spreadsheet': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', '.xlsx'),
-        'application/vnd.google-apps.presentation': ('application/vnd.openxmlformats-officedocument.presentationml.presentation', '.pptx'),
-    }
+# Mapping for Google Drive document types to Microsoft Office formats
+google_mime_map = {
+    'application/vnd.google-apps.document': ('application/vnd.openxmlformats-officedocument.wordprocessingml.document', '.docx'),
+    'application/vnd.google-apps.spreadsheet': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', '.xlsx'),
+    'application/vnd.google-apps.presentation': ('application/vnd.openxmlformats-officedocument.presentationml.presentation', '.pptx'),
+}
+
+def get_file_extension(mime_type):
+    """
+    Extension the file will have once downloaded (Google Docs types are exported to Office formats)
+    """
+    if mime_type in google_mime_map:
+        return google_mime_map[mime_type][1]
+    # Handle existing Microsoft Office files and other types
+    if mime_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
+        return '.docx'
+    elif mime_type == 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet':
+        return '.xlsx'
+    elif mime_type == 'application/vnd.openxmlformats-officedocument.presentationml.presentation':
+        return '.pptx'
+    elif mime_type == 'text/markdown':
+        return '.md'
+    elif mime_type == 'text/plain':
+        return '.txt'
+    return '.' + mime_type.split('/')[-1].split(';')[0] if '/' in mime_type else '.bin'
 
+def build_media_request(drive_service, file_id, mime_type):
     # Check if the file is a Google Docs type and needs conversion
     if mime_type in google_mime_map:
-        mime_type_export, file_extension = google_mime_map[mime_type]
-        request = drive_service.files().export_media(fileId=file_id, mimeType=mime_type_export)
-    else:
-        # Handle existing Microsoft Office files and other types
-        if mime_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
-            file_extension = '.docx'
-        elif mime_type == 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet':
-            file_extension = '.xlsx'
-        elif mime_type == 'application/vnd.openxmlformats-officedocument.presentationml.presentation':
-            file_extension = '.pptx'
-        else:
-            file_extension = '.' + mime_type.split('/')[-1].split(';')[0] if '/' in mime_type else '.bin'
-        
-        request = drive_service.files().get_media(fileId=file_id)
+        mime_type_export = google_mime_map[mime_type][0]
+        return drive_service.files().export_media(fileId=file_id, mimeType=mime_type_export)
+    return drive_service.files().get_media(fileId=file_id)
+
+def fetch_file_bytes(drive_service, file_id, mime_type):
+    """
+    Download a file into memory and return its content
+    """
+    file_data = io.BytesIO()
+    downloader = MediaIoBaseDownload(file_data, build_media_request(drive_service, file_id, mime_type))
+    done = False
+    while not done:
+        status, done = downloader.next_chunk()
+    return file_data.getvalue()
+
+def download_file(drive_service, file_id, file_name, local_folder_path, mime_type, modified_time=None, drive_folder=None):
+    file_name = sanitize_filename(file_name)
+    file_extension = get_file_extension(mime_type)
     
     # Remove any existing extension from the file name
     file_name = os.path.splitext(file_name)[0]
@@ -80,20 +119,24 @@ def download_file(drive_service, file_id, file_name, local_folder_path, mime_typ
     file_path_with_extension = os.path.join(local_folder_path, file_name)
     os.makedirs(os.path.dirname(file_path_with_extension), exist_ok=True)
 
+    relative_path = os.path.relpath(file_path_with_extension, local_path).replace(os.sep, '/')
+    drive_manifest[relative_path] = {
+        "id": file_id,
+        "mimeType": mime_type,
+        "modifiedTime": modified_time,
+        "drive_folder": drive_folder,
+    }
+
     # Check if the file already exists locally
     if os.path.exists(file_path_with_extension):
         print(f"File already exists, skipping download: {file_path_with_extension}")
         return  # Skip download if file exists
 
     try:
-        file_data = io.BytesIO()
-        downloader = MediaIoBaseDownload(file_data, request)
-        done = False
-        while not done:
-            status, done = downloader.next_chunk()
+        file_data = fetch_file_bytes(drive_service, file_id, mime_type)
 
         with open(file_path_with_extension, 'wb') as f:
-            f.write(file_data.getvalue())
+            f.write(file_data)
         print(f"File saved: {file_path_with_extension}")
     except Exception as e:
         print(f"Failed to download {file_name}. Error: {str(e)}")
@@ -127,7 +170,7 @@ def detect_drive_type(drive_service, drive_id):
         else:
             return (None, None)
 
-def download_files_in_folder(drive_service, folder_id, local_folder_path, is_shared_drive=False, shared_drive_id=None):
+def download_files_in_folder(drive_service, folder_id, local_folder_path, is_shared_drive=False, shared_drive_id=None, drive_folder=""):
     """
     Download files from a folder, handling both shared drives and regular folders
     """
@@ -142,13 +185,13 @@ def download_files_in_folder(drive_service, folder_id, local_folder_path, is_sha
             driveId=shared_drive_id or folder_id,
             includeItemsFromAllDrives=True,
             supportsAllDrives=True,
-            fields="nextPageToken, files(id, name, mimeType)"
+            fields="nextPageToken, files(id, name, mimeType, modifiedTime)"
         ).execute()
     else:
         # Use regular folder parameters
         results = drive_service.files().list(
             q=query,
-            fields="nextPageToken, files(id, name, mimeType)"
+            fields="nextPageToken, files(id, name, mimeType, modifiedTime)"
         ).execute()
 
     items = results.get('files', [])
@@ -160,9 +203,105 @@ def download_files_in_folder(drive_service, folder_id, local_folder_path, is_sha
             new_folder_path = os.path.join(local_folder_path, sanitize_filename(file_name))
             if not os.path.exists(new_folder_path):
                 os.makedirs(new_folder_path)
-            download_files_in_folder(drive_service, file_id, new_folder_path, is_shared_drive, shared_drive_id)
+            subfolder = f"{drive_folder}/{file_name}" if drive_folder else file_name
+            download_files_in_folder(drive_service, file_id, new_folder_path, is_shared_drive, shared_drive_id, subfolder)
+        else:
+            download_file(drive_service, file_id, file_name, local_folder_path, mime_type,
+                          modified_time=item.get('modifiedTime'), drive_folder=drive_folder)
+
+def iter_drive_files(drive_service, folder_id, is_shared_drive=False, shared_drive_id=None, drive_folder="", relative_folder=""):
+    """
+    Yield every file below a folder (recursively) with its Drive metadata, following pagination.
+    Nothing is written to disk.
+    """
+    query = f"'{folder_id}' in parents and trashed=false"
+    page_token = None
+
+    while True:
+        if is_shared_drive:
+            results = drive_service.files().list(
+                q=query,
+                spaces='drive',
+                corpora='drive',
+                driveId=shared_drive_id or folder_id,
+                includeItemsFromAllDrives=True,
+                supportsAllDrives=True,
+                fields="nextPageToken, files(id, name, mimeType, modifiedTime)",
+                pageSize=1000,
+                pageToken=page_token
+            ).execute()
         else:
-            download_file(drive_service, file_id, file_name, local_folder_path, mime_type)
+            results = drive_service.files().list(
+                q=query,
+                fields="nextPageToken, files(id, name, mimeType, modifiedTime)",
+                pageSize=1000,
+                pageToken=page_token
+            ).execute()
+
+        for item in results.get('files', []):
+            if item['mimeType'] == 'application/vnd.google-apps.folder':
+                subfolder = f"{drive_folder}/{item['name']}" if drive_folder else item['name']
+                sub_relative = f"{relative_folder}/{sanitize_filename(item['name'])}" if relative_folder else sanitize_filename(item['name'])
+                yield from iter_drive_files(drive_service, item['id'], is_shared_drive, shared_drive_id, subfolder, sub_relative)
+            else:
+                file_name = os.path.splitext(sanitize_filename(item['name']))[0] + get_file_extension(item['mimeType'])
+                yield {
+                    "id": item['id'],
+                    "mimeType": item['mimeType'],
+                    "modifiedTime": item.get('modifiedTime'),
+                    "drive_folder": drive_folder,
+                    "relative_path": f"{relative_folder}/{file_name}" if relative_folder else file_name,
+                }
+
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+
+def stream_drive_to_qdrant(drive_id, pipeline_config=None):
+    """
+    Stream all files of a drive/folder into the Qdrant knowledge base without a local copy:
+    fetch -> extract/chunk -> embed -> upsert, each stage with its own workers and bounded queues
+    """
+    from scout.knowledge.dedup import NearDuplicateDetector
+    from scout.knowledge.pipeline import RemoteDocument, StreamingIngestPipeline
+    from scout.knowledge.store import KnowledgeBaseStore
+
+    creds = get_service_account_credentials()
+    drive_service = build('drive', 'v3', credentials=creds)
+
+    drive_type, drive_name = detect_drive_type(drive_service, drive_id)
+    if drive_type not in ('shared_drive', 'folder'):
+        print(f"❌ Could not access a drive/folder with ID: {drive_id}")
+        return None
+
+    print(f"📁 Detected {drive_type}: '{drive_name}'")
+    is_shared_drive = drive_type == 'shared_drive'
+    documents = (
+        RemoteDocument(
+            relative_path=item['relative_path'],
+            mime_type=item['mimeType'],
+            modified_time=item['modifiedTime'],
+            drive_folder=item['drive_folder'],
+            ref=item,
+        )
+        for item in iter_drive_files(
+            drive_service, drive_id, is_shared_drive,
+            shared_drive_id=drive_id if is_shared_drive else None,
+            drive_folder=drive_name
+        )
+    )
+
+    def fetcher_factory():
+        # httplib2 is not thread-safe: every fetch worker gets its own Drive service
+        worker_service = build('drive', 'v3', credentials=creds)
+        return lambda document: fetch_file_bytes(worker_service, document.ref['id'], document.ref['mimeType'])
+
+    store = KnowledgeBaseStore()
+    detector = NearDuplicateDetector.from_env(vector_size=store.embedder.vector_size)
+    pipeline = StreamingIngestPipeline(store, fetcher_factory, pipeline_config, detector)
+    stats = pipeline.run(documents)
+    print(f"📊 {stats.summary()}")
+    return stats
 
 def download_drive_files(drive_id):
     """
@@ -185,14 +324,15 @@ def download_drive_files(drive_id):
     
     if drive_type == 'shared_drive':
         print("   Using shared drive API parameters...")
-        download_files_in_folder(drive_service, drive_id, local_path, is_shared_drive=True, shared_drive_id=drive_id)
+        download_files_in_folder(drive_service, drive_id, local_path, is_shared_drive=True, shared_drive_id=drive_id, drive_folder=drive_name)
     elif drive_type == 'folder':
         print("   Using regular folder API parameters...")
-        download_files_in_folder(drive_service, drive_id, local_path, is_shared_drive=False)
+        download_files_in_folder(drive_service, drive_id, local_path, is_shared_drive=False, drive_folder=drive_name)
     else:
         print(f"❌ '{drive_name}' is a file, not a folder. Cannot download contents.")
         return False
     
+    save_drive_manifest()
     return True
     
 def build_complete_file_tree(drive_service, root_id, is_shared_drive=False, shared_drive_id=None, current_path=""):
@@ -762,7 +902,8 @@ if __name__ == "__main__":
     print("3. Build complete hierarchical tree structure")
     print("4. Build tree structure and download files")
     print("5. Load existing tree and visualize")
-    choice = input("Enter your choice (1-5): ").strip()
+    print("6. Stream files into the Qdrant knowledge base (no local copy)")
+    choice = input("Enter your choice (1-6): ").strip()
     
     if choice == "1":
         print(f"Downloading files to: {local_path}")
@@ -853,5 +994,12 @@ if __name__ == "__main__":
                         print("❌ Invalid selection")
                 except (ValueError, json.JSONDecodeError) as e:
                     print(f"❌ Error loading tree: {e}")
+    elif choice == "6":
+        print("Streaming files into Qdrant...")
+        stats = stream_drive_to_qdrant(drive_id)
+        if stats and not stats.errors:
+            print("✅ Indexing completed!")
+        else:
+            print("❌ Indexing finished with errors!")
     else:
-        print("Invalid choice. Please run the script again and select 1-5.")
\ No newline at end of file
+        print("Invalid choice. Please run the script again and select 1-6.")
\ No newline at end of file
@@ -0,0 +1,570 @@
+"""
+Checkpointer de LangGraph persistido en SQLite.
+
+MemorySaver guarda en memoria todos los checkpoints de todos los hilos mientras viva el
+proceso, y al reiniciar se pierden las conversaciones. SQLiteCheckpointSaver los guarda
+en disco con memoria acotada:
+
+- Caché LRU de los hilos activos: las lecturas de un turno no tocan el disco.
+- Escritura por lotes: los checkpoints de un turno se escriben en una sola transacción,
+  cada `flush_seconds` o al acumular `batch_size` cambios.
+- Solo se conservan los últimos `keep_last` checkpoints de cada hilo.
+- Los hilos sin actividad durante `ttl_seconds` se eliminan.
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.types import TASKS
+
+
+# Cada cuánto se buscan hilos inactivos como máximo
+EVICTION_INTERVAL_SECONDS = 300
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_last_access ON threads (last_access);
+"""
+
+
+@dataclass
+class CheckpointConfig:
+    """
+    Attributes:
+        backend: 'sqlite' o 'memory' (MemorySaver, sin persistencia).
+        path: Fichero SQLite.
+        keep_last: Checkpoints que se conservan por hilo (mínimo 2).
+        ttl_hours: Horas sin actividad tras las que se elimina un hilo; 0 lo desactiva.
+        cache_size: Hilos que se mantienen en la caché en memoria.
+        batch_size: Cambios pendientes que fuerzan una escritura en disco.
+        flush_seconds: Tiempo máximo que un cambio espera en memoria antes de escribirse.
+    """
+    backend: str = "sqlite"
+    path: str = "checkpoints/scout.sqlite"
+    keep_last: int = 10
+    ttl_hours: float = 72.0
+    cache_size: int = 128
+    batch_size: int = 32
+    flush_seconds: float = 1.0
+
+    @classmethod
+    def from_env(cls) -> "CheckpointConfig":
+        return cls(
+            backend=os.environ.get("CHECKPOINT_BACKEND", "sqlite").strip().lower(),
+            path=os.environ.get("CHECKPOINT_DB", "checkpoints/scout.sqlite"),
+            keep_last=int(os.environ.get("CHECKPOINT_KEEP_LAST", 10)),
+            ttl_hours=float(os.environ.get("CHECKPOINT_TTL_HOURS", 72)),
+            cache_size=int(os.environ.get("CHECKPOINT_CACHE_SIZE", 128)),
+            batch_size=int(os.environ.get("CHECKPOINT_BATCH_SIZE", 32)),
+            flush_seconds=float(os.environ.get("CHECKPOINT_FLUSH_SECONDS", 1.0)),
+        )
+
+
+@dataclass
+class _ThreadEntry:
+    """Checkpoints retenidos de un (thread_id, checkpoint_ns), serializados."""
+    # checkpoint_id -> (type, checkpoint, metadata_type, metadata, parent_checkpoint_id)
+    checkpoints: Dict[str, tuple] = field(default_factory=dict)
+    # checkpoint_id -> {(task_id, idx): (task_id, channel, type, value, task_path)}
+    writes: Dict[str, Dict[Tuple[str, int], tuple]] = field(default_factory=dict)
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[int]):
+    def __init__(
+            self,
+            path: str = "checkpoints/scout.sqlite",
+            keep_last: int = 10,
+            ttl_seconds: Optional[float] = None,
+            cache_size: int = 128,
+            batch_size: int = 32,
+            flush_seconds: float = 1.0,
+            serde=None,
+            ):
+        """
+        Args:
+            path: Fichero SQLite; se crea la carpeta si no existe.
+            keep_last: Checkpoints que se conservan por hilo.
+            ttl_seconds: Segundos sin actividad tras los que se elimina un hilo; None lo desactiva.
+            cache_size: Hilos que se mantienen en la caché LRU.
+            batch_size: Cambios pendientes que fuerzan una escritura en disco.
+            flush_seconds: Intervalo del hilo que escribe los cambios pendientes.
+            serde: Serializador de LangGraph; por defecto JsonPlusSerializer.
+        """
+        super().__init__(serde=serde)
+        # put_writes siempre apunta al último checkpoint y necesita el anterior para los `Send`
+        self.keep_last = max(2, keep_last)
+        self.ttl_seconds = ttl_seconds
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.executescript(SCHEMA)
+
+        self._lock = threading.RLock()
+        self._cache: "OrderedDict[Tuple[str, str], _ThreadEntry]" = OrderedDict()
+        self._dirty_checkpoints: set = set()
+        self._dirty_writes: set = set()
+        self._pruned: set = set()
+        self._accessed: Dict[str, float] = {}
+        self._last_eviction = time.time()
+
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_loop, args=(flush_seconds,), name="checkpoint-flush", daemon=True
+        )
+        self._flusher.start()
+        atexit.register(self.close)
+
+    # ---- caché --------------------------------------------------------------
+
+    def _entry(self, thread_id: str, checkpoint_ns: str) -> _ThreadEntry:
+        key = (thread_id, checkpoint_ns)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        entry = _ThreadEntry()
+        rows = self.conn.execute(
+            "SELECT checkpoint_id, type, checkpoint, metadata_type, metadata, parent_checkpoint_id "
+            "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT ?",
+            (thread_id, checkpoint_ns, self.keep_last),
+        ).fetchall()
+        for checkpoint_id, *saved in rows:
+            entry.checkpoints[checkpoint_id] = tuple(saved)
+            entry.writes[checkpoint_id] = {}
+        if rows:
+            for checkpoint_id, task_id, idx, channel, type_, value, task_path in self.conn.execute(
+                "SELECT checkpoint_id, task_id, idx, channel, type, value, task_path FROM writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id >= ?",
+                (thread_id, checkpoint_ns, rows[-1][0]),
+            ):
+                if checkpoint_id in entry.writes:
+                    entry.writes[checkpoint_id][(task_id, idx)] = (task_id, channel, type_, value, task_path)
+
+        if len(self._cache) >= self.cache_size:
+            # Lo que sale de la caché tiene que estar ya en disco
+            self._flush_locked()
+            self._cache.popitem(last=False)
+        self._cache[key] = entry
+        return entry
+
+    def _trim(self, thread_id: str, checkpoint_ns: str, entry: _ThreadEntry) -> None:
+        """Descarta de la caché los checkpoints más antiguos que `keep_last`."""
+        if len(entry.checkpoints) <= self.keep_last:
+            return
+        for checkpoint_id in sorted(entry.checkpoints)[:-self.keep_last]:
+            del entry.checkpoints[checkpoint_id]
+            for task_id, idx in entry.writes.pop(checkpoint_id, {}):
+                self._dirty_writes.discard((thread_id, checkpoint_ns, checkpoint_id, task_id, idx))
+            self._dirty_checkpoints.discard((thread_id, checkpoint_ns, checkpoint_id))
+        self._pruned.add((thread_id, checkpoint_ns))
+
+    def _build_tuple(
+            self,
+            thread_id: str,
+            checkpoint_ns: str,
+            checkpoint_id: str,
+            saved: tuple,
+            writes: Sequence[tuple],
+            parent_writes: Sequence[tuple],
+            ) -> CheckpointTuple:
+        type_, checkpoint, metadata_type, metadata, parent_checkpoint_id = saved
+        sends = [w for w in parent_writes if w[1] == TASKS]
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **self.serde.loads_typed((type_, checkpoint)),
+                "pending_sends": [self.serde.loads_typed((w[2], w[3])) for w in sends],
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            pending_writes=[(w[0], w[1], self.serde.loads_typed((w[2], w[3]))) for w in writes],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+        )
+
+    # ---- API de BaseCheckpointSaver ------------------------------------------
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self._lock:
+            entry = self._entry(thread_id, checkpoint_ns)
+            if not entry.checkpoints:
+                return None
+            checkpoint_id = get_checkpoint_id(config) or max(entry.checkpoints)
+            saved = entry.checkpoints.get(checkpoint_id)
+            if saved is None:
+                return None
+            self._accessed[thread_id] = time.time()
+            return self._build_tuple(
+                thread_id,
+                checkpoint_ns,
+                checkpoint_id,
+                saved,
+                list(entry.writes.get(checkpoint_id, {}).values()),
+                sorted(entry.writes.get(saved[4], {}).values(), key=lambda w: (w[4], w[0])),
+            )
+
+    def list(
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[Dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None,
+            ) -> Iterator[CheckpointTuple]:
+        with self._lock:
+            self._flush_locked()
+            where, params = [], []
+            if config is not None:
+                where.append("thread_id = ?")
+                params.append(config["configurable"]["thread_id"])
+                if "checkpoint_ns" in config["configurable"]:
+                    where.append("checkpoint_ns = ?")
+                    params.append(config["configurable"]["checkpoint_ns"])
+                if checkpoint_id := get_checkpoint_id(config):
+                    where.append("checkpoint_id = ?")
+                    params.append(checkpoint_id)
+            if before is not None and (before_id := get_checkpoint_id(before)):
+                where.append("checkpoint_id < ?")
+                params.append(before_id)
+            rows = self.conn.execute(
+                "SELECT thread_id, checkpoint_ns, checkpoint_id, type, checkpoint, metadata_type, metadata, "
+                "parent_checkpoint_id FROM checkpoints"
+                + (f" WHERE {' AND '.join(where)}" if where else "")
+                + " ORDER BY checkpoint_id DESC",
+                params,
+            ).fetchall()
+
+        for thread_id, checkpoint_ns, checkpoint_id, *saved in rows:
+            if filter:
+                metadata = self.serde.loads_typed((saved[2], saved[3]))
+                if not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            yield self._build_tuple(
+                thread_id,
+                checkpoint_ns,
+                checkpoint_id,
+                tuple(saved),
+                self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+                self._load_writes(thread_id, checkpoint_ns, saved[4]) if saved[4] else [],
+            )
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> List[tuple]:
+        with self._lock:
+            return self.conn.execute(
+                "SELECT task_id, channel, type, value, task_path FROM writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_path, task_id, idx",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            ).fetchall()
+
+    def put(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+            ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        c = checkpoint.copy()
+        c.pop("pending_sends", None)
+        type_, serialized = self.serde.dumps_typed(c)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self._lock:
+            entry = self._entry(thread_id, checkpoint_ns)
+            entry.checkpoints[checkpoint["id"]] = (
+                type_,
+                serialized,
+                metadata_type,
+                serialized_metadata,
+                config["configurable"].get("checkpoint_id"),
+            )
+            entry.writes.setdefault(checkpoint["id"], {})
+            self._dirty_checkpoints.add((thread_id, checkpoint_ns, checkpoint["id"]))
+            self._accessed[thread_id] = time.time()
+            self._trim(thread_id, checkpoint_ns, entry)
+            self._maybe_flush()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[Tuple[str, Any]],
+            task_id: str,
+            task_path: str = "",
+            ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self._lock:
+            entry = self._entry(thread_id, checkpoint_ns)
+            saved_writes = entry.writes.setdefault(checkpoint_id, {})
+            for idx, (channel, value) in enumerate(writes):
+                key = (task_id, WRITES_IDX_MAP.get(channel, idx))
+                # Las escrituras especiales (índice negativo) se sobrescriben, las normales no
+                if key[1] >= 0 and key in saved_writes:
+                    continue
+                saved_writes[key] = (task_id, channel, *self.serde.dumps_typed(value), task_path)
+                self._dirty_writes.add((thread_id, checkpoint_ns, checkpoint_id, *key))
+            self._maybe_flush()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            for key in [key for key in self._cache if key[0] == thread_id]:
+                del self._cache[key]
+            self._dirty_checkpoints = {k for k in self._dirty_checkpoints if k[0] != thread_id}
+            self._dirty_writes = {k for k in self._dirty_writes if k[0] != thread_id}
+            self._pruned = {k for k in self._pruned if k[0] != thread_id}
+            self._accessed.pop(thread_id, None)
+            with self.conn:
+                for table in ("checkpoints", "writes", "threads"):
+                    self.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    # La E/S de SQLite es local y corta; como en MemorySaver, las versiones async llaman a las síncronas
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[Dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None,
+            ) -> AsyncIterator[CheckpointTuple]:
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+            ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[Tuple[str, Any]],
+            task_id: str,
+            task_path: str = "",
+            ) -> None:
+        return self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return self.delete_thread(thread_id)
+
+    # ---- escritura en disco y retención -----------------------------------------
+
+    def _maybe_flush(self) -> None:
+        if len(self._dirty_checkpoints) + len(self._dirty_writes) >= self.batch_size:
+            self._flush_locked()
+
+    def _flush_loop(self, flush_seconds: float) -> None:
+        while not self._closed.wait(flush_seconds):
+            try:
+                self.flush()
+                if self.ttl_seconds and time.time() - self._last_eviction >= EVICTION_INTERVAL_SECONDS:
+                    self.evict_idle()
+            except sqlite3.Error as e:
+                print(f"Error guardando checkpoints: {e}")
+
+    def flush(self) -> None:
+        """Escribe en disco los cambios pendientes."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not (self._dirty_checkpoints or self._dirty_writes or self._accessed):
+            return
+        checkpoint_rows, write_rows = [], []
+        for thread_id, checkpoint_ns, checkpoint_id in self._dirty_checkpoints:
+            entry = self._cache.get((thread_id, checkpoint_ns))
+            if entry and checkpoint_id in entry.checkpoints:
+                type_, checkpoint, metadata_type, metadata, parent = entry.checkpoints[checkpoint_id]
+                checkpoint_rows.append(
+                    (thread_id, checkpoint_ns, checkpoint_id, parent, type_, checkpoint, metadata_type, metadata)
+                )
+        for thread_id, checkpoint_ns, checkpoint_id, task_id, idx in self._dirty_writes:
+            entry = self._cache.get((thread_id, checkpoint_ns))
+            saved = entry.writes.get(checkpoint_id, {}).get((task_id, idx)) if entry else None
+            if saved:
+                _, channel, type_, value, task_path = saved
+                write_rows.append(
+                    (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type_, value, task_path)
+                )
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, "
+                "parent_checkpoint_id, type, checkpoint, metadata_type, metadata) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                checkpoint_rows,
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, "
+                "channel, type, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                write_rows,
+            )
+            self.conn.executemany(
+                "INSERT INTO threads (thread_id, last_access) VALUES (?, ?) "
+                "ON CONFLICT (thread_id) DO UPDATE SET last_access = excluded.last_access",
+                list(self._accessed.items()),
+            )
+            for thread_id, checkpoint_ns in self._pruned:
+                self.conn.execute(
+                    "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ("
+                    "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT ?)",
+                    (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.keep_last),
+                )
+                self.conn.execute(
+                    "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ("
+                    "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?)",
+                    (thread_id, checkpoint_ns, thread_id, checkpoint_ns),
+                )
+
+        self._dirty_checkpoints.clear()
+        self._dirty_writes.clear()
+        self._pruned.clear()
+        self._accessed.clear()
+
+    def evict_idle(self, ttl_seconds: Optional[float] = None) -> int:
+        """
+        Elimina los hilos sin actividad durante `ttl_seconds`.
+
+        Returns:
+            El número de hilos eliminados.
+        """
+        ttl_seconds = ttl_seconds or self.ttl_seconds
+        if not ttl_seconds:
+            return 0
+        with self._lock:
+            self._flush_locked()
+            self._last_eviction = time.time()
+            idle = [
+                row[0]
+                for row in self.conn.execute(
+                    "SELECT thread_id FROM threads WHERE last_access < ?", (time.time() - ttl_seconds,)
+                )
+            ]
+            for thread_id in idle:
+                self.delete_thread(thread_id)
+        return len(idle)
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        with self._lock:
+            self._flush_locked()
+            self.conn.close()
+
+
+_savers: Dict[str, SQLiteCheckpointSaver] = {}
+
+
+def build_checkpointer(config: Optional[CheckpointConfig] = None) -> BaseCheckpointSaver:
+    """
+    Crea el checkpointer configurado.
+
+    Los grafos del mismo proceso (p. ej. una sesión de Streamlit por usuario) comparten
+    el mismo SQLiteCheckpointSaver para cada fichero, y con él la caché y los límites.
+    """
+    config = config or CheckpointConfig.from_env()
+    if config.backend == "memory":
+        return MemorySaver()
+    if config.backend != "sqlite":
+        raise ValueError(f"CHECKPOINT_BACKEND no soportado: {config.backend}")
+
+    path = str(Path(config.path).resolve())
+    if path not in _savers:
+        _savers[path] = SQLiteCheckpointSaver(
+            path=path,
+            keep_last=config.keep_last,
+            ttl_seconds=config.ttl_hours * 3600 if config.ttl_hours > 0 else None,
+            cache_size=config.cache_size,
+            batch_size=config.batch_size,
+            flush_seconds=config.flush_seconds,
+        )
+    return _savers[path]
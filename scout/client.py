@@ -6,12 +6,13 @@ Este cliente es análogo a Cursor o Claude Desktop y lo configurarías de la mis
 especificando la configuración del servidor MCP en my_mcp/mcp_config.json.
 """
 
-from langchain_mcp_adapters.client import MultiServerMCPClient
 from langgraph.graph import StateGraph
 from langchain_core.messages import HumanMessage, AIMessageChunk
 from typing import AsyncGenerator
-from scout.my_mcp.config import mcp_config
+from scout.my_mcp.config import mcp_config, mcp_server_options
 from scout.graph import build_agent_graph, AgentState
+from scout.mcp_pool import load_tools
+from scout.tracing import trace
 import os
 import asyncio
 from pathlib import Path
@@ -63,15 +64,12 @@ async def main():
     """
     Inicializa el cliente MCP y ejecuta el bucle de conversación del agente.
 
-    El MultiServerMCPClient permite la conexión a múltiples servidores MCP usando un solo cliente y configuración.
+    Las herramientas usan una sesión persistente por servidor MCP (scout/mcp_pool.py).
     """
-    # Crear el cliente sin usarlo como administrador de contexto
-    cliente = MultiServerMCPClient(
-        connections=mcp_config
-    )
-    
-    # Obtener herramientas usando el nuevo método asíncrono
-    herramientas = await cliente.get_tools()
+    # Obtener herramientas; cada servidor se arranca una vez y su sesión se reutiliza
+    with trace("get_tools") as span:
+        herramientas = await load_tools(mcp_config, server_options=mcp_server_options)
+        span["tools"] = len(herramientas)
     grafo = build_agent_graph(tools=herramientas)
 
     # pasar una configuración con thread_id para usar memoria
@@ -85,7 +83,7 @@ async def main():
     print("=" * 50)
     # print("Comandos disponibles:")
     # print("  /cargar     - Cargar documentos desde la carpeta data a Qdrant")
-    # print("  /buscar     - Buscar documentos en Qdrant")
+    print("  /buscar      - Buscar documentos en la base de conocimiento")
     # print("  /ayuda       - Mostrar este mensaje de ayuda")
     print("  salir/exit   - Salir del programa")
     print("  O simplemente escribe tu pregunta para conversar con el asistente")
@@ -99,12 +97,16 @@ async def main():
         elif entrada_usuario == "/ayuda":
             print("\n Ayuda:")
             # print("  /cargar     - Cargar todos los documentos desde la carpeta 'data' a la base de datos vectorial Qdrant")
-            # print("  /buscar     - Buscar información en los documentos cargados")
+            print("  /buscar <consulta> - Buscar información en los documentos cargados")
             print("  salir/exit   - Salir del programa")
             print("  O escribe cualquier pregunta para conversar con el asistente de IA")
             continue
         
-        elif entrada_usuario.startswith("/"):
+        elif entrada_usuario == "/buscar":
+            print("Uso: /buscar <consulta>")
+            continue
+
+        elif entrada_usuario.startswith("/") and not entrada_usuario.startswith("/buscar "):
             print("Comando desconocido. Escribe /ayuda para ver los comandos disponibles.")
             continue
 
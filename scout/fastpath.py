@@ -0,0 +1,251 @@
+"""
+Atajos del grafo para peticiones que no necesitan a Gemini.
+
+Una operación aritmética o un "/buscar" directo cuestan dos llamadas completas al LLM:
+una para elegir la herramienta y otra para redactar el resultado. El nodo `fastpath`,
+antes de `scout`, detecta estas intenciones con reglas (y opcionalmente con un
+clasificador por embeddings) y responde con una plantilla:
+
+- Aritmética: se evalúa la expresión con las mismas operaciones que el servidor
+  `math_mcp`, sin ida y vuelta por stdio.
+- Búsqueda: se consulta directamente la base de conocimiento.
+
+Todo lo demás sigue hacia `scout`.
+"""
+
+import ast
+import operator
+import os
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END
+
+from scout.knowledge.embeddings import Embedder
+from scout.llm_cache import ReplayChatModel
+
+
+SEARCH_COMMAND = "/buscar"
+# Prompt con el que Streamlit envía al LLM un "/buscar <consulta>"
+SEARCH_PROMPT = "Busca en la base de datos vectorial Qdrant en la colección 'knowledge_base' información relacionada con: {query}"
+
+MATH_PREFIXES = ("cuanto es", "cuánto es", "cuanto da", "cuánto da", "calcula", "calcular", "resuelve", "what is", "compute")
+MATH_WORDS = [
+    (r"multiplicado por", "*"),
+    (r"dividido (?:entre|por)", "/"),
+    (r"más|mas|plus", "+"),
+    (r"menos|minus", "-"),
+    (r"por|times", "*"),
+    (r"entre", "/"),
+]
+# Textos con números que no son aritmética: "1.500" es mil quinientos en es-CO y
+# "2024-10-19" o "19/10/2024" son fechas; esas peticiones van al LLM
+AMBIGUOUS_NUMBERS = [
+    re.compile(r"(?<![\d.,])[1-9]\d{0,2}(?:[.,]\d{3})+(?![\d.,])"),
+    re.compile(r"(?<![\d/-])\d{4}-\d{1,2}-\d{1,2}(?![\d/-])"),
+    re.compile(r"(?<![\d/-])\d{1,2}([/-])\d{1,2}\1\d{2,4}(?![\d/-])"),
+]
+OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+# Ejemplos del clasificador de intención; "search" va a la base de conocimiento, "other" al LLM
+INTENT_EXAMPLES = {
+    "search": [
+        "busca información sobre la política de vacaciones",
+        "buscar en la base de conocimiento el procedimiento de nómina",
+        "encuentra documentos sobre clientes B2B",
+        "qué dicen los documentos sobre las horas extra",
+        "muéstrame el manual de facturación",
+    ],
+    "other": [
+        "hola, qué tal",
+        "crea un nuevo proyecto de análisis",
+        "carga los datos del archivo csv",
+        "haz un commit con los cambios",
+        "entrena un modelo de regresión con estos datos",
+        "genera un gráfico de ventas por mes",
+    ],
+}
+
+
+@dataclass
+class FastPathConfig:
+    """
+    Attributes:
+        enabled: Si es False todas las peticiones van al LLM.
+        math: Atajo de aritmética.
+        search: Atajo de "/buscar".
+        classifier: Detecta también peticiones de búsqueda en lenguaje natural.
+        classifier_threshold: Similitud mínima con un ejemplo de búsqueda.
+        search_limit: Resultados de la búsqueda directa.
+    """
+    enabled: bool = True
+    math: bool = True
+    search: bool = True
+    classifier: bool = False
+    classifier_threshold: float = 0.8
+    search_limit: int = 5
+
+    @classmethod
+    def from_env(cls) -> "FastPathConfig":
+        def flag(name: str, default: str) -> bool:
+            return os.environ.get(name, default).strip().lower() in ("1", "true", "yes")
+
+        return cls(
+            enabled=flag("FASTPATH_ENABLED", "true"),
+            math=flag("FASTPATH_MATH", "true"),
+            search=flag("FASTPATH_SEARCH", "true"),
+            classifier=flag("FASTPATH_CLASSIFIER", "false"),
+            classifier_threshold=float(os.environ.get("FASTPATH_CLASSIFIER_THRESHOLD", 0.8)),
+            search_limit=int(os.environ.get("FASTPATH_SEARCH_LIMIT", 5)),
+        )
+
+
+def parse_arithmetic(text: str) -> Optional[str]:
+    """Devuelve la expresión si el mensaje es solo una operación aritmética, p. ej. '¿cuánto es 7 por 8?'."""
+    expression = text.strip().lower().strip("¿?¡!.= ")
+    for prefix in MATH_PREFIXES:
+        if expression.startswith(prefix):
+            expression = expression[len(prefix):]
+            break
+    if any(pattern.search(expression) for pattern in AMBIGUOUS_NUMBERS):
+        return None
+    for pattern, symbol in MATH_WORDS:
+        expression = re.sub(rf"(?<=[\d\s)])(?:{pattern})(?=[\s\d(])", f" {symbol} ", expression)
+    expression = re.sub(r"(?<=[\d)])\s*[x×]\s*(?=[\d(])", " * ", expression)
+    expression = expression.replace("÷", "/")
+    expression = re.sub(r"(?<=\d),(?=\d)", ".", expression)
+    expression = expression.strip(" =?")
+    if not re.fullmatch(r"[\d\s.+\-*/()]+", expression) or not re.search(r"\d\s*[+\-*/]\s*[\d(-]", expression):
+        return None
+    return " ".join(expression.split())
+
+
+def evaluate_arithmetic(expression: str) -> float:
+    """Evalúa una expresión con + - * / y paréntesis sin usar eval."""
+    def visit(node):
+        if isinstance(node, ast.Expression):
+            return visit(node.body)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return node.value
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            value = visit(node.operand)
+            return -value if isinstance(node.op, ast.USub) else value
+        if isinstance(node, ast.BinOp) and type(node.op) in OPERATORS:
+            return OPERATORS[type(node.op)](visit(node.left), visit(node.right))
+        raise ValueError(f"Operación no soportada: {ast.dump(node)}")
+
+    return visit(ast.parse(expression, mode="eval"))
+
+
+def format_number(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return f"{value:.10g}"
+
+
+def parse_search(text: str) -> Optional[str]:
+    """Consulta de un "/buscar <consulta>", también en la forma en que lo reescribe Streamlit."""
+    text = text.strip()
+    if text.startswith(SEARCH_COMMAND + " "):
+        return text[len(SEARCH_COMMAND):].strip() or None
+    prefix = SEARCH_PROMPT.split("{query}")[0]
+    if text.startswith(prefix):
+        return text[len(prefix):].strip() or None
+    return None
+
+
+class IntentClassifier:
+    """Clasificador por vecino más cercano sobre los ejemplos de INTENT_EXAMPLES."""
+
+    def __init__(self, embedder: Embedder, examples: Dict[str, List[str]] = INTENT_EXAMPLES):
+        self.embedder = embedder
+        self.labels = [label for label, texts in examples.items() for _ in texts]
+        vectors = np.asarray(embedder.embed_documents([t for texts in examples.values() for t in texts]), dtype=np.float32)
+        self.matrix = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        vector = np.asarray(self.embedder.embed_query(text), dtype=np.float32)
+        scores = self.matrix @ (vector / max(float(np.linalg.norm(vector)), 1e-12))
+        best = int(np.argmax(scores))
+        return self.labels[best], float(scores[best])
+
+
+def build_fastpath_node(config: FastPathConfig, embedder: Optional[Embedder] = None) -> Callable:
+    """
+    Crea el nodo `fastpath`. Devuelve un estado con `fastpath_handled=True` y la respuesta si
+    ha atendido la petición; si no, `fastpath_handled=False` y la petición sigue hacia `scout`.
+    """
+    resources = {}
+
+    def get_store():
+        if "store" not in resources:
+            from scout.knowledge.store import KnowledgeBaseStore
+
+            resources["store"] = KnowledgeBaseStore(embedder=embedder)
+        return resources["store"]
+
+    def get_classifier():
+        if "classifier" not in resources:
+            resources["classifier"] = IntentClassifier(embedder or Embedder())
+        return resources["classifier"]
+
+    def answer(text: str, intent: str) -> dict:
+        # Se emite por fragmentos para que el cliente la muestre igual que una respuesta del LLM
+        response = ReplayChatModel(response=AIMessage(content=text), cache_tier=f"fastpath:{intent}").invoke([])
+        return {"messages": [response], "fastpath_handled": True}
+
+    def search(query: str) -> dict:
+        from scout.knowledge.retrieval import format_sections
+
+        sections = get_store().search_sections(query, limit=config.search_limit)
+        if not sections:
+            return answer(f"No encontré resultados en la base de conocimiento para «{query}».", "search")
+        return answer(f"Resultados en la base de conocimiento para «{query}»:\n\n{format_sections(sections)}", "search")
+
+    def fastpath(state) -> dict:
+        if not config.enabled or not state.messages or not isinstance(state.messages[-1], HumanMessage):
+            return {"fastpath_handled": False}
+        text = str(state.messages[-1].content)
+
+        if config.math and (expression := parse_arithmetic(text)):
+            try:
+                result = format_number(evaluate_arithmetic(expression))
+            except ZeroDivisionError:
+                result = "Error: división por cero"
+            except (ValueError, SyntaxError):
+                result = None
+            if result is not None:
+                return answer(f"{expression} = {result}", "math")
+
+        if config.search:
+            query = parse_search(text)
+            if query is None and config.classifier:
+                try:
+                    intent, score = get_classifier().classify(text)
+                except Exception as e:
+                    print(f"No se pudo clasificar la intención: {e}")
+                else:
+                    if intent == "search" and score >= config.classifier_threshold:
+                        query = text
+            if query:
+                try:
+                    return search(query)
+                except Exception as e:
+                    # Sin Qdrant el LLM sigue pudiendo atender la petición con sus herramientas
+                    print(f"Búsqueda directa fallida, se usa el LLM: {e}")
+
+        return {"fastpath_handled": False}
+
+    return fastpath
+
+
+def route_fastpath(state) -> str:
+    return END if state.fastpath_handled else "scout"
@@ -1,19 +1,53 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langgraph.graph import StateGraph, add_messages, START
-from langchain_core.messages import SystemMessage
+from langgraph.graph import StateGraph, add_messages, START, END
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
 from pydantic import BaseModel
 from typing import List, Annotated
 from langgraph.prebuilt import ToolNode, tools_condition
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langchain.tools import BaseTool
+from scout.checkpoint import build_checkpointer
+from scout.fastpath import FastPathConfig, build_fastpath_node, route_fastpath
+from scout.history import HistoryConfig, build_history_node, keep_summary, summary_prompt
+from scout.llm_cache import ReplayChatModel, ResponseCache, build_response_cache
+from scout.llm_replay import LLMModeConfig, LLMRecorder, RecordedChatModel
+from scout.prefetch import PrefetchConfig, Prefetcher
+from scout.tool_exec import ToolExecutionConfig, ToolExecutor, tool_aliases
+from scout.tracing import Tracer, TracingCallbackHandler, get_tracer
+from scout.tool_output import (
+    READ_TOOL_NAME,
+    ToolOutputConfig,
+    build_compact_node,
+    build_read_tool,
+    build_tool_output_store,
+)
+from scout.tool_router import ToolRouter, ToolRouterConfig
+from typing import Optional, Tuple
+from dataclasses import replace
+from functools import lru_cache
 import os
 
 
 class AgentState(BaseModel):
     messages: Annotated[List, add_messages]
-
-
-def build_agent_graph(tools: List[BaseTool] = []):
+    summary: Annotated[str, keep_summary] = ""
+    fastpath_handled: bool = False
+
+
+def build_agent_graph(
+        tools: List[BaseTool] = [],
+        history_config: Optional[HistoryConfig] = None,
+        checkpointer: Optional[BaseCheckpointSaver] = None,
+        tool_router_config: Optional[ToolRouterConfig] = None,
+        response_cache: Optional[ResponseCache] = None,
+        llm_config: Optional[LLMModeConfig] = None,
+        tracer: Optional[Tracer] = None,
+        fastpath_config: Optional[FastPathConfig] = None,
+        prefetch_config: Optional[PrefetchConfig] = None,
+        tool_output_config: Optional[ToolOutputConfig] = None,
+        tool_execution_config: Optional[ToolExecutionConfig] = None,
+        ):
 
     system_prompt = """
 Your name is B2Bot and you are an expert data scientist. You help customers manage their data science projects by leveraging the tools available to you. Your goal is to collaborate with the customer in incrementally building their analysis or data modeling project. Version control is a critical aspect of this project, so you must use the git tools to manage the project's version history and maintain a clean, easy to understand commit history.
@@ -64,39 +98,135 @@ main.py should only be used to implement permanent changes to the data - to be c
 Assist the customer in all aspects of their data science workflow.
 """
 
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        temperature=0.1,
-        max_output_tokens=8192,
-        google_api_key=os.environ.get("GOOGLE_API_KEY")
-    )
-    if tools:
-        llm = llm.bind_tools(tools)
+    llm_config = llm_config or LLMModeConfig.from_env()
+    if llm_config.mode == "replay":
+        llm = RecordedChatModel.from_config(llm_config)
+    else:
+        llm = ChatGoogleGenerativeAI(
+            model="gemini-2.5-flash",
+            temperature=0.1,
+            max_output_tokens=8192,
+            google_api_key=os.environ.get("GOOGLE_API_KEY"),
+            callbacks=[LLMRecorder(llm_config.path)] if llm_config.mode == "record" else None,
+        )
+    tool_router_config = tool_router_config or ToolRouterConfig.from_env()
+    tool_output_config = tool_output_config or ToolOutputConfig.from_env()
+    if tools and tool_output_config.enabled:
+        # large tool outputs are replaced by a preview; the model pages through the rest
+        tool_output_store = build_tool_output_store(tool_output_config)
+        tools = list(tools) + [build_read_tool(tool_output_store, tool_output_config)]
+        tool_router_config = replace(
+            tool_router_config,
+            always_include=list(tool_router_config.always_include) + [READ_TOOL_NAME],
+        )
+    router = ToolRouter(tools, tool_router_config) if tools else None
+    tools_by_name = {tool.name: tool for tool in tools}
+
+    @lru_cache(maxsize=tool_router_config.cache_size)
+    def bind(tool_names: Tuple[str, ...]):
+        # bound llm and system prompt for a tool selection, cached by its signature
+        if not tool_names:
+            return llm, system_prompt
+        selected = [tools_by_name[name] for name in tool_names]
         #inject tools into system prompt
-        tools_json = [tool.model_dump_json(include=["name", "description"]) for tool in tools]
-        system_prompt = system_prompt.format(
-            tools="\n".join(tools_json), 
+        tools_json = [tool.model_dump_json(include=["name", "description"]) for tool in selected]
+        return llm.bind_tools(selected), system_prompt.format(
+            tools="\n".join(tools_json),
             working_dir=os.environ.get("MCP_FILESYSTEM_DIR")
             )
 
-    def assistant(state: AgentState) -> AgentState:
-        response = llm.invoke([SystemMessage(content=system_prompt)] + state.messages)
+    prefetch_config = prefetch_config or PrefetchConfig.from_env()
+    prefetcher = None
+    # bound name of the retrieval tool; in host mode it may carry a server prefix
+    prefetch_tool = next((tool.name for tool in tools if prefetch_config.tool_name in tool_aliases(tool)), None)
+    if prefetch_config.enabled and prefetch_tool is not None:
+        prefetcher = Prefetcher(prefetch_config, embedder=router.embedder if router else None)
+
+    if response_cache is None:
+        response_cache = build_response_cache()
+    model_context = f"{getattr(llm, 'model', type(llm).__name__)}|{getattr(llm, 'temperature', '')}"
+
+    def assistant(state: AgentState, config: RunnableConfig) -> AgentState:
+        selected = router.select(state.messages) if router else []
+        tool_names = tuple(tool.name for tool in selected)
+        bound_llm, prompt = bind(tool_names)
+        prompt += summary_prompt(state.summary)
+
+        # speculative knowledge base search for the question that starts this turn
+        thread_id = config.get("configurable", {}).get("thread_id")
+        speculate = (
+            prefetcher is not None
+            and thread_id is not None
+            and prefetch_tool in tool_names
+            and isinstance(state.messages[-1], HumanMessage)
+        )
+        if speculate and prefetch_config.mode == "context":
+            prefetcher.start(thread_id, str(state.messages[-1].content))
+            if retrieved := prefetcher.context(thread_id):
+                prompt += (
+                    "\n<knowledge_base_context>\n"
+                    "Excerpts retrieved from the knowledge base for the user's last message. "
+                    f"Answer from them when they are enough; otherwise call {prefetch_tool}.\n\n"
+                    f"{retrieved}\n</knowledge_base_context>\n"
+                )
+
+        def invoke_llm(messages):
+            if speculate and prefetch_config.mode == "tool":
+                # runs while the model decides whether to call the retrieval tool
+                prefetcher.start(thread_id, str(state.messages[-1].content))
+            return bound_llm.invoke(messages)
+
+        messages = [SystemMessage(content=prompt)] + state.messages
+        if response_cache is None:
+            response = invoke_llm(messages)
+        else:
+            context = f"{model_context}|{','.join(tool_names)}"
+            # the semantic tier only applies to the first step of a thread, before any tool result:
+            # answers built from tool output belong to this thread and must not reach other users
+            first_step = len(state.messages) == 1 and isinstance(state.messages[0], HumanMessage) and not state.summary
+            question = str(state.messages[0].content) if first_step else None
+            cached = response_cache.lookup(context, messages, question)
+            if cached:
+                response = ReplayChatModel(response=cached[0], cache_tier=cached[1]).invoke(messages)
+            else:
+                response = invoke_llm(messages)
+                response_cache.update(context, messages, response, question)
+        if prefetcher is not None and thread_id is not None and not response.tool_calls:
+            prefetcher.finish_turn(thread_id)
         state.messages.append(response)
         return state
 
     builder = StateGraph(AgentState)
 
+    builder.add_node("history", build_history_node(llm, history_config or HistoryConfig.from_env()))
+    builder.add_node("fastpath", build_fastpath_node(
+        fastpath_config or FastPathConfig.from_env(),
+        embedder=router.embedder if router else None,
+    ))
     builder.add_node("scout", assistant)
-    builder.add_node(ToolNode(tools))
+    # concurrency limits and deadlines for every call, a prefetch hit included
+    executor = ToolExecutor(tool_execution_config or ToolExecutionConfig.from_env())
+    builder.add_node(ToolNode(executor.wrap_tools(prefetcher.wrap_tools(tools) if prefetcher else tools)))
 
-    builder.add_edge(START, "scout")
+    builder.add_edge(START, "history")
+    builder.add_edge("history", "fastpath")
+    builder.add_conditional_edges("fastpath", route_fastpath, {"scout": "scout", END: END})
     builder.add_conditional_edges(
         "scout",
         tools_condition,
     )
-    builder.add_edge("tools", "scout")
-
-    return builder.compile(checkpointer=MemorySaver())
+    if tools and tool_output_config.enabled:
+        builder.add_node("compact", build_compact_node(tool_output_store, tool_output_config))
+        builder.add_edge("tools", "compact")
+        builder.add_edge("compact", "history")
+    else:
+        builder.add_edge("tools", "history")
+
+    graph = builder.compile(checkpointer=checkpointer or build_checkpointer())
+    tracer = tracer or get_tracer()
+    if tracer is not None:
+        graph = graph.with_config(callbacks=[TracingCallbackHandler(tracer)])
+    return graph
 
 
 # visualize graph
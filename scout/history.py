@@ -0,0 +1,165 @@
+"""
+Gestión del historial de conversación antes de cada llamada al LLM.
+
+Con MemorySaver el historial de cada hilo crece sin límite y se reenvía completo a
+Gemini en cada turno. El nodo `history` del grafo lo mantiene acotado:
+
+1. Recorta las salidas grandes de herramientas de turnos anteriores.
+2. Si el historial supera `max_tokens`, resume los turnos más antiguos en
+   `AgentState.summary` y los elimina del estado, conservando los turnos recientes
+   que caben en `keep_tokens`.
+
+Los cortes se hacen siempre al inicio de un turno del usuario para no separar una
+llamada a herramienta de su resultado.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Callable, List
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    BaseMessage,
+    HumanMessage,
+    RemoveMessage,
+    ToolMessage,
+    get_buffer_string,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.constants import TAG_NOSTREAM
+
+
+SUMMARY_PROMPT = """
+Summarize the conversation below between a user and B2Bot, a data science assistant.
+The summary replaces these messages in the assistant's memory, so keep everything needed to continue the work:
+user goals and preferences, decisions taken, projects, files and tables in use, data that was loaded, key results and open tasks.
+Be concise and do not invent anything.
+
+<previous_summary>
+{summary}
+</previous_summary>
+
+<conversation>
+{conversation}
+</conversation>
+"""
+
+
+@dataclass
+class HistoryConfig:
+    """
+    Attributes:
+        max_tokens: Tokens de historial a partir de los cuales se compacta.
+        keep_tokens: Tokens de los turnos más recientes que se conservan al compactar.
+        tool_result_max_chars: Longitud máxima de la salida de una herramienta de un turno anterior.
+        summarize: Si es False los turnos antiguos se descartan sin resumir (ventana deslizante).
+        transcript_max_chars: Longitud máxima de cada mensaje en el texto que se envía a resumir.
+    """
+    max_tokens: int = 8000
+    keep_tokens: int = 3000
+    tool_result_max_chars: int = 1500
+    summarize: bool = True
+    transcript_max_chars: int = 2000
+
+    @classmethod
+    def from_env(cls) -> "HistoryConfig":
+        return cls(
+            max_tokens=int(os.environ.get("HISTORY_MAX_TOKENS", 8000)),
+            keep_tokens=int(os.environ.get("HISTORY_KEEP_TOKENS", 3000)),
+            tool_result_max_chars=int(os.environ.get("HISTORY_TOOL_RESULT_MAX_CHARS", 1500)),
+            summarize=os.environ.get("HISTORY_SUMMARIZE", "true").strip().lower() in ("1", "true", "yes"),
+            transcript_max_chars=int(os.environ.get("HISTORY_TRANSCRIPT_MAX_CHARS", 2000)),
+        )
+
+
+def elide_tool_result(message: ToolMessage, max_chars: int) -> ToolMessage:
+    """Sustituye (mismo id) la salida de una herramienta por su comienzo y una nota de recorte."""
+    content = str(message.content)
+    note = f"[... {len(content) - max_chars} characters of old tool output elided]"
+    # Las salidas compactadas conservan la referencia a la salida completa
+    if ref := message.additional_kwargs.get("tool_output_ref"):
+        note += f"\n[Full output stored as ref='{ref}'; use read_tool_output to page through it.]"
+    return ToolMessage(
+        id=message.id,
+        tool_call_id=message.tool_call_id,
+        name=message.name,
+        content=f"{content[:max_chars]}\n{note}",
+        # Un error recortado sigue siendo un error
+        status=message.status,
+        artifact=message.artifact,
+        additional_kwargs={**message.additional_kwargs, "elided": True},
+    )
+
+
+def keep_summary(current: str, update: str) -> str:
+    """Reducer de `AgentState.summary`: la entrada de cada turno trae el valor por defecto y no debe borrar el resumen."""
+    return update or current
+
+
+def summary_prompt(summary: str) -> str:
+    """Bloque del prompt de sistema con el resumen de los turnos ya compactados."""
+    if not summary:
+        return ""
+    return f"\n<conversation_summary>\n{summary}\n</conversation_summary>\n"
+
+
+def build_history_node(llm: BaseChatModel, config: HistoryConfig) -> Callable:
+    """
+    Crea el nodo del grafo que compacta el historial.
+
+    Args:
+        llm: Modelo usado para resumir (sin herramientas enlazadas).
+        config: Umbrales de compactación.
+    """
+    # El resumen no debe aparecer en el stream de mensajes que ve el usuario
+    llm = llm.with_config(tags=[TAG_NOSTREAM])
+
+    def summarize(summary: str, messages: List[BaseMessage]) -> str:
+        transcript = get_buffer_string([
+            m.model_copy(update={"content": str(m.content)[:config.transcript_max_chars]})
+            for m in messages
+        ])
+        response = llm.invoke([HumanMessage(content=SUMMARY_PROMPT.format(
+            summary=summary or "(none)",
+            conversation=transcript,
+        ))])
+        return str(response.content)
+
+    def manage_history(state) -> dict:
+        messages = list(state.messages)
+        human_indexes = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+        current_turn = human_indexes[-1] if human_indexes else 0
+
+        # 1. Salidas grandes de herramientas de turnos anteriores
+        updates: List[BaseMessage] = []
+        for i, message in enumerate(messages[:current_turn]):
+            if (
+                isinstance(message, ToolMessage)
+                and not message.additional_kwargs.get("elided")
+                and len(str(message.content)) > config.tool_result_max_chars
+            ):
+                messages[i] = elide_tool_result(message, config.tool_result_max_chars)
+                updates.append(messages[i])
+
+        # 2. Ventana por tokens con resumen de los turnos que salen de ella
+        if count_tokens_approximately(messages) <= config.max_tokens:
+            return {"messages": updates} if updates else {}
+
+        cut = current_turn
+        for i in human_indexes:
+            if count_tokens_approximately(messages[i:]) <= config.keep_tokens:
+                cut = i
+                break
+        if cut == 0:
+            return {"messages": updates} if updates else {}
+
+        dropped = messages[:cut]
+        summary = summarize(state.summary, dropped) if config.summarize else state.summary
+        # Los recortes de este paso no hacen falta si el mensaje se elimina
+        updates = [m for m in updates if m.id not in {d.id for d in dropped}]
+        return {
+            "messages": updates + [RemoveMessage(id=m.id) for m in dropped],
+            "summary": summary,
+        }
+
+    return manage_history
@@ -0,0 +1,234 @@
+"""
+Benchmark de configuraciones de almacenamiento para la colección `knowledge_base`.
+
+Copia los vectores del corpus real a colecciones temporales, una por configuración
+(float32 en RAM, float32 en disco, cuantización escalar, cuantización binaria), y
+compara para cada una:
+
+- memoria estimada en RAM y en disco (vectores originales, cuantizados y grafo HNSW),
+- recall@k frente a una búsqueda exacta sobre los vectores float32,
+- latencia p50/p95 de las consultas.
+
+Las consultas son las preguntas de data/Datos_test_RAG.csv o, con --sample-queries,
+vectores del propio corpus.
+
+Uso:
+    python -m scout.knowledge.benchmark --limit 20000 --k 10
+"""
+
+import argparse
+import csv
+import math
+import random
+import statistics
+import time
+from dataclasses import replace
+from typing import Dict, List
+
+from qdrant_client import models
+
+from scout.knowledge.store import CollectionSettings, KnowledgeBaseStore
+
+
+VARIANTS: Dict[str, CollectionSettings] = {
+    "float32-ram": CollectionSettings(quantization="none", on_disk=False),
+    "float32-disk": CollectionSettings(quantization="none", on_disk=True),
+    "scalar-int8": CollectionSettings(quantization="scalar", on_disk=True),
+    "binary": CollectionSettings(quantization="binary", on_disk=True, oversampling=3.0),
+}
+
+
+def estimate_memory(num_vectors: int, dim: int, settings: CollectionSettings) -> Dict[str, int]:
+    """
+    Estima los bytes en RAM y en disco de una configuración.
+
+    Qdrant no expone el uso de memoria por colección, así que se calcula a partir del
+    tamaño de cada estructura: vectores originales (4 bytes por dimensión), vectores
+    cuantizados (1 byte por dimensión en int8, 1 bit en binario) y enlaces del grafo
+    HNSW (2*m enlaces de 4 bytes en la capa base).
+    """
+    original = num_vectors * dim * 4
+    if settings.quantization == "scalar":
+        quantized = num_vectors * dim
+    elif settings.quantization == "binary":
+        quantized = num_vectors * math.ceil(dim / 8)
+    else:
+        quantized = 0
+    hnsw = num_vectors * settings.hnsw_m * 2 * 4
+
+    ram = disk = 0
+    ram_or_disk = [
+        (original, not settings.on_disk),
+        (quantized, settings.quantization_always_ram or not settings.on_disk),
+        (hnsw, not settings.hnsw_on_disk),
+    ]
+    for size, in_ram in ram_or_disk:
+        if in_ram:
+            ram += size
+        else:
+            disk += size
+    return {"ram_bytes": ram, "disk_bytes": disk}
+
+
+def load_corpus(store: KnowledgeBaseStore, limit: int) -> List[models.Record]:
+    """Lee hasta `limit` puntos con sus vectores de la colección de origen."""
+    records, offset = [], None
+    while len(records) < limit:
+        batch, offset = store.client.scroll(
+            collection_name=store.collection_name,
+            limit=min(256, limit - len(records)),
+            offset=offset,
+            with_vectors=[store.embedder.vector_name],
+            with_payload=False,
+        )
+        records.extend(batch)
+        if offset is None:
+            break
+    return records
+
+
+def load_queries(store: KnowledgeBaseStore, records: List[models.Record], args) -> List[List[float]]:
+    vector_name = store.embedder.vector_name
+    if args.sample_queries:
+        sample = random.Random(42).sample(records, min(args.num_queries, len(records)))
+        return [record.vector[vector_name] for record in sample]
+
+    with open(args.queries_file, "r", encoding="utf-8") as f:
+        questions = [row["consulta"] for row in csv.DictReader(f)][:args.num_queries]
+    return [store.embedder.embed_query(question) for question in questions]
+
+
+def wait_until_indexed(store: KnowledgeBaseStore, collection_name: str, timeout: float = 600) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        info = store.client.get_collection(collection_name)
+        if info.status == models.CollectionStatus.GREEN:
+            return
+        time.sleep(1)
+    raise TimeoutError(f"Collection {collection_name} was not indexed after {timeout}s")
+
+
+def run_variant(
+        store: KnowledgeBaseStore,
+        name: str,
+        settings: CollectionSettings,
+        records: List[models.Record],
+        queries: List[List[float]],
+        k: int,
+        ) -> Dict[str, object]:
+    vector_name = store.embedder.vector_name
+    bench_store = KnowledgeBaseStore(
+        client=store.client,
+        embedder=store.embedder,
+        collection_name=f"{store.collection_name}_bench_{name}",
+        settings=settings,
+    )
+    client = bench_store.client
+    if client.collection_exists(bench_store.collection_name):
+        client.delete_collection(bench_store.collection_name)
+
+    dim = len(records[0].vector[vector_name])
+    client.create_collection(
+        collection_name=bench_store.collection_name,
+        vectors_config={vector_name: settings.vector_params(dim)},
+        hnsw_config=settings.hnsw_config(),
+        # Umbral bajo para que también se construya el HNSW en corpus pequeños
+        optimizers_config=models.OptimizersConfigDiff(indexing_threshold=1000),
+        quantization_config=settings.quantization_config(),
+    )
+    client.upload_points(
+        collection_name=bench_store.collection_name,
+        points=[
+            models.PointStruct(id=record.id, vector={vector_name: record.vector[vector_name]})
+            for record in records
+        ],
+        batch_size=256,
+        wait=True,
+    )
+    wait_until_indexed(bench_store, bench_store.collection_name)
+
+    exact_params = models.SearchParams(
+        exact=True,
+        quantization=models.QuantizationSearchParams(ignore=True),
+    )
+    latencies, recalls = [], []
+    for query in queries:
+        truth = client.query_points(
+            collection_name=bench_store.collection_name,
+            query=query,
+            using=vector_name,
+            search_params=exact_params,
+            limit=k,
+        ).points
+
+        start = time.perf_counter()
+        found = client.query_points(
+            collection_name=bench_store.collection_name,
+            query=query,
+            using=vector_name,
+            search_params=settings.search_params(),
+            limit=k,
+        ).points
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        expected = {point.id for point in truth}
+        recalls.append(len(expected & {point.id for point in found}) / max(len(expected), 1))
+
+    return {
+        "variant": name,
+        **estimate_memory(len(records), dim, settings),
+        "recall": statistics.mean(recalls),
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": sorted(latencies)[max(int(len(latencies) * 0.95) - 1, 0)],
+        "collection": bench_store.collection_name,
+    }
+
+
+def format_bytes(size: int) -> str:
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=20000, help="Máximo de puntos a copiar del corpus")
+    parser.add_argument("--k", type=int, default=10, help="Vecinos para recall@k")
+    parser.add_argument("--num-queries", type=int, default=100)
+    parser.add_argument("--queries-file", default="data/Datos_test_RAG.csv")
+    parser.add_argument("--sample-queries", action="store_true", help="Usa vectores del corpus como consultas")
+    parser.add_argument("--variants", nargs="*", default=list(VARIANTS), choices=list(VARIANTS))
+    parser.add_argument("--oversampling", type=float, default=None, help="Sobrescribe el sobremuestreo de las variantes cuantizadas")
+    parser.add_argument("--keep", action="store_true", help="No borra las colecciones temporales")
+    args = parser.parse_args()
+
+    store = KnowledgeBaseStore()
+    records = load_corpus(store, args.limit)
+    if not records:
+        print(f"La colección '{store.collection_name}' está vacía; ejecuta primero la ingesta.")
+        return
+    queries = load_queries(store, records, args)
+    print(f"Corpus: {len(records)} vectores  |  Consultas: {len(queries)}  |  k={args.k}\n")
+
+    results = []
+    for name in args.variants:
+        settings = VARIANTS[name]
+        if args.oversampling is not None:
+            settings = replace(settings, oversampling=args.oversampling)
+        print(f"Ejecutando {name}...")
+        results.append(run_variant(store, name, settings, records, queries, args.k))
+        if not args.keep:
+            store.client.delete_collection(results[-1]["collection"])
+
+    print(f"\n{'variante':<14}{'RAM':>12}{'disco':>12}{'recall@' + str(args.k):>12}{'p50 ms':>10}{'p95 ms':>10}")
+    for r in results:
+        print(
+            f"{r['variant']:<14}{format_bytes(r['ram_bytes']):>12}{format_bytes(r['disk_bytes']):>12}"
+            f"{r['recall']:>12.3f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Detección de fragmentos casi duplicados con MinHash y LSH durante la ingesta.
+
+Las unidades compartidas tienen muchas versiones, copias y plantillas casi idénticas.
+Cada fragmento se resume en una firma MinHash de sus shingles de palabras; el índice
+LSH (bandas de la firma) propone candidatos y se confirma la similitud estimada de
+Jaccard contra el umbral. Solo se indexa un fragmento representativo por grupo y los
+orígenes de los demás quedan en su payload (`metadata.duplicate_sources`).
+
+Del representativo solo se guarda lo necesario para localizar su punto (origen e índice
+del fragmento) y su firma, nunca el texto. Aun así el índice crece con el corpus:
+`max_representatives` lo acota y `reset()` lo vacía entre ingestas independientes.
+"""
+
+import hashlib
+import os
+import re
+import struct
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from scout.knowledge.documents import DocumentChunk, normalize_label
+
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD_RE = re.compile(r"\w+")
+
+
+def _false_probabilities(threshold: float, bands: int, rows: int, steps: int = 100) -> Tuple[float, float]:
+    """Integra las probabilidades de falso positivo y falso negativo de un esquema LSH (b, r)."""
+    false_positive = false_negative = 0.0
+    for i in range(steps):
+        s = (i + 0.5) / steps
+        p_candidate = 1 - (1 - s ** rows) ** bands
+        if s < threshold:
+            false_positive += p_candidate / steps
+        else:
+            false_negative += (1 - p_candidate) / steps
+    return false_positive, false_negative
+
+
+def optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """Elige bandas y filas por banda que minimizan falsos positivos + falsos negativos."""
+    best, best_error = (1, num_perm), float("inf")
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        fp, fn = _false_probabilities(threshold, bands, rows)
+        if fp + fn < best_error:
+            best, best_error = (bands, rows), fp + fn
+    return best
+
+
+@dataclass(frozen=True)
+class Representative:
+    """Fragmento representativo de un grupo de casi duplicados: lo que identifica su punto en Qdrant."""
+    source: Optional[str]
+    chunk_index: Optional[int]
+
+
+@dataclass
+class DedupStats:
+    chunks_seen: int = 0
+    duplicates: int = 0
+    chars_seen: int = 0
+    chars_saved: int = 0
+    vector_bytes_saved: int = 0
+
+    @property
+    def ratio(self) -> float:
+        """Fracción de fragmentos descartados por ser casi duplicados."""
+        return self.duplicates / self.chunks_seen if self.chunks_seen else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"Deduplicación: {self.duplicates}/{self.chunks_seen} fragmentos descartados "
+            f"({self.ratio:.1%})  |  Ahorro estimado: {self.chars_saved / 1e3:.1f} KB de texto, "
+            f"{self.vector_bytes_saved / 1e3:.1f} KB de vectores"
+        )
+
+
+class NearDuplicateDetector:
+    def __init__(
+            self,
+            threshold: float = 0.85,
+            num_perm: int = 128,
+            shingle_size: int = 5,
+            vector_size: int = 384,
+            seed: int = 1,
+            max_representatives: Optional[int] = None,
+            ):
+        """
+        Args:
+            threshold: Similitud de Jaccard estimada a partir de la cual dos fragmentos son casi duplicados.
+            num_perm: Número de permutaciones (longitud de la firma MinHash).
+            shingle_size: Palabras por shingle.
+            vector_size: Dimensión de los embeddings, para estimar el ahorro del índice.
+            seed: Semilla de las permutaciones; fija para que las firmas sean reproducibles.
+            max_representatives: Representativos que se recuerdan como máximo; los fragmentos
+                nuevos a partir de ese número se indexan sin compararse con los siguientes.
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.vector_size = vector_size
+        self.max_representatives = max_representatives
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Olvida los representativos, los duplicados anotados y las estadísticas."""
+        with self._lock:
+            self._buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(self.bands)]
+            self._signatures: List[np.ndarray] = []
+            self._representatives: List[Representative] = []
+            self._duplicate_sources: Dict[int, List[str]] = defaultdict(list)
+            self.stats = DedupStats()
+
+    @classmethod
+    def from_env(cls, vector_size: int = 384) -> Optional["NearDuplicateDetector"]:
+        """
+        Crea el detector con DEDUP_THRESHOLD (por defecto 0.85; 0 lo desactiva) y
+        DEDUP_MAX_REPRESENTATIVES (por defecto sin límite).
+        """
+        threshold = float(os.environ.get("DEDUP_THRESHOLD", 0.85))
+        if threshold <= 0:
+            return None
+        max_representatives = int(os.environ.get("DEDUP_MAX_REPRESENTATIVES", 0)) or None
+        return cls(threshold=threshold, vector_size=vector_size, max_representatives=max_representatives)
+
+    def signature(self, text: str) -> np.ndarray:
+        tokens = _WORD_RE.findall(normalize_label(text))
+        size = min(self.shingle_size, len(tokens)) or 1
+        shingles = {" ".join(tokens[i:i + size]) for i in range(max(len(tokens) - size + 1, 1))}
+        hashes = np.array(
+            [struct.unpack("<I", hashlib.sha1(s.encode("utf-8")).digest()[:4])[0] for s in shingles],
+            dtype=np.uint64,
+        )
+        permuted = np.bitwise_and((np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME, _MAX_HASH)
+        # Los valores caben en 32 bits: la mitad de memoria por firma guardada
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+    def add(self, chunk: DocumentChunk) -> bool:
+        """
+        Registra un fragmento.
+
+        Returns:
+            True si el fragmento es nuevo (debe indexarse) o False si es casi duplicado
+            de un representativo ya visto, en cuyo caso su origen se anota en él.
+        """
+        signature = self.signature(chunk.text)
+        keys = self._band_keys(signature)
+
+        with self._lock:
+            self.stats.chunks_seen += 1
+            self.stats.chars_seen += len(chunk.text)
+
+            candidates = {index for band, key in enumerate(keys) for index in self._buckets[band].get(key, ())}
+            for index in sorted(candidates):
+                similarity = float(np.mean(self._signatures[index] == signature))
+                if similarity >= self.threshold:
+                    source = chunk.metadata.get("source")
+                    representative = self._representatives[index]
+                    if source != representative.source and source not in self._duplicate_sources[index]:
+                        self._duplicate_sources[index].append(source)
+                    self.stats.duplicates += 1
+                    self.stats.chars_saved += len(chunk.text)
+                    self.stats.vector_bytes_saved += self.vector_size * 4
+                    return False
+
+            index = len(self._representatives)
+            if self.max_representatives is not None and index >= self.max_representatives:
+                return True
+            self._representatives.append(Representative(chunk.metadata.get("source"), chunk.metadata.get("chunk_index")))
+            self._signatures.append(signature)
+            for band, key in enumerate(keys):
+                self._buckets[band][key].append(index)
+            return True
+
+    def duplicate_sources(self) -> List[Tuple[Representative, List[str]]]:
+        """Representativos que absorbieron duplicados, con los orígenes de esos duplicados."""
+        with self._lock:
+            return [
+                (self._representatives[index], list(sources))
+                for index, sources in self._duplicate_sources.items()
+                if sources
+            ]
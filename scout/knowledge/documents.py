@@ -0,0 +1,287 @@
+"""
+Extracción de texto, fragmentación y metadatos estructurados de los documentos
+que se indexan en la colección `knowledge_base`.
+
+Los documentos pueden venir de la carpeta local `data/` o de las exportaciones de
+Google Drive (`exports/`). Cada fragmento lleva un payload con campos estructurados
+(área, ruta de origen, carpeta de Drive, tipo MIME, fecha de modificación) que luego
+se indexan en Qdrant para poder filtrar las búsquedas.
+
+Los documentos se dividen primero en secciones padre (por encabezados en markdown, por
+páginas en PDF) y cada sección en fragmentos hijo pequeños. Los hijos se usan para la
+búsqueda y las secciones padre son lo que se devuelve al agente.
+"""
+
+import io
+import json
+import mimetypes
+import os
+import re
+import unicodedata
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+
+TEXT_EXTENSIONS = {".md", ".txt", ".py", ".csv", ".json", ".html", ".xml", ".yaml", ".yml"}
+SUPPORTED_EXTENSIONS = TEXT_EXTENSIONS | {".pdf", ".docx", ".xlsx"}
+
+# Palabras clave en la ruta que identifican el área de negocio del documento
+AREA_KEYWORDS = {
+    "b2b": "b2b",
+    "nomina": "nomina",
+    "payroll": "nomina",
+}
+DEFAULT_AREA = "general"
+
+# Manifiesto que escribe load_drive_documents.py junto a las exportaciones de Drive
+DRIVE_MANIFEST_FILE = "drive_manifest.json"
+
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_CHUNK_OVERLAP = 100
+# Las secciones padre más largas se dividen para que una sola no agote el presupuesto de tokens
+DEFAULT_PARENT_MAX_CHARS = 6000
+
+_MARKDOWN_HEADING_RE = re.compile(r"^#{1,6}\s+(.+?)\s*#*\s*$", re.MULTILINE)
+
+
+@dataclass
+class ParentSection:
+    """Sección de un documento (apartado markdown, página de PDF) que agrupa fragmentos hijo."""
+    id: str
+    text: str
+    metadata: dict = field(default_factory=dict)
+
+
+@dataclass
+class DocumentChunk:
+    """Fragmento de un documento listo para indexar."""
+    text: str
+    metadata: dict = field(default_factory=dict)
+    parent: Optional[ParentSection] = None
+
+
+def normalize_label(value: str) -> str:
+    """Pasa a minúsculas y elimina acentos para comparar etiquetas (p. ej. 'Nómina' -> 'nomina')."""
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+
+def infer_area(relative_path: str) -> str:
+    """Deduce el área (b2b, nomina, ...) a partir de los componentes de la ruta."""
+    for part in Path(relative_path).parts:
+        normalized = normalize_label(part)
+        for keyword, area in AREA_KEYWORDS.items():
+            if keyword in normalized:
+                return area
+    return DEFAULT_AREA
+
+
+def extract_text(data: bytes, extension: str) -> Optional[str]:
+    """
+    Extrae el texto plano del contenido de un archivo.
+
+    Las páginas de un PDF se separan con un salto de página (\\f) para conservar
+    sus límites.
+
+    Args:
+        data: Contenido binario del archivo.
+        extension: Extensión del archivo, incluyendo el punto (p. ej. '.pdf').
+
+    Returns:
+        El texto extraído, o None si el formato no está soportado.
+    """
+    extension = extension.lower()
+
+    if extension in TEXT_EXTENSIONS:
+        return data.decode("utf-8", errors="replace")
+
+    if extension == ".pdf":
+        from pypdf import PdfReader
+
+        reader = PdfReader(io.BytesIO(data))
+        return "\f".join(page.extract_text() or "" for page in reader.pages)
+
+    if extension == ".docx":
+        import docx
+
+        document = docx.Document(io.BytesIO(data))
+        return "\n".join(paragraph.text for paragraph in document.paragraphs)
+
+    if extension == ".xlsx":
+        import pandas as pd
+
+        sheets = pd.read_excel(io.BytesIO(data), sheet_name=None)
+        return "\n\n".join(
+            f"# {name}\n{frame.to_csv(index=False)}" for name, frame in sheets.items()
+        )
+
+    return None
+
+
+def split_text(text: str, chunk_size: int = DEFAULT_CHUNK_SIZE, chunk_overlap: int = DEFAULT_CHUNK_OVERLAP) -> List[str]:
+    """Divide un texto en fragmentos solapados respetando párrafos y líneas."""
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\f", "\n\n", "\n", " ", ""],
+    )
+    return [chunk for chunk in splitter.split_text(text) if chunk.strip()]
+
+
+def split_sections(text: str, doc_type: str, max_chars: int = DEFAULT_PARENT_MAX_CHARS) -> List[Tuple[str, str]]:
+    """
+    Divide un documento en secciones padre.
+
+    Markdown se corta en cada encabezado y PDF en cada página (\\f); el resto de
+    formatos se trata como una sola sección. Las secciones de más de `max_chars`
+    se subdividen.
+
+    Returns:
+        Lista de (etiqueta, texto), donde la etiqueta es el encabezado o 'página N'.
+    """
+    sections: List[Tuple[str, str]] = []
+    if doc_type == "md":
+        headings = list(_MARKDOWN_HEADING_RE.finditer(text))
+        if not headings or headings[0].start() > 0:
+            sections.append(("", text[:headings[0].start()] if headings else text))
+        for i, heading in enumerate(headings):
+            end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+            sections.append((heading.group(1), text[heading.start():end]))
+    elif doc_type == "pdf":
+        sections = [(f"página {i + 1}", page) for i, page in enumerate(text.split("\f"))]
+    else:
+        sections = [("", text)]
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=max_chars, chunk_overlap=0)
+    result = []
+    for label, section_text in sections:
+        if not section_text.strip():
+            continue
+        if len(section_text) <= max_chars:
+            result.append((label, section_text.strip()))
+        else:
+            result.extend((label, part) for part in splitter.split_text(section_text))
+    return result
+
+
+def build_metadata(
+        relative_path: str,
+        mime_type: Optional[str] = None,
+        modified_time: Optional[str] = None,
+        drive_folder: Optional[str] = None,
+        area: Optional[str] = None,
+        ) -> dict:
+    """
+    Construye el payload estructurado común a todos los fragmentos de un documento.
+
+    Args:
+        relative_path: Ruta del documento relativa a la raíz de ingesta.
+        mime_type: Tipo MIME; si no se indica se deduce de la extensión.
+        modified_time: Fecha de modificación en formato RFC 3339.
+        drive_folder: Carpeta de Google Drive de la que proviene el documento.
+        area: Área de negocio; si no se indica se deduce de la ruta.
+    """
+    relative_path = Path(relative_path).as_posix()
+    extension = Path(relative_path).suffix.lower()
+    return {
+        "source": relative_path,
+        "file_name": Path(relative_path).name,
+        "doc_type": extension.lstrip(".") or "bin",
+        "mime_type": mime_type or mimetypes.guess_type(relative_path)[0] or "application/octet-stream",
+        "modified_time": modified_time,
+        "drive_folder": drive_folder,
+        "area": normalize_label(area) if area else infer_area(f"{drive_folder or ''}/{relative_path}"),
+    }
+
+
+def chunk_document(
+        text: str,
+        metadata: dict,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+        ) -> List[DocumentChunk]:
+    """
+    Divide un documento en secciones padre y cada sección en fragmentos hijo.
+
+    Cada hijo lleva en su payload el id y la etiqueta de su sección padre.
+    """
+    chunks = []
+    for section_index, (label, section_text) in enumerate(split_sections(text, metadata.get("doc_type", ""))):
+        parent_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{metadata.get('source')}@{section_index}"))
+        parent = ParentSection(
+            id=parent_id,
+            text=section_text,
+            metadata={**metadata, "section": label, "section_index": section_index},
+        )
+        for chunk_text in split_text(section_text, chunk_size, chunk_overlap):
+            chunks.append(DocumentChunk(
+                text=chunk_text,
+                metadata={**metadata, "chunk_index": len(chunks), "parent_id": parent_id, "section": label},
+                parent=parent,
+            ))
+    return chunks
+
+
+def load_drive_manifest(root: Path) -> dict:
+    """Carga el manifiesto de Drive (ruta relativa -> metadatos) si existe en la raíz."""
+    manifest_file = root / DRIVE_MANIFEST_FILE
+    if not manifest_file.exists():
+        return {}
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_directory_chunks(
+        root: str,
+        area: Optional[str] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+        ) -> Iterator[DocumentChunk]:
+    """
+    Recorre una carpeta y produce los fragmentos de todos los documentos soportados.
+
+    Si la carpeta contiene el manifiesto de Drive, se usan sus metadatos (tipo MIME
+    original, fecha de modificación y carpeta de Drive) en lugar de los locales.
+
+    Args:
+        root: Carpeta a recorrer (p. ej. 'data' o 'exports').
+        area: Fuerza el área de todos los documentos en lugar de deducirla de la ruta.
+        chunk_size: Tamaño máximo de cada fragmento en caracteres.
+        chunk_overlap: Solapamiento entre fragmentos consecutivos.
+    """
+    root_path = Path(root)
+    manifest = load_drive_manifest(root_path)
+
+    for dirpath, _, filenames in os.walk(root_path):
+        for filename in sorted(filenames):
+            path = Path(dirpath) / filename
+            if path.suffix.lower() not in SUPPORTED_EXTENSIONS or filename == DRIVE_MANIFEST_FILE:
+                continue
+
+            relative_path = path.relative_to(root_path).as_posix()
+            drive_info = manifest.get(relative_path, {})
+            modified_time = drive_info.get("modifiedTime") or datetime.fromtimestamp(
+                path.stat().st_mtime, tz=timezone.utc
+            ).isoformat()
+
+            try:
+                text = extract_text(path.read_bytes(), path.suffix)
+            except Exception as e:
+                print(f"No se pudo extraer el texto de {relative_path}: {e}")
+                continue
+            if not text:
+                continue
+
+            metadata = build_metadata(
+                relative_path,
+                mime_type=drive_info.get("mimeType"),
+                modified_time=modified_time,
+                drive_folder=drive_info.get("drive_folder"),
+                area=area,
+            )
+            yield from chunk_document(text, metadata, chunk_size, chunk_overlap)
@@ -0,0 +1,45 @@
+"""
+Modelo de embeddings compartido por la ingesta y la búsqueda.
+
+Usa el mismo modelo y el mismo nombre de vector que `mcp-server-qdrant`, de modo que
+los puntos que escribe la ingesta siguen siendo legibles por el servidor `qdrant`
+configurado en my_mcp/mcp_config.json.
+"""
+
+import os
+from typing import List, Sequence
+
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+class Embedder:
+    def __init__(self, model_name: str = None):
+        self.model_name = model_name or os.environ.get("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+        self._model = None
+
+    @property
+    def model(self):
+        # fastembed descarga el modelo la primera vez; se carga solo cuando se necesita
+        if self._model is None:
+            from fastembed import TextEmbedding
+
+            self._model = TextEmbedding(self.model_name)
+        return self._model
+
+    @property
+    def vector_name(self) -> str:
+        """Nombre del vector con nombre, igual al que usa mcp-server-qdrant."""
+        return f"fast-{self.model_name.split('/')[-1].lower()}"
+
+    @property
+    def vector_size(self) -> int:
+        from fastembed import TextEmbedding
+
+        return TextEmbedding.get_embedding_size(self.model_name)
+
+    def embed_documents(self, texts: Sequence[str]) -> List[List[float]]:
+        return [vector.tolist() for vector in self.model.embed(list(texts))]
+
+    def embed_query(self, text: str) -> List[float]:
+        return next(iter(self.model.query_embed(text))).tolist()
@@ -0,0 +1,65 @@
+"""
+Ingesta de documentos locales (data/, exports/) en la colección `knowledge_base`.
+
+Uso:
+    python -m scout.knowledge.ingest data exports
+"""
+
+import sys
+from dataclasses import dataclass
+from typing import Optional
+
+from scout.knowledge.dedup import DedupStats, NearDuplicateDetector
+from scout.knowledge.documents import iter_directory_chunks
+from scout.knowledge.store import KnowledgeBaseStore
+
+
+@dataclass
+class IngestReport:
+    points: int
+    dedup: Optional[DedupStats] = None
+
+    def summary(self) -> str:
+        lines = [f"{self.points} fragmentos indexados"]
+        if self.dedup is not None:
+            lines.append(self.dedup.summary())
+        return "\n".join(lines)
+
+
+def ingest_directory(
+        carpeta_datos: str = "data",
+        nombre_coleccion: Optional[str] = None,
+        area: Optional[str] = None,
+        store: Optional[KnowledgeBaseStore] = None,
+        detector: Optional[NearDuplicateDetector] = None,
+        ) -> IngestReport:
+    """
+    Indexa todos los documentos soportados de una carpeta en Qdrant.
+
+    Args:
+        carpeta_datos: Carpeta con los documentos a indexar.
+        nombre_coleccion: Colección destino; por defecto la de COLLECTION_NAME.
+        area: Fuerza el área de todos los documentos en lugar de deducirla de la ruta.
+        store: Almacén a usar; por defecto se crea uno con la configuración del entorno.
+        detector: Detector de casi duplicados; por defecto el de DEDUP_THRESHOLD.
+
+    Returns:
+        El número de fragmentos indexados y las estadísticas de deduplicación.
+    """
+    store = store or KnowledgeBaseStore(collection_name=nombre_coleccion)
+    store.ensure_collection()
+    detector = detector or NearDuplicateDetector.from_env(vector_size=store.embedder.vector_size)
+    points = store.ingest(iter_directory_chunks(carpeta_datos, area=area), detector=detector)
+    return IngestReport(points=points, dedup=detector.stats if detector else None)
+
+
+if __name__ == "__main__":
+    carpetas = sys.argv[1:] or ["data"]
+    store = KnowledgeBaseStore()
+    # Un solo detector para todas las carpetas: los duplicados entre data/ y exports/ también cuentan
+    detector = NearDuplicateDetector.from_env(vector_size=store.embedder.vector_size)
+    for carpeta in carpetas:
+        report = ingest_directory(carpeta, store=store, detector=detector)
+        print(f"{carpeta} -> '{store.collection_name}': {report.points} fragmentos indexados")
+    if detector is not None:
+        print(detector.stats.summary())
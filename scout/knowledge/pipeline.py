@@ -0,0 +1,270 @@
+"""
+Pipeline de ingesta en streaming: los documentos remotos (p. ej. de Google Drive) pasan
+por las etapas fetch -> extract/chunk -> embed -> upsert sin escribirse en disco.
+
+Cada etapa tiene su propio número de hilos y se conecta con la siguiente mediante una
+cola acotada, de modo que una etapa lenta (normalmente embed o la red) frena a las
+anteriores en lugar de acumular documentos en memoria.
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterable, List, Optional
+
+from scout.knowledge.dedup import DedupStats, NearDuplicateDetector
+from scout.knowledge.documents import (
+    DEFAULT_CHUNK_OVERLAP,
+    DEFAULT_CHUNK_SIZE,
+    SUPPORTED_EXTENSIONS,
+    DocumentChunk,
+    build_metadata,
+    chunk_document,
+    extract_text,
+)
+from scout.knowledge.store import KnowledgeBaseStore
+
+
+_DONE = object()
+
+
+@dataclass
+class RemoteDocument:
+    """
+    Documento remoto pendiente de ingesta.
+
+    Attributes:
+        relative_path: Ruta lógica del documento, con la extensión con la que se va a leer.
+        mime_type: Tipo MIME original.
+        modified_time: Fecha de modificación (RFC 3339).
+        drive_folder: Carpeta de Drive de origen.
+        ref: Lo que necesite el fetcher para descargarlo (p. ej. id y tipo MIME de Drive).
+    """
+    relative_path: str
+    mime_type: Optional[str] = None
+    modified_time: Optional[str] = None
+    drive_folder: Optional[str] = None
+    ref: Any = None
+
+
+@dataclass
+class PipelineConfig:
+    fetch_workers: int = 4
+    extract_workers: int = 2
+    embed_workers: int = 1
+    upsert_workers: int = 2
+    queue_size: int = 16
+    embed_batch_size: int = 64
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    chunk_overlap: int = DEFAULT_CHUNK_OVERLAP
+    area: Optional[str] = None
+
+
+@dataclass
+class PipelineStats:
+    documents_listed: int = 0
+    documents_skipped: int = 0
+    documents_fetched: int = 0
+    bytes_fetched: int = 0
+    chunks: int = 0
+    points_upserted: int = 0
+    errors: List[str] = field(default_factory=list)
+    dedup: Optional[DedupStats] = None
+    started_at: float = field(default_factory=time.perf_counter)
+    first_upsert_seconds: Optional[float] = None
+    elapsed_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, **counters) -> None:
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def error(self, message: str) -> None:
+        print(message)
+        with self._lock:
+            self.errors.append(message)
+
+    def summary(self) -> str:
+        first = f"{self.first_upsert_seconds:.1f}s" if self.first_upsert_seconds is not None else "-"
+        summary = (
+            f"Documentos: {self.documents_fetched}/{self.documents_listed} descargados "
+            f"({self.documents_skipped} omitidos, {self.bytes_fetched / 1e6:.1f} MB)  |  "
+            f"Fragmentos: {self.chunks}  |  Puntos: {self.points_upserted}  |  "
+            f"Errores: {len(self.errors)}  |  Primer punto: {first}  |  Total: {self.elapsed_seconds:.1f}s"
+        )
+        if self.dedup is not None:
+            summary += f"\n{self.dedup.summary()}"
+        return summary
+
+
+class StreamingIngestPipeline:
+    def __init__(
+            self,
+            store: KnowledgeBaseStore,
+            fetcher_factory: Callable[[], Callable[[RemoteDocument], bytes]],
+            config: Optional[PipelineConfig] = None,
+            detector: Optional[NearDuplicateDetector] = None,
+            ):
+        """
+        Args:
+            store: Almacén de Qdrant destino.
+            fetcher_factory: Crea una función de descarga por hilo de la etapa fetch
+                (los clientes HTTP de Google no se pueden compartir entre hilos).
+            config: Número de hilos por etapa, tamaño de las colas y de los fragmentos.
+            detector: Detector de casi duplicados compartido por los hilos de extracción;
+                los duplicados se descartan antes de calcular sus embeddings.
+        """
+        self.store = store
+        self.fetcher_factory = fetcher_factory
+        self.config = config or PipelineConfig()
+        self.detector = detector
+        self.stats = PipelineStats()
+
+    def run(self, documents: Iterable[RemoteDocument]) -> PipelineStats:
+        """Procesa todos los documentos y espera a que termine la última etapa."""
+        config = self.config
+        self.stats = PipelineStats()
+        self.store.ensure_collection()
+
+        fetch_q = queue.Queue(maxsize=config.queue_size)
+        extract_q = queue.Queue(maxsize=config.queue_size)
+        embed_q = queue.Queue(maxsize=config.queue_size)
+        upsert_q = queue.Queue(maxsize=config.queue_size)
+
+        threads = (
+            self._start_stage("fetch", fetch_q, extract_q, config.fetch_workers, config.extract_workers, self._fetch_worker)
+            + self._start_stage("extract", extract_q, embed_q, config.extract_workers, config.embed_workers, self._extract_worker)
+            + self._start_stage("embed", embed_q, upsert_q, config.embed_workers, config.upsert_workers, self._embed_worker)
+            + self._start_stage("upsert", upsert_q, None, config.upsert_workers, 0, self._upsert_worker)
+        )
+
+        for document in documents:
+            self.stats.add(documents_listed=1)
+            if Path(document.relative_path).suffix.lower() not in SUPPORTED_EXTENSIONS:
+                self.stats.add(documents_skipped=1)
+                continue
+            fetch_q.put(document)
+        for _ in range(config.fetch_workers):
+            fetch_q.put(_DONE)
+
+        for thread in threads:
+            thread.join()
+
+        if self.detector is not None:
+            # Los representativos ya se escribieron; ahora se anotan los duplicados que absorbieron
+            self.store.record_duplicates(self.detector)
+            self.stats.dedup = self.detector.stats
+        self.stats.elapsed_seconds = time.perf_counter() - self.stats.started_at
+        return self.stats
+
+    def _start_stage(self, name, input_q, output_q, workers, downstream_workers, target) -> List[threading.Thread]:
+        """Arranca los hilos de una etapa; el último en terminar avisa a la etapa siguiente."""
+        remaining = [workers]
+        lock = threading.Lock()
+
+        def run():
+            try:
+                target(input_q, output_q)
+            finally:
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last and output_q is not None:
+                    for _ in range(downstream_workers):
+                        output_q.put(_DONE)
+
+        threads = [threading.Thread(target=run, name=f"ingest-{name}-{i}", daemon=True) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _fetch_worker(self, input_q: queue.Queue, output_q: queue.Queue) -> None:
+        # Los errores se cuentan por documento: un hilo que termina antes de tiempo deja de vaciar su cola
+        # y run() se bloquea al llenarse. Si no se puede crear el cliente, se reintenta con el siguiente.
+        fetch = None
+        while (document := input_q.get()) is not _DONE:
+            try:
+                if fetch is None:
+                    fetch = self.fetcher_factory()
+                data = fetch(document)
+            except Exception as e:
+                self.stats.error(f"Error descargando {document.relative_path}: {e}")
+                continue
+            self.stats.add(documents_fetched=1, bytes_fetched=len(data))
+            output_q.put((document, data))
+
+    def _extract_worker(self, input_q: queue.Queue, output_q: queue.Queue) -> None:
+        config = self.config
+        while (item := input_q.get()) is not _DONE:
+            document, data = item
+            try:
+                text = extract_text(data, Path(document.relative_path).suffix)
+            except Exception as e:
+                self.stats.error(f"No se pudo extraer el texto de {document.relative_path}: {e}")
+                continue
+            if not text:
+                continue
+
+            try:
+                metadata = build_metadata(
+                    document.relative_path,
+                    mime_type=document.mime_type,
+                    modified_time=document.modified_time,
+                    drive_folder=document.drive_folder,
+                    area=config.area,
+                )
+                chunks = chunk_document(text, metadata, config.chunk_size, config.chunk_overlap)
+                self.stats.add(chunks=len(chunks))
+                if self.detector is not None:
+                    chunks = [chunk for chunk in chunks if self.detector.add(chunk)]
+            except Exception as e:
+                self.stats.error(f"No se pudo fragmentar {document.relative_path}: {e}")
+                continue
+            if chunks:
+                output_q.put(chunks)
+
+    def _embed_worker(self, input_q: queue.Queue, output_q: queue.Queue) -> None:
+        batch_size = self.config.embed_batch_size
+        pending: List[DocumentChunk] = []
+        done = False
+        while not done:
+            item = input_q.get()
+            if item is _DONE:
+                done = True
+            else:
+                pending.extend(item)
+                # Agrupa lo que ya esté en cola para embeber en lotes grandes
+                while len(pending) < batch_size:
+                    try:
+                        item = input_q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _DONE:
+                        done = True
+                        break
+                    pending.extend(item)
+
+            while pending and (len(pending) >= batch_size or done or input_q.empty()):
+                batch, pending = pending[:batch_size], pending[batch_size:]
+                try:
+                    vectors = self.store.embedder.embed_documents([chunk.text for chunk in batch])
+                except Exception as e:
+                    self.stats.error(f"Error calculando embeddings de {len(batch)} fragmentos: {e}")
+                    continue
+                output_q.put((batch, vectors))
+
+    def _upsert_worker(self, input_q: queue.Queue, output_q: None) -> None:
+        while (item := input_q.get()) is not _DONE:
+            batch, vectors = item
+            try:
+                written = self.store.upsert_chunks(batch, vectors)
+            except Exception as e:
+                self.stats.error(f"Error escribiendo {len(batch)} puntos en Qdrant: {e}")
+                continue
+            with self.stats._lock:
+                if self.stats.first_upsert_seconds is None:
+                    self.stats.first_upsert_seconds = time.perf_counter() - self.stats.started_at
+            self.stats.add(points_upserted=written)
@@ -0,0 +1,96 @@
+"""
+Recuperación por documento padre: se busca sobre fragmentos hijo pequeños pero se
+devuelven sus secciones padre, sin repetir secciones y recortadas a un presupuesto de
+tokens para que el contexto que recibe Gemini sea compacto.
+"""
+
+import hashlib
+import os
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from scout.knowledge.documents import normalize_label
+
+
+DEFAULT_TOKEN_BUDGET = 2000
+# Gemini produce aproximadamente un token cada 4 caracteres en texto en español/inglés
+CHARS_PER_TOKEN = 4
+# No merece la pena añadir un recorte de sección con menos tokens que esto
+MIN_SECTION_TOKENS = 50
+
+
+def default_token_budget() -> int:
+    return int(os.environ.get("KB_SECTION_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+@dataclass
+class RetrievedSection:
+    text: str
+    score: float
+    metadata: dict = field(default_factory=dict)
+    truncated: bool = False
+
+
+def compact_sections(sections: List[RetrievedSection], token_budget: Optional[int] = None) -> List[RetrievedSection]:
+    """
+    Elimina secciones repetidas y recorta el resultado al presupuesto de tokens.
+
+    Las secciones se recorren por relevancia; dos secciones con el mismo texto
+    normalizado (p. ej. la misma plantilla en dos carpetas) cuentan una sola vez. La
+    última sección que no cabe entera se recorta si queda presupuesto suficiente.
+    """
+    seen = set()
+    result = []
+    remaining = token_budget if token_budget is not None else default_token_budget()
+    for section in sorted(sections, key=lambda s: s.score, reverse=True):
+        fingerprint = hashlib.sha1(" ".join(normalize_label(section.text).split()).encode("utf-8")).digest()
+        if fingerprint in seen:
+            continue
+        seen.add(fingerprint)
+
+        tokens = estimate_tokens(section.text)
+        if tokens <= remaining:
+            result.append(section)
+            remaining -= tokens
+        elif remaining >= MIN_SECTION_TOKENS:
+            text = section.text[:remaining * CHARS_PER_TOKEN].rsplit(" ", 1)[0] + " ..."
+            result.append(RetrievedSection(text=text, score=section.score, metadata=section.metadata, truncated=True))
+            remaining = 0
+        if remaining < MIN_SECTION_TOKENS:
+            break
+    return result
+
+
+def format_results(points) -> str:
+    if not points:
+        return "No results found."
+
+    results = []
+    for point in points:
+        metadata = point.payload.get("metadata", {})
+        results.append(
+            f"[score={point.score:.3f}] {metadata.get('source')} "
+            f"(area={metadata.get('area')}, type={metadata.get('doc_type')}, "
+            f"modified={metadata.get('modified_time')})\n{point.payload.get('document', '')}"
+        )
+    return "\n---\n".join(results)
+
+
+def format_sections(sections) -> str:
+    if not sections:
+        return "No results found."
+
+    results = []
+    for section in sections:
+        metadata = section.metadata
+        title = f" > {metadata.get('section')}" if metadata.get("section") else ""
+        truncated = " [truncated]" if section.truncated else ""
+        results.append(
+            f"[score={section.score:.3f}] {metadata.get('source')}{title} "
+            f"(area={metadata.get('area')}, modified={metadata.get('modified_time')}){truncated}\n{section.text}"
+        )
+    return "\n---\n".join(results)
@@ -0,0 +1,422 @@
+"""
+Acceso a la colección `knowledge_base` de Qdrant: creación de la colección, índices
+de payload, escritura de fragmentos y búsqueda semántica con filtros.
+
+El payload sigue el formato de `mcp-server-qdrant` ({"document": ..., "metadata": {...}})
+y los campos estructurados viven bajo `metadata`, por lo que los índices se crean sobre
+rutas como `metadata.area`.
+
+El almacenamiento de vectores (cuantización, vectores originales en disco, parámetros
+HNSW y sobremuestreo con reevaluación en la consulta) se configura con CollectionSettings,
+por defecto a partir de variables de entorno QDRANT_*.
+"""
+
+import os
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Sequence, Union
+
+from dotenv import load_dotenv
+from qdrant_client import QdrantClient, models
+
+from scout.knowledge.dedup import NearDuplicateDetector
+from scout.knowledge.documents import DocumentChunk, normalize_label
+from scout.knowledge.embeddings import Embedder
+from scout.knowledge.retrieval import RetrievedSection, compact_sections
+
+
+load_dotenv()
+
+DEFAULT_COLLECTION = "knowledge_base"
+METADATA_KEY = "metadata"
+
+# Campos del payload indexados en Qdrant y su tipo de índice
+PAYLOAD_INDEXES = {
+    "area": models.PayloadSchemaType.KEYWORD,
+    "source": models.PayloadSchemaType.KEYWORD,
+    "drive_folder": models.PayloadSchemaType.KEYWORD,
+    "mime_type": models.PayloadSchemaType.KEYWORD,
+    "doc_type": models.PayloadSchemaType.KEYWORD,
+    "modified_time": models.PayloadSchemaType.DATETIME,
+    # Necesario para agrupar los fragmentos hijo por sección padre en search_sections
+    "parent_id": models.PayloadSchemaType.KEYWORD,
+}
+
+
+QUANTIZATION_MODES = ("none", "scalar", "binary")
+
+# Valor de un campo de palabra clave en build_filter: uno solo o cualquiera de una lista
+FilterValue = Union[str, Sequence[str], None]
+
+
+def env_flag(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "si", "sí")
+
+
+@dataclass
+class CollectionSettings:
+    """
+    Parámetros de almacenamiento e indexación de la colección.
+
+    Attributes:
+        quantization: 'none', 'scalar' (int8) o 'binary'.
+        quantization_always_ram: Mantiene los vectores cuantizados en RAM aunque los originales estén en disco.
+        on_disk: Guarda los vectores originales (float32) en disco (memmap) en lugar de RAM.
+        hnsw_m: Número de enlaces por nodo del grafo HNSW.
+        hnsw_ef_construct: Tamaño de la lista de candidatos al construir el índice.
+        hnsw_on_disk: Guarda el grafo HNSW en disco.
+        search_hnsw_ef: Tamaño de la lista de candidatos en la consulta (None = valor de Qdrant).
+        oversampling: Factor de sobremuestreo sobre los vectores cuantizados antes de reevaluar.
+        rescore: Reevalúa los candidatos con los vectores originales.
+    """
+    quantization: str = "none"
+    quantization_always_ram: bool = True
+    on_disk: bool = False
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    hnsw_on_disk: bool = False
+    search_hnsw_ef: Optional[int] = None
+    oversampling: float = 2.0
+    rescore: bool = True
+
+    def __post_init__(self):
+        if self.quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization '{self.quantization}', expected one of {QUANTIZATION_MODES}")
+
+    @classmethod
+    def from_env(cls) -> "CollectionSettings":
+        search_hnsw_ef = os.environ.get("QDRANT_SEARCH_HNSW_EF")
+        return cls(
+            quantization=os.environ.get("QDRANT_QUANTIZATION", "none").lower(),
+            quantization_always_ram=env_flag("QDRANT_QUANTIZATION_ALWAYS_RAM", True),
+            on_disk=env_flag("QDRANT_ON_DISK", False),
+            hnsw_m=int(os.environ.get("QDRANT_HNSW_M", 16)),
+            hnsw_ef_construct=int(os.environ.get("QDRANT_HNSW_EF_CONSTRUCT", 100)),
+            hnsw_on_disk=env_flag("QDRANT_HNSW_ON_DISK", False),
+            search_hnsw_ef=int(search_hnsw_ef) if search_hnsw_ef else None,
+            oversampling=float(os.environ.get("QDRANT_OVERSAMPLING", 2.0)),
+            rescore=env_flag("QDRANT_RESCORE", True),
+        )
+
+    def vector_params(self, size: int) -> models.VectorParams:
+        return models.VectorParams(size=size, distance=models.Distance.COSINE, on_disk=self.on_disk)
+
+    def hnsw_config(self) -> models.HnswConfigDiff:
+        return models.HnswConfigDiff(
+            m=self.hnsw_m,
+            ef_construct=self.hnsw_ef_construct,
+            on_disk=self.hnsw_on_disk,
+        )
+
+    def quantization_config(self):
+        if self.quantization == "scalar":
+            return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=self.quantization_always_ram,
+            ))
+        if self.quantization == "binary":
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(
+                always_ram=self.quantization_always_ram,
+            ))
+        return None
+
+    def search_params(self) -> Optional[models.SearchParams]:
+        quantization = None
+        if self.quantization != "none":
+            quantization = models.QuantizationSearchParams(
+                ignore=False,
+                rescore=self.rescore,
+                oversampling=self.oversampling,
+            )
+        if quantization is None and self.search_hnsw_ef is None:
+            return None
+        return models.SearchParams(hnsw_ef=self.search_hnsw_ef, quantization=quantization)
+
+
+def get_qdrant_client() -> QdrantClient:
+    """Crea el cliente de Qdrant con las mismas variables de entorno que mcp_config.json."""
+    return QdrantClient(
+        url=os.environ.get("qdrant_client_url"),
+        api_key=os.environ.get("qdrant_client_api_key"),
+    )
+
+
+def _filter_values(value: FilterValue, normalize: Callable[[str], str] = str) -> List[str]:
+    """Uno o varios valores de un campo del filtro, normalizados y sin vacíos."""
+    if not value:
+        return []
+    values = [value] if isinstance(value, str) else value
+    return [normalize(v) for v in values if v]
+
+
+def build_filter(
+        area: FilterValue = None,
+        source: FilterValue = None,
+        drive_folder: FilterValue = None,
+        mime_type: FilterValue = None,
+        doc_type: FilterValue = None,
+        modified_after: Optional[str] = None,
+        modified_before: Optional[str] = None,
+        ) -> Optional[models.Filter]:
+    """
+    Construye un filtro de Qdrant sobre los campos indexados del payload.
+
+    Los campos de palabra clave aceptan un valor o una lista de valores (cualquiera de ellos).
+
+    Args:
+        area: Área de negocio (p. ej. 'b2b', 'nomina').
+        source: Ruta relativa exacta del documento.
+        drive_folder: Carpeta de Google Drive de origen.
+        mime_type: Tipo MIME del documento original.
+        doc_type: Extensión del documento sin punto (p. ej. 'pdf').
+        modified_after: Solo documentos modificados desde esta fecha (RFC 3339).
+        modified_before: Solo documentos modificados hasta esta fecha (RFC 3339).
+
+    Returns:
+        El filtro, o None si no se indicó ninguna condición.
+    """
+    conditions = []
+    keyword_values = {
+        "area": _filter_values(area, normalize_label),
+        "source": _filter_values(source),
+        "drive_folder": _filter_values(drive_folder),
+        "mime_type": _filter_values(mime_type),
+        "doc_type": _filter_values(doc_type, lambda value: value.lower().lstrip(".")),
+    }
+    for key, values in keyword_values.items():
+        if values:
+            conditions.append(models.FieldCondition(
+                key=f"{METADATA_KEY}.{key}",
+                match=models.MatchValue(value=values[0]) if len(values) == 1 else models.MatchAny(any=values),
+            ))
+
+    if modified_after or modified_before:
+        conditions.append(models.FieldCondition(
+            key=f"{METADATA_KEY}.modified_time",
+            range=models.DatetimeRange(gte=modified_after, lte=modified_before),
+        ))
+
+    return models.Filter(must=conditions) if conditions else None
+
+
+def point_id(source: Optional[str], chunk_index: Optional[int]) -> str:
+    """ID determinista por (origen, índice) para que reindexar sobrescriba en lugar de duplicar."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{source}#{chunk_index}"))
+
+
+def chunk_point_id(chunk: DocumentChunk) -> str:
+    return point_id(chunk.metadata.get("source"), chunk.metadata.get("chunk_index"))
+
+
+class KnowledgeBaseStore:
+    def __init__(
+            self,
+            client: Optional[QdrantClient] = None,
+            embedder: Optional[Embedder] = None,
+            collection_name: Optional[str] = None,
+            settings: Optional[CollectionSettings] = None,
+            ):
+        self.client = client or get_qdrant_client()
+        self.embedder = embedder or Embedder()
+        self.collection_name = collection_name or os.environ.get("COLLECTION_NAME", DEFAULT_COLLECTION)
+        self.settings = settings or CollectionSettings.from_env()
+        # Las secciones padre se guardan sin vectores en una colección hermana
+        self.parents_collection_name = f"{self.collection_name}_parents"
+
+    def ensure_collection(self) -> None:
+        """Crea la colección con la configuración de almacenamiento si no existe y asegura los índices de payload."""
+        if not self.client.collection_exists(self.collection_name):
+            self.client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config={
+                    self.embedder.vector_name: self.settings.vector_params(self.embedder.vector_size)
+                },
+                hnsw_config=self.settings.hnsw_config(),
+                quantization_config=self.settings.quantization_config(),
+            )
+        if not self.client.collection_exists(self.parents_collection_name):
+            self.client.create_collection(collection_name=self.parents_collection_name, vectors_config={})
+        self.ensure_payload_indexes()
+
+    def apply_settings(self) -> None:
+        """
+        Aplica la configuración de almacenamiento a una colección ya existente.
+
+        Qdrant reconstruye los segmentos en segundo plano; la colección sigue
+        respondiendo consultas mientras tanto.
+        """
+        quantization_config = self.settings.quantization_config()
+        self.client.update_collection(
+            collection_name=self.collection_name,
+            vectors_config={
+                self.embedder.vector_name: models.VectorParamsDiff(on_disk=self.settings.on_disk)
+            },
+            hnsw_config=self.settings.hnsw_config(),
+            quantization_config=quantization_config if quantization_config is not None else models.Disabled.DISABLED,
+        )
+
+    def ensure_payload_indexes(self) -> None:
+        """Crea los índices de payload que falten; los existentes no se tocan."""
+        existing = self.client.get_collection(self.collection_name).payload_schema or {}
+        for key, schema in PAYLOAD_INDEXES.items():
+            field_name = f"{METADATA_KEY}.{key}"
+            if field_name not in existing:
+                self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=schema,
+                )
+
+    def upsert_chunks(self, chunks: List[DocumentChunk], vectors: Optional[List[List[float]]] = None) -> int:
+        """
+        Escribe fragmentos en la colección.
+
+        Args:
+            chunks: Fragmentos a escribir.
+            vectors: Embeddings ya calculados; si no se indican se calculan aquí.
+
+        Returns:
+            El número de puntos escritos.
+        """
+        if not chunks:
+            return 0
+        if vectors is None:
+            vectors = self.embedder.embed_documents([chunk.text for chunk in chunks])
+
+        parents = {chunk.parent.id: chunk.parent for chunk in chunks if chunk.parent is not None}
+        if parents:
+            self.client.upsert(
+                collection_name=self.parents_collection_name,
+                points=[
+                    models.PointStruct(
+                        id=parent.id,
+                        vector={},
+                        payload={"document": parent.text, METADATA_KEY: parent.metadata},
+                    )
+                    for parent in parents.values()
+                ],
+            )
+
+        points = [
+            models.PointStruct(
+                id=chunk_point_id(chunk),
+                vector={self.embedder.vector_name: vector},
+                payload={"document": chunk.text, METADATA_KEY: chunk.metadata},
+            )
+            for chunk, vector in zip(chunks, vectors)
+        ]
+        self.client.upsert(collection_name=self.collection_name, points=points)
+        return len(points)
+
+    def ingest(
+            self,
+            chunks: Iterable[DocumentChunk],
+            batch_size: int = 64,
+            detector: Optional[NearDuplicateDetector] = None,
+            ) -> int:
+        """
+        Embebe y escribe fragmentos por lotes.
+
+        Args:
+            chunks: Fragmentos a indexar.
+            batch_size: Fragmentos por lote de embeddings y escritura.
+            detector: Si se indica, los casi duplicados no se indexan y sus orígenes
+                se anotan en el fragmento representativo.
+
+        Returns:
+            El total de puntos escritos.
+        """
+        total = 0
+        batch: List[DocumentChunk] = []
+        for chunk in chunks:
+            if detector is not None and not detector.add(chunk):
+                continue
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                total += self.upsert_chunks(batch)
+                batch = []
+        total += self.upsert_chunks(batch)
+        if detector is not None:
+            self.record_duplicates(detector)
+        return total
+
+    def record_duplicates(self, detector: NearDuplicateDetector) -> None:
+        """Guarda en cada representativo los orígenes de los casi duplicados que absorbió."""
+        for representative, sources in detector.duplicate_sources():
+            self.client.set_payload(
+                collection_name=self.collection_name,
+                payload={"duplicate_sources": sources, "duplicate_count": len(sources)},
+                points=[point_id(representative.source, representative.chunk_index)],
+                key=METADATA_KEY,
+            )
+
+    def search(
+            self,
+            query: str,
+            limit: int = 5,
+            query_filter: Optional[models.Filter] = None,
+            ) -> List[models.ScoredPoint]:
+        """Búsqueda semántica, opcionalmente restringida por un filtro de payload."""
+        return self.client.query_points(
+            collection_name=self.collection_name,
+            query=self.embedder.embed_query(query),
+            using=self.embedder.vector_name,
+            query_filter=query_filter,
+            search_params=self.settings.search_params(),
+            limit=limit,
+            with_payload=True,
+        ).points
+
+    def search_sections(
+            self,
+            query: str,
+            limit: int = 5,
+            query_filter: Optional[models.Filter] = None,
+            token_budget: Optional[int] = None,
+            ) -> List[RetrievedSection]:
+        """
+        Busca sobre los fragmentos hijo y devuelve sus secciones padre.
+
+        Qdrant agrupa los hijos por `metadata.parent_id` (un grupo por sección, con la
+        puntuación de su mejor hijo) y trae el texto de la sección desde la colección de
+        padres en la misma consulta. Después se eliminan secciones repetidas y se recorta
+        al presupuesto de tokens.
+
+        Args:
+            query: Consulta en lenguaje natural.
+            limit: Número máximo de secciones distintas.
+            query_filter: Filtro de payload sobre los fragmentos hijo.
+            token_budget: Tokens máximos del resultado; por defecto KB_SECTION_TOKEN_BUDGET.
+        """
+        groups = self.client.query_points_groups(
+            collection_name=self.collection_name,
+            query=self.embedder.embed_query(query),
+            using=self.embedder.vector_name,
+            group_by=f"{METADATA_KEY}.parent_id",
+            query_filter=query_filter,
+            search_params=self.settings.search_params(),
+            limit=limit,
+            group_size=1,
+            with_payload=True,
+            with_lookup=models.WithLookup(
+                collection=self.parents_collection_name,
+                with_payload=True,
+                with_vectors=False,
+            ),
+        ).groups
+
+        sections = []
+        for group in groups:
+            best = group.hits[0]
+            # Sin sección padre (p. ej. borrada) se devuelve el propio fragmento
+            payload = group.lookup.payload if group.lookup is not None else best.payload
+            sections.append(RetrievedSection(
+                text=payload.get("document", ""),
+                score=best.score,
+                metadata=payload.get(METADATA_KEY, {}),
+            ))
+        return compact_sections(sections, token_budget)
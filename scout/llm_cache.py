@@ -0,0 +1,288 @@
+"""
+Caché de respuestas del LLM.
+
+Muchas preguntas a B2Bot se repiten (consultas de políticas, las mismas dudas de
+nómina) y cada una paga una llamada completa a Gemini. ResponseCache se consulta antes
+de llamar al modelo y tiene dos niveles:
+
+- Exacto: clave con los mensajes normalizados, el modelo, la temperatura y las
+  herramientas enlazadas.
+- Semántico (opcional): embedding de la primera pregunta de un hilo; devuelve la
+  respuesta final guardada para una pregunta lo bastante parecida.
+
+Ambos niveles caducan por TTL y se limitan en número de entradas. Las respuestas de la
+caché se reproducen con ReplayChatModel, que las emite por fragmentos como un modelo
+real, de modo que el streaming del cliente y de Streamlit funciona igual.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from scout.knowledge.embeddings import Embedder
+
+
+@dataclass
+class LLMCacheConfig:
+    """
+    Attributes:
+        enabled: Activa la caché exacta.
+        ttl_seconds: Vida de cada respuesta guardada.
+        max_entries: Respuestas guardadas por nivel; se descartan las menos usadas.
+        semantic: Activa el nivel semántico.
+        semantic_threshold: Similitud coseno mínima para reutilizar una respuesta.
+    """
+    enabled: bool = True
+    ttl_seconds: float = 3600.0
+    max_entries: int = 512
+    semantic: bool = False
+    semantic_threshold: float = 0.95
+
+    @classmethod
+    def from_env(cls) -> "LLMCacheConfig":
+        return cls(
+            enabled=os.environ.get("LLM_CACHE_ENABLED", "true").strip().lower() in ("1", "true", "yes"),
+            ttl_seconds=float(os.environ.get("LLM_CACHE_TTL_SECONDS", 3600)),
+            max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 512)),
+            semantic=os.environ.get("LLM_CACHE_SEMANTIC", "false").strip().lower() in ("1", "true", "yes"),
+            semantic_threshold=float(os.environ.get("LLM_CACHE_SEMANTIC_THRESHOLD", 0.95)),
+        )
+
+
+def normalize_text(text: Any) -> str:
+    return " ".join(str(text).split())
+
+
+def message_key(message: BaseMessage) -> dict:
+    """Parte estable de un mensaje: sin ids, que cambian entre hilos y ejecuciones."""
+    key = {"type": message.type, "content": normalize_text(message.content)}
+    if isinstance(message, AIMessage) and message.tool_calls:
+        key["tool_calls"] = [{"name": call["name"], "args": call["args"]} for call in message.tool_calls]
+    return key
+
+
+def exact_key(context: str, messages: Sequence[BaseMessage]) -> str:
+    payload = json.dumps([context, [message_key(m) for m in messages]], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExactTier:
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, AIMessage]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[AIMessage]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[0] > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: str, response: AIMessage) -> None:
+        self._entries[key] = (time.time(), response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SemanticTier:
+    def __init__(self, ttl_seconds: float, max_entries: int, threshold: float, embedder: Optional[Embedder] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.embedder = embedder or Embedder()
+        # Por contexto: lista de [creado, último uso, vector normalizado, respuesta]
+        self._entries: dict = {}
+
+    def _embed(self, query: str) -> np.ndarray:
+        vector = np.asarray(self.embedder.embed_query(normalize_text(query)), dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def get(self, context: str, query: str) -> Optional[AIMessage]:
+        now = time.time()
+        entries = [e for e in self._entries.get(context, []) if now - e[0] <= self.ttl_seconds]
+        self._entries[context] = entries
+        if not entries:
+            return None
+        scores = np.stack([e[2] for e in entries]) @ self._embed(query)
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        entries[best][1] = now
+        return entries[best][3]
+
+    def put(self, context: str, query: str, response: AIMessage) -> None:
+        now = time.time()
+        self._entries.setdefault(context, []).append([now, now, self._embed(query), response])
+        total = sum(len(entries) for entries in self._entries.values())
+        if total > self.max_entries:
+            # Se descartan las entradas usadas hace más tiempo
+            oldest = sorted(
+                ((e[1], context, id(e)) for context, entries in self._entries.items() for e in entries)
+            )[:total - self.max_entries]
+            drop = {entry_id for _, _, entry_id in oldest}
+            for context in self._entries:
+                self._entries[context] = [e for e in self._entries[context] if id(e) not in drop]
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+
+class ResponseCache:
+    def __init__(self, exact: Optional[ExactTier] = None, semantic: Optional[SemanticTier] = None):
+        self.exact = exact
+        self.semantic = semantic
+        self.hits = {"exact": 0, "semantic": 0}
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: LLMCacheConfig) -> "ResponseCache":
+        return cls(
+            exact=ExactTier(config.ttl_seconds, config.max_entries) if config.enabled else None,
+            semantic=(
+                SemanticTier(config.ttl_seconds, config.max_entries, config.semantic_threshold)
+                if config.semantic else None
+            ),
+        )
+
+    def lookup(
+            self,
+            context: str,
+            messages: Sequence[BaseMessage],
+            question: Optional[str] = None,
+            ) -> Optional[Tuple[AIMessage, str]]:
+        """
+        Busca una respuesta guardada.
+
+        Args:
+            context: Modelo, temperatura y herramientas enlazadas.
+            messages: Mensajes exactos que se enviarían al modelo, prompt de sistema incluido.
+            question: Pregunta para el nivel semántico; solo debe pasarse cuando la
+                respuesta no depende de turnos anteriores (primer paso de un hilo nuevo).
+
+        Returns:
+            La respuesta y el nivel que la ha servido ('exact' o 'semantic'), o None.
+        """
+        with self._lock:
+            if self.exact is not None and (response := self.exact.get(exact_key(context, messages))):
+                self.hits["exact"] += 1
+                return response, "exact"
+            if self.semantic is not None and question and (response := self.semantic.get(context, question)):
+                self.hits["semantic"] += 1
+                return response, "semantic"
+            self.misses += 1
+            return None
+
+    def update(
+            self,
+            context: str,
+            messages: Sequence[BaseMessage],
+            response: AIMessage,
+            question: Optional[str] = None,
+            ) -> None:
+        """
+        Guarda una respuesta del modelo.
+
+        Args:
+            question: Pregunta del único turno del hilo. En el nivel semántico solo se
+                guardan respuestas finales de un primer paso sin resultados de herramientas:
+                esos resultados dependen del hilo o del usuario (datos cargados, archivos) y
+                no deben servirse a otro que haga una pregunta parecida.
+        """
+        with self._lock:
+            if self.exact is not None:
+                self.exact.put(exact_key(context, messages), response)
+            used_tools = any(isinstance(message, ToolMessage) for message in messages)
+            if self.semantic is not None and question and not response.tool_calls and not used_tools:
+                self.semantic.put(context, question, response)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "exact_entries": len(self.exact) if self.exact is not None else 0,
+                "semantic_entries": len(self.semantic) if self.semantic is not None else 0,
+            }
+
+
+class ReplayChatModel(BaseChatModel):
+    """Modelo que devuelve una respuesta ya conocida, emitiéndola por fragmentos si se hace streaming."""
+
+    response: AIMessage
+    cache_tier: str = "exact"
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _message(self) -> AIMessage:
+        return AIMessage(
+            content=self.response.content,
+            tool_calls=self.response.tool_calls,
+            response_metadata={**self.response.response_metadata, "cache": self.cache_tier},
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self._message())])
+
+    def _stream(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[CallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+            ) -> Iterator[ChatGenerationChunk]:
+        # BaseChatModel notifica cada fragmento a los callbacks (y con ellos al stream de LangGraph)
+        for message_chunk in split_message(self._message()):
+            yield ChatGenerationChunk(message=message_chunk)
+
+
+def split_message(message: AIMessage) -> List[AIMessageChunk]:
+    """Divide una respuesta completa en los fragmentos que emitiría un modelo en streaming."""
+    content = message.content
+    tokens = re.split(r"(\s)", content) if isinstance(content, str) else [content]
+    chunks = [AIMessageChunk(content=token) for token in tokens if token]
+    chunks.append(AIMessageChunk(
+        content="",
+        tool_call_chunks=[
+            {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+            for i, call in enumerate(message.tool_calls)
+        ],
+        response_metadata=message.response_metadata,
+    ))
+    return chunks
+
+
+_caches: dict = {}
+
+
+def build_response_cache(config: Optional[LLMCacheConfig] = None) -> Optional[ResponseCache]:
+    """Caché configurada, compartida por todos los grafos del proceso; None si está desactivada."""
+    config = config or LLMCacheConfig.from_env()
+    if not (config.enabled or config.semantic):
+        return None
+    key = (config.ttl_seconds, config.max_entries, config.enabled, config.semantic, config.semantic_threshold)
+    if key not in _caches:
+        _caches[key] = ResponseCache.from_config(config)
+    return _caches[key]
@@ -0,0 +1,326 @@
+"""
+Grabación y reproducción de las llamadas al LLM.
+
+Sirve para medir el grafo (orquestación, ToolNode, streaming) sin llamar a Gemini:
+
+- LLM_MODE=record: LLMRecorder guarda en LLM_RECORD_FILE (JSONL) cada petición al
+  modelo, su respuesta con las llamadas a herramientas y los fragmentos del stream con
+  sus tiempos.
+- LLM_MODE=replay: build_agent_graph usa RecordedChatModel, que sirve las respuestas
+  grabadas con la latencia grabada o con una latencia fija por token.
+
+Prueba de carga sin conexión con una grabación:
+    python -m scout.llm_replay --users 8 [--tools]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+from dataclasses import dataclass
+from itertools import cycle
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    BaseCallbackHandler,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    message_to_dict,
+    messages_from_dict,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult, LLMResult
+from pydantic import PrivateAttr
+
+from scout.llm_cache import exact_key, split_message
+
+
+@dataclass
+class LLMModeConfig:
+    """
+    Attributes:
+        mode: 'live', 'record' o 'replay'.
+        path: Fichero JSONL de grabaciones.
+        token_latency_ms: Latencia fija entre fragmentos; None usa la latencia grabada.
+        first_token_ms: Latencia hasta el primer fragmento; None usa `token_latency_ms`.
+        time_scale: Factor aplicado a la latencia grabada (0 la elimina).
+    """
+    mode: str = "live"
+    path: str = "recordings/llm.jsonl"
+    token_latency_ms: Optional[float] = None
+    first_token_ms: Optional[float] = None
+    time_scale: float = 1.0
+
+    @classmethod
+    def from_env(cls) -> "LLMModeConfig":
+        token_latency = os.environ.get("FAKE_LLM_TOKEN_LATENCY_MS")
+        first_token = os.environ.get("FAKE_LLM_FIRST_TOKEN_MS")
+        return cls(
+            mode=os.environ.get("LLM_MODE", "live").strip().lower(),
+            path=os.environ.get("LLM_RECORD_FILE", "recordings/llm.jsonl"),
+            token_latency_ms=float(token_latency) if token_latency else None,
+            first_token_ms=float(first_token) if first_token else None,
+            time_scale=float(os.environ.get("FAKE_LLM_TIME_SCALE", 1.0)),
+        )
+
+
+def chunk_to_dict(chunk: AIMessageChunk, elapsed: float) -> dict:
+    return {
+        "t": round(elapsed, 4),
+        "content": chunk.content,
+        "tool_call_chunks": [dict(c) for c in chunk.tool_call_chunks],
+        "response_metadata": chunk.response_metadata,
+    }
+
+
+class LLMRecorder(BaseCallbackHandler):
+    """Callback que añade una línea al fichero de grabación por cada llamada al modelo."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._runs: Dict[UUID, dict] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages: List[List[BaseMessage]], *, run_id: UUID, **kwargs) -> Any:
+        self._runs[run_id] = {
+            "key": exact_key("", messages[0]),
+            "request": [message_to_dict(m) for m in messages[0]],
+            "chunks": [],
+            "started": time.perf_counter(),
+        }
+
+    def on_llm_new_token(self, token: str, *, chunk=None, run_id: UUID, **kwargs) -> Any:
+        run = self._runs.get(run_id)
+        if run is not None and chunk is not None and isinstance(chunk.message, AIMessageChunk):
+            run["chunks"].append(chunk_to_dict(chunk.message, time.perf_counter() - run["started"]))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs) -> Any:
+        run = self._runs.pop(run_id, None)
+        if run is None or not response.generations or not response.generations[0]:
+            return
+        generation = response.generations[0][0]
+        if not isinstance(generation, ChatGeneration):
+            return
+        record = {
+            "key": run["key"],
+            "request": run["request"],
+            "response": message_to_dict(generation.message),
+            "chunks": run["chunks"],
+            "elapsed": round(time.perf_counter() - run["started"], 4),
+        }
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock, self.path.open("a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> Any:
+        self._runs.pop(run_id, None)
+
+
+def load_recordings(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class RecordedChatModel(BaseChatModel):
+    """
+    Modelo falso que sirve respuestas grabadas.
+
+    Cada petición se busca por la clave de sus mensajes (sin ids); si no se grabó, se
+    sirve la siguiente grabación en orden. Las llamadas a herramientas enlazadas se
+    ignoran: las herramientas que se llaman son las de la respuesta grabada.
+    """
+
+    recordings: List[dict]
+    token_latency_ms: Optional[float] = None
+    first_token_ms: Optional[float] = None
+    time_scale: float = 1.0
+    model: str = "replay"
+    temperature: float = 0.0
+
+    _by_key: Dict[str, Iterator[dict]] = PrivateAttr(default_factory=dict)
+    _sequence: Optional[Iterator[dict]] = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @classmethod
+    def from_config(cls, config: LLMModeConfig) -> "RecordedChatModel":
+        recordings = load_recordings(config.path)
+        if not recordings:
+            raise ValueError(f"No hay grabaciones en {config.path}")
+        return cls(
+            recordings=recordings,
+            token_latency_ms=config.token_latency_ms,
+            first_token_ms=config.first_token_ms,
+            time_scale=config.time_scale,
+        )
+
+    def model_post_init(self, __context: Any) -> None:
+        grouped: Dict[str, List[dict]] = {}
+        for recording in self.recordings:
+            grouped.setdefault(recording["key"], []).append(recording)
+        self._by_key = {key: cycle(group) for key, group in grouped.items()}
+        self._sequence = cycle(self.recordings)
+
+    @property
+    def _llm_type(self) -> str:
+        return "recorded"
+
+    def bind_tools(self, tools, **kwargs) -> "RecordedChatModel":
+        return self
+
+    def _next(self, messages: List[BaseMessage]) -> dict:
+        with self._lock:
+            matches = self._by_key.get(exact_key("", messages))
+            return next(matches) if matches is not None else next(self._sequence)
+
+    def _response(self, recording: dict) -> AIMessage:
+        message = messages_from_dict([recording["response"]])[0]
+        return AIMessage(
+            content=message.content,
+            tool_calls=getattr(message, "tool_calls", []),
+            response_metadata=message.response_metadata,
+            usage_metadata=getattr(message, "usage_metadata", None),
+        )
+
+    def _chunks(self, recording: dict) -> List[tuple]:
+        """Fragmentos a emitir con la espera previa a cada uno, en segundos."""
+        if recording["chunks"]:
+            chunks = [
+                (c["t"], AIMessageChunk(
+                    content=c["content"],
+                    tool_call_chunks=c["tool_call_chunks"],
+                    response_metadata=c["response_metadata"],
+                ))
+                for c in recording["chunks"]
+            ]
+        else:
+            # La llamada se grabó sin streaming: se reparte su duración entre los fragmentos
+            pieces = split_message(self._response(recording))
+            chunks = [(recording["elapsed"] * (i + 1) / len(pieces), c) for i, c in enumerate(pieces)]
+
+        delays, previous = [], 0.0
+        for i, (t, chunk) in enumerate(chunks):
+            if self.token_latency_ms is None:
+                delay = (t - previous) * self.time_scale
+            elif i == 0 and self.first_token_ms is not None:
+                delay = self.first_token_ms / 1000
+            else:
+                delay = self.token_latency_ms / 1000
+            delays.append((max(delay, 0.0), chunk))
+            previous = t
+        return delays
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        recording = self._next(messages)
+        time.sleep(sum(delay for delay, _ in self._chunks(recording)))
+        return ChatResult(generations=[ChatGeneration(message=self._response(recording))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        recording = self._next(messages)
+        await asyncio.sleep(sum(delay for delay, _ in self._chunks(recording)))
+        return ChatResult(generations=[ChatGeneration(message=self._response(recording))])
+
+    def _stream(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[CallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+            ) -> Iterator[ChatGenerationChunk]:
+        for delay, message_chunk in self._chunks(self._next(messages)):
+            time.sleep(delay)
+            yield ChatGenerationChunk(message=message_chunk)
+
+    async def _astream(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+            ) -> AsyncIterator[ChatGenerationChunk]:
+        for delay, message_chunk in self._chunks(self._next(messages)):
+            await asyncio.sleep(delay)
+            yield ChatGenerationChunk(message=message_chunk)
+
+
+def recorded_questions(recordings: List[dict]) -> List[str]:
+    """Preguntas del usuario que abrieron cada turno grabado, en orden."""
+    questions = []
+    for recording in recordings:
+        last = messages_from_dict(recording["request"][-1:])[0]
+        if isinstance(last, HumanMessage) and str(last.content) not in questions:
+            questions.append(str(last.content))
+    return questions
+
+
+async def load_test(users: int, with_tools: bool) -> None:
+    from langgraph.checkpoint.memory import MemorySaver
+
+    from scout.client import stream_graph_response
+    from scout.graph import AgentState, build_agent_graph
+    from scout.llm_cache import ResponseCache
+
+    config = LLMModeConfig.from_env()
+    config.mode = "replay"
+    tools = []
+    if with_tools:
+        from scout.mcp_pool import load_tools
+        from scout.my_mcp.config import mcp_config, mcp_server_options
+
+        tools = await load_tools(mcp_config, server_options=mcp_server_options)
+    grafo = build_agent_graph(
+        tools=tools,
+        checkpointer=MemorySaver(),
+        response_cache=ResponseCache(),
+        llm_config=config,
+    )
+    questions = recorded_questions(load_recordings(config.path))
+
+    first_chunk, turn = [], []
+
+    async def user(n: int) -> None:
+        graph_config = {"configurable": {"thread_id": f"load-test-{n}"}}
+        for question in questions:
+            started = time.perf_counter()
+            first = None
+            async for _ in stream_graph_response(
+                entrada=AgentState(messages=[HumanMessage(content=question)]),
+                grafo=grafo,
+                config=graph_config,
+            ):
+                first = first or time.perf_counter() - started
+            first_chunk.append(first or 0.0)
+            turn.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(n) for n in range(users)))
+    elapsed = time.perf_counter() - started
+
+    def percentiles(values: List[float]) -> str:
+        if len(values) < 2:
+            return f"{1000 * sum(values):.0f} ms"
+        q = statistics.quantiles(values, n=20)
+        return f"p50 {1000 * statistics.median(values):.0f} ms  p95 {1000 * q[18]:.0f} ms"
+
+    print(f"{users} usuarios x {len(questions)} turnos en {elapsed:.2f}s ({len(turn) / elapsed:.1f} turnos/s)")
+    print(f"Primer fragmento: {percentiles(first_chunk)}")
+    print(f"Turno completo:   {percentiles(turn)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga del grafo con respuestas grabadas")
+    parser.add_argument("--users", type=int, default=4, help="Conversaciones concurrentes")
+    parser.add_argument("--tools", action="store_true", help="Cargar las herramientas de los servidores MCP")
+    args = parser.parse_args()
+    asyncio.run(load_test(args.users, args.tools))
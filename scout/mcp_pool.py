@@ -0,0 +1,437 @@
+"""
+Sesiones MCP persistentes.
+
+`MultiServerMCPClient.get_tools()` sin una sesión abierta devuelve herramientas que, en
+cada llamada, lanzan un proceso nuevo del servidor stdio y repiten el handshake MCP. Además
+del coste, el servidor pierde su estado entre llamadas (p. ej. el DataFrame cargado en
+`dataflow`).
+
+MCPSessionPool mantiene una sesión por servidor configurado en un bucle de eventos propio,
+en un hilo de fondo. Así las sesiones sobreviven a los `asyncio.run` de cada mensaje de
+Streamlit. Las herramientas envían sus llamadas a ese bucle y varias llamadas simultáneas
+comparten la misma sesión. Un chequeo periódico (ping) reinicia los servidores que han
+dejado de responder.
+
+Al arrancar, todos los servidores se inician a la vez y los esquemas de sus herramientas
+se guardan en disco (scout/mcp_schema_cache.py). En los arranques siguientes el grafo se
+construye con los esquemas guardados mientras los servidores terminan de arrancar en
+segundo plano, así que el arranque en frío no suma los tiempos de todos los servidores.
+
+Los servidores en modo perezoso (`lazy`) no se arrancan hasta la primera llamada a una
+de sus herramientas y, con `idle_timeout`, se paran tras ese tiempo sin uso; el agente
+sigue viendo sus herramientas gracias a la caché de esquemas.
+"""
+
+import asyncio
+import atexit
+import contextlib
+import copy
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Awaitable, Dict, List, Optional
+
+import anyio
+from langchain_core.tools import BaseTool
+from langchain_mcp_adapters.sessions import create_session
+from langchain_mcp_adapters.tools import convert_mcp_tool_to_langchain_tool
+from mcp import ClientSession
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+
+from scout.mcp_schema_cache import ToolSchemaCache
+from scout.tracing import trace
+
+
+@dataclass
+class MCPPoolConfig:
+    """
+    Attributes:
+        enabled: Si es False cada llamada abre su propia sesión (comportamiento de langchain-mcp-adapters).
+        health_interval_seconds: Intervalo entre pings a los servidores.
+        ping_timeout_seconds: Tiempo máximo de respuesta a un ping.
+        start_timeout_seconds: Tiempo máximo para arrancar un servidor e inicializar la sesión.
+        schema_cache_dir: Directorio de la caché de esquemas de herramientas; vacío para no usarla.
+        lazy: Arranca cada servidor en su primera llamada (si no se indica otra cosa en mcp_config.json).
+        idle_timeout_seconds: Segundos sin uso tras los que se para un servidor; 0 para no pararlos.
+    """
+    enabled: bool = True
+    health_interval_seconds: float = 30.0
+    ping_timeout_seconds: float = 5.0
+    start_timeout_seconds: float = 60.0
+    schema_cache_dir: str = ".cache/mcp_tools"
+    lazy: bool = False
+    idle_timeout_seconds: float = 0.0
+
+    @classmethod
+    def from_env(cls) -> "MCPPoolConfig":
+        return cls(
+            enabled=os.environ.get("MCP_POOL_ENABLED", "true").strip().lower() in ("1", "true", "yes"),
+            health_interval_seconds=float(os.environ.get("MCP_POOL_HEALTH_INTERVAL", 30)),
+            ping_timeout_seconds=float(os.environ.get("MCP_POOL_PING_TIMEOUT", 5)),
+            start_timeout_seconds=float(os.environ.get("MCP_POOL_START_TIMEOUT", 60)),
+            schema_cache_dir=os.environ.get("MCP_SCHEMA_CACHE_DIR", ".cache/mcp_tools"),
+            lazy=os.environ.get("MCP_LAZY", "false").strip().lower() in ("1", "true", "yes"),
+            idle_timeout_seconds=float(os.environ.get("MCP_IDLE_TIMEOUT", 0)),
+        )
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """Errores que indican que el proceso del servidor ya no está (frente a errores de la herramienta)."""
+    if isinstance(error, McpError):
+        return error.error.code == CONNECTION_CLOSED
+    return isinstance(error, (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream, OSError))
+
+
+class ServerSession:
+    """
+    Sesión de un servidor. La abre y la cierra una misma tarea (`_run`), como exigen los
+    contextos de anyio de `create_session`; el resto del pool solo usa `session`.
+    Todos los métodos se ejecutan en el bucle del pool.
+    """
+
+    def __init__(self, name: str, connection: dict, lazy: bool = False, idle_timeout: float = 0.0):
+        self.name = name
+        self.connection = connection
+        self.lazy = lazy
+        self.idle_timeout = idle_timeout
+        # Llamadas en curso y momento de la última, para la parada por inactividad
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+        self.session: Optional[ClientSession] = None
+        self.restarts = 0
+        # Milisegundos del último arranque (proceso + initialize)
+        self.startup_ms: Optional[float] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._error: Optional[BaseException] = None
+        self._lock = asyncio.Lock()
+
+    async def _run(self) -> None:
+        try:
+            # create_session añade PATH al `env` de la conexión que recibe
+            async with create_session(copy.deepcopy(self.connection)) as session:
+                await session.initialize()
+                self.session = session
+                self._ready.set()
+                await self._stop.wait()
+        except Exception as e:
+            self._error = e
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def ensure(self, timeout: float) -> ClientSession:
+        """Sesión abierta; arranca (o rearranca) el servidor si hace falta."""
+        async with self._lock:
+            if self.session is not None and self._runner is not None and not self._runner.done():
+                return self.session
+            if self._runner is not None:
+                await self._shutdown()
+                self.restarts += 1
+            self._ready, self._stop, self._error = asyncio.Event(), asyncio.Event(), None
+            self._runner = asyncio.create_task(self._run(), name=f"mcp-{self.name}")
+            started = time.perf_counter()
+            with trace(f"start:{self.name}", restart=self.restarts > 0):
+                try:
+                    await asyncio.wait_for(self._ready.wait(), timeout)
+                except asyncio.TimeoutError:
+                    await self._shutdown()
+                    raise RuntimeError(f"El servidor MCP '{self.name}' no arrancó en {timeout} s")
+            if self.session is None:
+                raise RuntimeError(f"No se pudo iniciar el servidor MCP '{self.name}': {self._error}")
+            self.startup_ms = round((time.perf_counter() - started) * 1000, 1)
+            return self.session
+
+    async def _shutdown(self) -> None:
+        if self._runner is None or self._runner.done():
+            return
+        self._stop.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._runner), 5)
+        except asyncio.TimeoutError:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+
+    async def ping(self, timeout: float) -> ClientSession:
+        """
+        Ping sin tomar el cerrojo, para no retrasar a las llamadas que arrancan el servidor.
+
+        Returns:
+            La sesión comprobada, que se pasa a `restart` si el ping falla.
+        """
+        session = self.session
+        if session is None or not self.alive:
+            raise RuntimeError("sesión cerrada")
+        await asyncio.wait_for(session.send_ping(), timeout)
+        return session
+
+    async def restart(self, timeout: float, session: Optional[ClientSession]) -> bool:
+        """
+        Reinicia el servidor tras un ping fallido.
+
+        Args:
+            session: Sesión que falló el ping (None si ya estaba cerrada). Solo se reinicia si
+                sigue siendo la actual y no hay llamadas en curso: si entretanto el servidor se
+                ha parado, reiniciado o está arrancando, o atiende una llamada larga, el fallo
+                no dice nada de la sesión actual.
+
+        Returns:
+            True si se ha reiniciado.
+        """
+        async with self._lock:
+            if session is not self.session or self.in_flight or self.starting or not self.started:
+                return False
+            await self._shutdown()
+            self.session = None
+        await self.ensure(timeout)
+        return True
+
+    async def close(self) -> None:
+        async with self._lock:
+            await self._shutdown()
+
+    @contextlib.contextmanager
+    def in_use(self):
+        """
+        Marca una petición en curso (llamada o listado de herramientas): mientras dure, ni la
+        parada por inactividad ni el chequeo de salud tocan el servidor. Un servidor cerrado con
+        una petición pendiente la deja esperando para siempre.
+        """
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.last_used = time.monotonic()
+
+    async def stop(self, only_if_idle: bool = False) -> bool:
+        """
+        Para el servidor como si no se hubiera arrancado nunca: no cuenta como reinicio, no
+        se vigila con pings y la próxima llamada lo vuelve a arrancar.
+
+        Args:
+            only_if_idle: Solo lo para si lleva `idle_timeout` segundos sin llamadas.
+        """
+        async with self._lock:
+            if only_if_idle and (
+                not self.idle_timeout
+                or not self.alive
+                or self.in_flight
+                or time.monotonic() - self.last_used < self.idle_timeout
+            ):
+                return False
+            await self._shutdown()
+            self._runner = None
+            return True
+
+    @property
+    def started(self) -> bool:
+        return self._runner is not None
+
+    @property
+    def starting(self) -> bool:
+        return self.session is None and self._runner is not None and not self._runner.done()
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._runner is not None and not self._runner.done()
+
+
+class PooledSession:
+    """Sustituto de ClientSession para las herramientas: envía cada llamada al bucle del pool."""
+
+    def __init__(self, pool: "MCPSessionPool", server: str):
+        self.pool = pool
+        self.server = server
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None):
+        return await self.pool.call_tool(self.server, name, arguments or {})
+
+
+class MCPSessionPool:
+    def __init__(
+            self,
+            connections: Dict[str, dict],
+            config: Optional[MCPPoolConfig] = None,
+            server_options: Optional[Dict[str, dict]] = None,
+            ):
+        """
+        Args:
+            connections: Conexiones de mcp_config.json, como las recibe MultiServerMCPClient.
+            config: Opciones del pool.
+            server_options: `lazy` e `idle_timeout` por servidor, que prevalecen sobre `config`.
+        """
+        self.connections = connections
+        self.config = config or MCPPoolConfig()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="mcp-pool", daemon=True)
+        self._thread.start()
+        server_options = server_options or {}
+        self.servers = {
+            name: ServerSession(
+                name,
+                connection,
+                lazy=bool(server_options.get(name, {}).get("lazy", self.config.lazy)),
+                idle_timeout=float(server_options.get(name, {}).get("idle_timeout", self.config.idle_timeout_seconds)),
+            )
+            for name, connection in connections.items()
+        }
+        self.schema_cache = ToolSchemaCache(self.config.schema_cache_dir) if self.config.schema_cache_dir else None
+        self._health = self._submit(self._health_loop())
+        atexit.register(self.close)
+
+    def _submit(self, coroutine: Awaitable) -> Future:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    async def _in_pool(self, coroutine: Awaitable):
+        """Ejecuta una corrutina en el bucle del pool desde cualquier otro bucle."""
+        return await asyncio.wrap_future(self._submit(coroutine))
+
+    async def _call(self, server: str, name: str, arguments: Dict[str, Any]):
+        server_session = self.servers[server]
+        # Ida y vuelta al servidor, para separar la latencia de stdio/HTTP de la del modelo
+        with trace(f"mcp:{server}/{name}"), server_session.in_use():
+            try:
+                session = await server_session.ensure(self.config.start_timeout_seconds)
+                return await session.call_tool(name, arguments)
+            except Exception as e:
+                if is_connection_error(e):
+                    # La siguiente llamada arranca un proceso nuevo
+                    await server_session.close()
+                raise
+
+    async def call_tool(self, server: str, name: str, arguments: Dict[str, Any]):
+        return await self._in_pool(self._call(server, name, arguments))
+
+    async def _list_tools(self, server: str) -> list:
+        with self.servers[server].in_use():
+            session = await self.servers[server].ensure(self.config.start_timeout_seconds)
+            tools, cursor = [], None
+            while True:
+                page = await session.list_tools(cursor=cursor)
+                tools.extend(page.tools)
+                if page.nextCursor is None:
+                    return tools
+                cursor = page.nextCursor
+
+    async def _start_servers(self, servers: List[str]) -> Dict[str, Any]:
+        """Arranca los servidores a la vez y lista sus herramientas; un error no detiene a los demás."""
+        results = await asyncio.gather(*(self._list_tools(server) for server in servers), return_exceptions=True)
+        listed = {}
+        for server, result in zip(servers, results):
+            if isinstance(result, BaseException):
+                print(f"Servidor MCP '{server}' no disponible: {result}")
+                continue
+            listed[server] = result
+            print(f"Servidor MCP '{server}' listo en {self.servers[server].startup_ms} ms ({len(result)} herramientas)")
+            if self.schema_cache is not None and self.schema_cache.save(server, self.connections[server], result):
+                print(f"Esquemas de herramientas de '{server}' actualizados en la caché")
+            if self.servers[server].lazy:
+                # Solo se arrancó para conocer sus herramientas
+                await self.servers[server].stop()
+        return listed
+
+    async def get_tools(self) -> List[BaseTool]:
+        """
+        Herramientas de todos los servidores, marcadas con su servidor en `metadata['mcp_server']`.
+
+        Los servidores con esquemas en la caché se arrancan en segundo plano (los perezosos
+        no se arrancan); solo se espera a los que no los tienen.
+        """
+        schemas = {}
+        if self.schema_cache is not None:
+            for server, connection in self.connections.items():
+                if (cached := self.schema_cache.load(server, connection)) is not None:
+                    schemas[server] = cached
+        missing = [server for server in self.servers if server not in schemas]
+        warm = [server for server in schemas if not self.servers[server].lazy]
+        if warm:
+            self._warmup = self._submit(self._start_servers(warm))
+        if missing:
+            schemas.update(await self._in_pool(self._start_servers(missing)))
+
+        tools = []
+        for server in self.servers:
+            for mcp_tool in schemas.get(server, []):
+                tool = convert_mcp_tool_to_langchain_tool(PooledSession(self, server), mcp_tool)
+                tool.metadata = {**(tool.metadata or {}), "mcp_server": server}
+                tools.append(tool)
+        return tools
+
+    async def _health_loop(self) -> None:
+        idle_timeouts = [s.idle_timeout for s in self.servers.values() if s.idle_timeout]
+        interval = min([self.config.health_interval_seconds] + [t / 2 for t in idle_timeouts])
+        while True:
+            await asyncio.sleep(interval)
+            for server in self.servers.values():
+                if await server.stop(only_if_idle=True):
+                    print(f"Servidor MCP '{server.name}' parado tras {server.idle_timeout:g} s sin uso")
+                if not server.started or server.starting or server.in_flight:
+                    # No arrancado, parado por inactividad, arrancando o atendiendo llamadas: una
+                    # llamada larga retrasaría el ping y un reinicio la cortaría
+                    continue
+                session = server.session
+                try:
+                    await server.ping(self.config.ping_timeout_seconds)
+                except Exception as e:
+                    try:
+                        if await server.restart(self.config.start_timeout_seconds, session):
+                            print(f"Servidor MCP '{server.name}' sin respuesta ({type(e).__name__}), reiniciado")
+                    except Exception as restart_error:
+                        print(f"No se pudo reiniciar '{server.name}': {restart_error}")
+
+    def stats(self) -> List[dict]:
+        return [
+            {"server": s.name, "alive": s.alive, "lazy": s.lazy, "restarts": s.restarts, "startup_ms": s.startup_ms}
+            for s in self.servers.values()
+        ]
+
+    async def _close_servers(self) -> None:
+        await asyncio.gather(*(server.close() for server in self.servers.values()), return_exceptions=True)
+
+    def close(self) -> None:
+        if not self._loop.is_running():
+            return
+        self._health.cancel()
+        try:
+            self._submit(self._close_servers()).result(timeout=10)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+_pools: Dict[str, MCPSessionPool] = {}
+
+
+def get_session_pool(
+        connections: Dict[str, dict],
+        config: Optional[MCPPoolConfig] = None,
+        server_options: Optional[Dict[str, dict]] = None,
+        ) -> MCPSessionPool:
+    """Pool del proceso para una configuración de servidores."""
+    key = json.dumps([connections, server_options], sort_keys=True, default=str)
+    if key not in _pools:
+        _pools[key] = MCPSessionPool(connections, config, server_options)
+    return _pools[key]
+
+
+async def load_tools(
+        connections: Dict[str, dict],
+        config: Optional[MCPPoolConfig] = None,
+        server_options: Optional[Dict[str, dict]] = None,
+        ) -> List[BaseTool]:
+    """Herramientas de los servidores MCP configurados, sobre sesiones persistentes si el pool está activo."""
+    config = config or MCPPoolConfig.from_env()
+    if config.enabled:
+        return await get_session_pool(connections, config, server_options).get_tools()
+
+    from langchain_mcp_adapters.client import MultiServerMCPClient
+    from scout.tool_exec import get_server_tools
+
+    return await get_server_tools(MultiServerMCPClient(connections=connections))
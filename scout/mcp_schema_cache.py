@@ -0,0 +1,69 @@
+"""
+Caché en disco de los esquemas de herramientas de los servidores MCP.
+
+Para construir el grafo solo hacen falta los nombres, descripciones y esquemas de las
+herramientas, no los servidores en marcha. ToolSchemaCache guarda la respuesta de
+`list_tools` de cada servidor con una clave que cambia si cambia el comando, sus
+argumentos, sus variables de entorno o el contenido de los scripts que ejecuta; con la
+caché el agente arranca sin esperar a que los servidores respondan.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import List, Optional
+
+from mcp.types import Tool as MCPTool
+
+
+def connection_key(connection: dict) -> str:
+    """Huella de la configuración de un servidor y de los ficheros que ejecuta."""
+    digest = hashlib.sha256()
+    # Las variables de entorno pueden ser secretos: solo entran en el hash
+    digest.update(json.dumps(connection, sort_keys=True, default=str).encode("utf-8"))
+    for arg in connection.get("args", []):
+        path = Path(str(arg))
+        if not (path.suffix and path.is_file()):
+            continue
+        # Un script de Python puede cargar los módulos de su directorio (p. ej. local_servers/host.py)
+        files = sorted(path.parent.glob("*.py")) if path.suffix == ".py" else [path]
+        for file in files:
+            digest.update(file.name.encode("utf-8"))
+            digest.update(file.read_bytes())
+    return digest.hexdigest()
+
+
+class ToolSchemaCache:
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def _path(self, server: str) -> Path:
+        return self.directory / f"{server}.json"
+
+    def load(self, server: str, connection: dict) -> Optional[List[MCPTool]]:
+        path = self._path(server)
+        if not path.exists():
+            return None
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("key") != connection_key(connection):
+                return None
+            return [MCPTool.model_validate(tool) for tool in data["tools"]]
+        except Exception as e:
+            print(f"Caché de herramientas de '{server}' no válida: {e}")
+            return None
+
+    def save(self, server: str, connection: dict, tools: List[MCPTool]) -> bool:
+        """Guarda los esquemas; devuelve True si han cambiado respecto a los guardados."""
+        data = {
+            "key": connection_key(connection),
+            "tools": [tool.model_dump(mode="json", exclude_none=True) for tool in tools],
+        }
+        path = self._path(server)
+        previous = path.read_text(encoding="utf-8") if path.exists() else None
+        content = json.dumps(data, ensure_ascii=False, indent=2)
+        if content == previous:
+            return False
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+        return True
@@ -33,13 +33,31 @@ def resolve_env_vars(config: dict) -> dict:
     return config
 
 
-config_file = Path(__file__).parent / "mcp_config.json"
+# MCP_CONFIG_FILE selects another config, e.g. mcp_config_host.json to run the local servers in one process
+config_file = Path(os.environ.get("MCP_CONFIG_FILE", "mcp_config.json"))
+if not config_file.is_absolute():
+    config_file = Path(__file__).parent / config_file
 if not config_file.exists():
-    raise FileNotFoundError(f"mcp_config.json file {config_file} does not exist")
+    raise FileNotFoundError(f"MCP config file {config_file} does not exist")
 
 with open(config_file, "r") as f:
     config = json.load(f)
 
+# Per-server options for the session pool (scout/mcp_pool.py), not part of the MCP connection
+SERVER_OPTIONS = ("lazy", "idle_timeout")
+
+
+def split_server_options(servers: dict) -> dict:
+    """Remove the pool options from each server config and return them by server name."""
+    options = {}
+    for server_name, server_config in servers.items():
+        options[server_name] = {
+            key: server_config.pop(key) for key in SERVER_OPTIONS if key in server_config
+        }
+    return options
+
+
 resolved_config = resolve_env_vars(config)
 # Extract the mcpServers dictionary for MultiServerMCPClient
 mcp_config = resolved_config["mcpServers"]
+mcp_server_options = split_server_options(mcp_config)
@@ -1,39 +1,394 @@
+import asyncio
+import glob
+import itertools
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
 import pandas as pd
-from mcp.server.fastmcp import FastMCP
-from typing import Optional
+from mcp.server.fastmcp import Context, FastMCP
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 import duckdb
 import os
 from dotenv import load_dotenv
 import subprocess
 
+from server_runtime import ClientState, run
+
 load_dotenv()
 
 # Initialize FastMCP server
 mcp = FastMCP("dataflow")
 
+# DuckDB table function for each file extension; compressed files (.csv.gz) are read transparently
+READERS = {
+    ".csv": "read_csv",
+    ".tsv": "read_csv",
+    ".txt": "read_csv",
+    ".parquet": "read_parquet",
+    ".json": "read_json",
+    ".jsonl": "read_json",
+    ".ndjson": "read_json",
+}
+COMPRESSIONS = (".gz", ".zst")
+
+
+def reader_for(file_path: str) -> str:
+    """DuckDB reader for a file path or glob pattern (data/*.parquet)."""
+    path = Path(file_path)
+    if path.suffix.lower() in COMPRESSIONS:
+        path = path.with_suffix("")
+    reader = READERS.get(path.suffix.lower())
+    if reader is None:
+        raise ValueError(f"Unsupported file type: {file_path}. Supported: {', '.join(READERS)}")
+    return reader
+
+
+def sql_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+# Rows returned per page of a query result, and the most a single page may ask for
+PAGE_ROWS = int(os.environ.get("DATAFLOW_PAGE_ROWS", 50))
+MAX_PAGE_ROWS = int(os.environ.get("DATAFLOW_MAX_PAGE_ROWS", 500))
+# Longer cell values are truncated in the output
+MAX_CELL_CHARS = int(os.environ.get("DATAFLOW_MAX_CELL_CHARS", 80))
+# Query results kept per session, for dataflow_fetch_page and to answer repeated queries;
+# the least recently used are dropped beyond this count or this memory
+KEEP_RESULTS = int(os.environ.get("DATAFLOW_KEEP_RESULTS", 20))
+RESULT_CACHE_BYTES = int(float(os.environ.get("DATAFLOW_RESULT_CACHE_MB", 256)) * 1024 * 1024)
+# Rows of a query result that are materialized; the rest are dropped and the result is marked as truncated
+MAX_RESULT_ROWS = int(os.environ.get("DATAFLOW_MAX_RESULT_ROWS", 100_000))
+# DuckDB schema of the materialized query results, outside the user's tables
+RESULTS_SCHEMA = "results"
+
+TABLE_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+QUOTED = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""")
+COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+# Statement types that only read; anything else (INSERT, UPDATE, CREATE, DROP, ...) may change the tables
+READ_ONLY = {duckdb.StatementType.SELECT, duckdb.StatementType.EXPLAIN}
+# Queries whose result changes between runs are never reused
+NONDETERMINISTIC = re.compile(
+    r"\b(random|uuid|gen_random_uuid|setseed|nextval|now|today|current_date|current_time|current_timestamp)\b"
+)
+
+
+def normalize_sql(query: str) -> str:
+    """Same text for queries that only differ in case, whitespace, comments or a trailing semicolon."""
+    parts = QUOTED.split(query)
+    # Even parts are outside string literals and quoted identifiers
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r"\s+", " ", COMMENT.sub(" ", parts[i])).lower()
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def check_table_name(name: str) -> str:
+    if not TABLE_NAME.match(name):
+        raise ValueError(f"Invalid table name {name!r}: use letters, digits and underscores")
+    # DuckDB resolves names case-insensitively
+    return name.lower()
+
+
+@dataclass
+class TableInfo:
+    """A loaded table with its schema and row count, computed at load time and after every statement that writes."""
+    name: str
+    source: str
+    kind: str  # "table" (copied into memory) or "view" (reads the files on every query)
+    columns: List[Tuple[str, str]]
+    row_count: int
+    # Changes on every load and write, so cached query results over the previous data are not reused
+    version: int
+
+    def version_key(self) -> tuple:
+        if self.kind == "view":
+            # A view reads its files on every query: a modified file also changes the result
+            files = tuple(sorted((path, os.path.getmtime(path)) for path in glob.glob(self.source)))
+            return (self.name, self.version, files)
+        return (self.name, self.version)
+
+    def summary(self) -> str:
+        return f"{self.name} ({self.kind}, {self.row_count} rows, {len(self.columns)} columns) from {self.source}"
+
+    def describe(self) -> str:
+        lines = [self.summary()] + [f"  {column}: {dtype}" for column, dtype in self.columns]
+        return "\n".join(lines)
+
+
+@dataclass
+class QueryResult:
+    """A query result materialized in DuckDB, read page by page."""
+    result_id: str
+    row_count: int
+    # Cache key of the query, None if the result cannot be reused
+    key: Optional[tuple] = None
+    # Memory taken by the result in DuckDB
+    nbytes: int = 0
+    # The query returned more than MAX_RESULT_ROWS rows; only the first ones are kept
+    truncated: bool = False
+    # Set for a result larger than RESULT_CACHE_BYTES: it is not kept, each page runs the query again
+    query: Optional[str] = None
+    # Versions of the tables the query read; a result that is not kept expires when they change
+    tables: tuple = ()
+
+
+def format_cell(value) -> str:
+    text = "" if value is None or (isinstance(value, float) and value != value) else str(value)
+    if len(text) > MAX_CELL_CHARS:
+        return text[:MAX_CELL_CHARS - 3] + "..."
+    return text
+
+
+def format_page(result: QueryResult, page: pd.DataFrame, offset: int) -> str:
+    """CSV page with a header line telling the model how to fetch the rest."""
+    if result.row_count == 0:
+        return f"Query returned 0 rows. Columns: {', '.join(map(str, page.columns))}"
+    if page.empty:
+        return f"No rows at offset {offset}: result {result.result_id} has {result.row_count} rows."
+    end = offset + len(page)
+    header = f"Rows {offset + 1}-{end} of {result.row_count} (result_id: {result.result_id})."
+    if result.truncated:
+        header += f" The query returned more rows; only the first {result.row_count} are kept: filter or aggregate in SQL."
+    if end < result.row_count:
+        header += f" More rows: dataflow_fetch_page(result_id='{result.result_id}', offset={end})."
+    return header + "\n" + page.map(format_cell).to_csv(index=False).rstrip("\n")
+
+
 class DataFlowSession:
     def __init__(self):
-        self.data: Optional[pd.DataFrame]  = None
+        # Loaded tables by name
+        self.tables: Dict[str, TableInfo] = {}
         self.working_dir = os.environ.get("MCP_FILESYSTEM_DIR", None)
+        # One connection for the whole session: the catalog and DuckDB's caches survive between queries
+        self.con = duckdb.connect(database=':memory:')
+        self.con.execute(f"CREATE SCHEMA {RESULTS_SCHEMA}")
+        # A DuckDB connection must not be used from two threads at once
+        self.lock = asyncio.Lock()
+        # Materialized query results, oldest first
+        self.results: "OrderedDict[str, QueryResult]" = OrderedDict()
+        self._result_ids = itertools.count(1)
+        self._versions = itertools.count(1)
+        # Cache key (normalized SQL, versions of the tables it reads) -> result_id
+        self.cache: Dict[tuple, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
-    async def load_data(self, file_path: str) -> str:
+    def _relation_kind(self, name: str) -> Optional[str]:
+        """Kind of a relation as DuckDB has it now (SQL may have replaced it since the load); None if missing."""
+        row = self.con.execute(
+            "SELECT 'table' FROM duckdb_tables() WHERE schema_name = 'main' AND table_name = ? "
+            "UNION ALL SELECT 'view' FROM duckdb_views() WHERE schema_name = 'main' AND view_name = ?",
+            [name, name],
+        ).fetchone()
+        return row[0] if row else None
+
+    def _drop_relation(self, name: str):
+        if (kind := self._relation_kind(name)) is not None:
+            self.con.execute(f"DROP {kind.upper()} {name}")
+
+    def _describe(self, name: str) -> Tuple[List[Tuple[str, str]], int]:
+        columns = [(row[0], row[1]) for row in self.con.execute(f"DESCRIBE {name}").fetchall()]
+        row_count = self.con.execute(f"SELECT count(*) FROM {name}").fetchone()[0]
+        return columns, row_count
+
+    def _load(self, file_path: str, table_name: str, materialize: bool) -> TableInfo:
+        source = f"{reader_for(file_path)}({sql_string(file_path)})"
+        kind = "table" if materialize else "view"
+        staging = f"__loading_{table_name}"
+        self._drop_relation(staging)
         try:
-            self.data = pd.read_csv(file_path)
-            return f"Data loaded from {file_path}"
+            # DuckDB's readers are parallel and never build a pandas copy of the file
+            self.con.execute(f"CREATE {kind.upper()} {staging} AS SELECT * FROM {source}")
+            columns, row_count = self._describe(staging)
+            # The previous table with this name (loaded, or created by SQL) is only replaced once the new one has loaded
+            self._drop_relation(table_name)
+            self.tables.pop(table_name, None)
+            self.con.execute(f"ALTER {kind.upper()} {staging} RENAME TO {table_name}")
+        finally:
+            # Left over only if the load failed
+            self._drop_relation(staging)
+        info = TableInfo(table_name, file_path, kind, columns, row_count, next(self._versions))
+        self.tables[table_name] = info
+        self._invalidate(table_name)
+        return info
+
+    def _refresh(self):
+        """Update the catalog after a statement that may have changed, replaced or dropped tables."""
+        for name, info in list(self.tables.items()):
+            kind = self._relation_kind(name)
+            if kind is None:
+                del self.tables[name]
+                continue
+            info.kind = kind
+            info.columns, info.row_count = self._describe(name)
+            info.version = next(self._versions)
+        self._invalidate()
+
+    async def load_data(self, file_path: str, table_name: str = "data", materialize: Optional[bool] = None) -> str:
+        try:
+            table_name = check_table_name(table_name)
+            if materialize is None:
+                # Parquet is cheap to rescan; text formats are parsed once into DuckDB's columnar storage
+                materialize = reader_for(file_path) != "read_parquet"
+            async with self.lock:
+                info = await asyncio.to_thread(self._load, file_path, table_name, materialize)
+            return f"Data loaded into {info.describe()}"
         except Exception as e:
             return f"Error loading data: {str(e)}"
-    
-    async def query_data(self, query: str) -> str:
-        if self.data is None:
+
+    async def list_tables(self) -> str:
+        if not self.tables:
             return "No data loaded."
-        
+        return "\n".join(info.summary() for info in self.tables.values())
+
+    async def describe_table(self, table_name: str) -> str:
+        table_name = table_name.lower()
+        if table_name not in self.tables:
+            return f"Unknown table {table_name!r}. Loaded tables: {', '.join(self.tables) or 'none'}"
+        return self.tables[table_name].describe()
+
+    async def drop_table(self, table_name: str) -> str:
+        table_name = table_name.lower()
+        async with self.lock:
+            if table_name not in self.tables:
+                return f"Unknown table {table_name!r}. Loaded tables: {', '.join(self.tables) or 'none'}"
+            try:
+                self._drop_relation(table_name)
+            except Exception as e:
+                return f"Error dropping table: {str(e)}"
+            del self.tables[table_name]
+            self._invalidate(table_name)
+        return f"Table {table_name} dropped."
+
+    def _page(self, result: QueryResult, offset: int, limit: int) -> pd.DataFrame:
+        # A truncated result may hold one row past row_count
+        limit = max(min(limit, result.row_count - offset), 0)
+        if result.query is not None:
+            return self.con.sql(result.query).limit(limit, offset).fetchdf()
+        return self.con.execute(
+            f"FROM {RESULTS_SCHEMA}.{result.result_id} LIMIT ? OFFSET ?", [limit, offset]
+        ).fetchdf()
+
+    def _tables_read(self, normalized: str) -> tuple:
+        return tuple(
+            info.version_key() for name, info in sorted(self.tables.items())
+            if re.search(rf"\b{name}\b", normalized)
+        )
+
+    def _cache_key(self, query: str) -> Optional[tuple]:
+        normalized = normalize_sql(query)
+        if NONDETERMINISTIC.search(normalized):
+            return None
+        tables = self._tables_read(normalized)
+        # Queries that read no loaded table (e.g. read_csv of a file) cannot be invalidated
+        if not tables:
+            return None
+        return (normalized, tables)
+
+    def _invalidate(self, table_name: Optional[str] = None):
+        """Stop reusing the results that read a table, or all of them. They can still be paged."""
+        for key, result_id in list(self.cache.items()):
+            if table_name is None or any(table[0] == table_name for table in key[1]):
+                del self.cache[key]
+                self.results[result_id].key = None
+
+    def _memory_bytes(self) -> int:
+        return self.con.execute("SELECT sum(memory_usage_bytes) FROM duckdb_memory()").fetchone()[0] or 0
+
+    def _evict(self):
+        total = sum(result.nbytes for result in self.results.values())
+        # The newest result, never larger than RESULT_CACHE_BYTES, is always kept so that it can be paged
+        while len(self.results) > 1 and (len(self.results) > KEEP_RESULTS or total > RESULT_CACHE_BYTES):
+            _, dropped = self.results.popitem(last=False)
+            # A result read again on each page has no table left
+            if dropped.query is None:
+                self.con.execute(f"DROP TABLE {RESULTS_SCHEMA}.{dropped.result_id}")
+            if dropped.key is not None:
+                del self.cache[dropped.key]
+            total -= dropped.nbytes
+            self.evictions += 1
+
+    def _execute(self, query: str, limit: int) -> str:
+        # Every statement counts: `SELECT ...; DELETE ...` writes
+        read_only = all(statement.type in READ_ONLY for statement in self.con.extract_statements(query))
+        key = self._cache_key(query) if read_only else None
+        if key is not None and key in self.cache:
+            self.hits += 1
+            result = self.results[self.cache[key]]
+            self.results.move_to_end(result.result_id)
+            return format_page(result, self._page(result, 0, limit), 0)
+        try:
+            relation = self.con.sql(query)
+        finally:
+            # INSERT, DELETE, CREATE, ... may change any table, even when they fail halfway
+            if not read_only:
+                self._refresh()
+        if relation is None:
+            return "Query executed."
+        self.misses += 1
+        result = QueryResult(f"res_{next(self._result_ids)}", 0, tables=self._tables_read(normalize_sql(query)))
+        table = f"{RESULTS_SCHEMA}.{result.result_id}"
+        before = self._memory_bytes()
+        # The result stays in DuckDB's columnar storage; only the requested page reaches pandas.
+        # One row past the cap tells whether the result was truncated.
+        relation.limit(MAX_RESULT_ROWS + 1).create(table)
+        result.nbytes = max(self._memory_bytes() - before, 0)
+        row_count = self.con.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+        result.truncated = row_count > MAX_RESULT_ROWS
+        result.row_count = min(row_count, MAX_RESULT_ROWS)
+        # Too large to keep: pages run the query again with LIMIT/OFFSET. Not for a write
+        # (INSERT ... RETURNING), which must not run twice and whose rows are already capped
+        if result.nbytes > RESULT_CACHE_BYTES and read_only:
+            self.con.execute(f"DROP TABLE {table}")
+            result.nbytes = 0
+            result.query = query.strip().rstrip(";")
+        self.results[result.result_id] = result
+        if key is not None:
+            result.key = key
+            self.cache[key] = result.result_id
+        self._evict()
+        return format_page(result, self._page(result, 0, limit), 0)
+
+    async def query_data(self, query: str, limit: Optional[int] = None) -> str:
+        if not self.tables:
+            return "No data loaded."
+
         try:
-            con = duckdb.connect(database=':memory:')
-            con.register('data', self.data)
-            result = con.execute(query).fetchdf()
-            return result.to_string()
+            limit = min(max(limit or PAGE_ROWS, 1), MAX_PAGE_ROWS)
+            # In a worker thread so a long query does not block the other clients of a shared server
+            async with self.lock:
+                return await asyncio.to_thread(self._execute, query, limit)
         except Exception as e:
             return f"Error executing query: {str(e)}"
+
+    async def fetch_page(self, result_id: str, offset: int, limit: Optional[int] = None) -> str:
+        try:
+            limit = min(max(limit or PAGE_ROWS, 1), MAX_PAGE_ROWS)
+            async with self.lock:
+                if result_id not in self.results:
+                    return f"Unknown or expired result {result_id!r}. Run the query again."
+                result = self.results[result_id]
+                if result.query is not None and result.tables != self._tables_read(normalize_sql(result.query)):
+                    return f"Result {result_id!r} expired: its tables changed. Run the query again."
+                self.results.move_to_end(result_id)
+                page = await asyncio.to_thread(self._page, result, max(offset, 0), limit)
+            return format_page(result, page, max(offset, 0))
+        except Exception as e:
+            return f"Error fetching page: {str(e)}"
+
+    async def cache_stats(self) -> str:
+        stats = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "cached_queries": len(self.cache),
+            "results": len(self.results),
+            "bytes": sum(result.nbytes for result in self.results.values()),
+            "not_kept": sum(result.query is not None for result in self.results.values()),
+            "max_bytes": RESULT_CACHE_BYTES,
+            "evictions": self.evictions,
+        }
+        return "\n".join(f"{name}: {value}" for name, value in stats.items())
         
     async def create_new_project(self, project_name: str) -> str:
         try:
@@ -43,48 +398,110 @@ class DataFlowSession:
                 raise ValueError(f"Project {project_name} already exists.")
             
             os.mkdir(project_dir)
-            os.chdir(project_dir)
-            subprocess.run(["uv", "init", "."], check=True)
-            subprocess.run(["git", "init"], check=True)
-            subprocess.run(["mkdir", "data"], check=True)
-            subprocess.run(["git", "add", "."], check=True)
-            subprocess.run(["git", "commit", "-m", "Initial commit"], check=True)
+            # No chdir: the working directory is process-wide and the server may be shared by several clients
+            subprocess.run(["uv", "init", "."], check=True, cwd=project_dir)
+            subprocess.run(["git", "init"], check=True, cwd=project_dir)
+            subprocess.run(["mkdir", "data"], check=True, cwd=project_dir)
+            subprocess.run(["git", "add", "."], check=True, cwd=project_dir)
+            subprocess.run(["git", "commit", "-m", "Initial commit"], check=True, cwd=project_dir)
 
             return f"Project {project_name} created."
         except Exception as e:
             return f"Error creating project: {str(e)}"
     
-session = DataFlowSession()
+# One session per connected client
+sessions = ClientState(DataFlowSession)
+
+
+def page_sizes(function):
+    """Fill the page sizes, which can be changed from the environment, into a tool docstring."""
+    function.__doc__ = function.__doc__.format(page_rows=PAGE_ROWS, max_page_rows=MAX_PAGE_ROWS)
+    return function
+
 
 @mcp.tool()
-async def dataflow_load_data(file_path: str) -> str:
-    """Load data from a file into the session.
+async def dataflow_load_data(
+    file_path: str, ctx: Context, table_name: str = "data", materialize: Optional[bool] = None
+) -> str:
+    """Load data from a CSV, Parquet or JSON file into a named table of the session.
+    Loading into an existing table name replaces that table; other tables are kept.
 
     Args:
-        file_path: The absolute path to the file.
+        file_path: The absolute path to the file, or a glob pattern such as /data/sales_*.parquet.
+        table_name: Name of the table to create (letters, digits and underscores).
+        materialize: True to copy the data into memory, False to read the files on every query.
+            By default CSV and JSON are copied and Parquet is read in place.
     """
-    return await session.load_data(file_path)
+    return await sessions.get(ctx).load_data(file_path, table_name, materialize)
 
 
 @mcp.tool()
-async def dataflow_query_data(sql_query: str) -> str:
-    """Query the loaded data. The data must first be loaded using the dataflow_load_data tool. The data is in the table `data`. 
+async def dataflow_list_tables(ctx: Context) -> str:
+    """List the loaded tables with their source file, row count and number of columns."""
+    return await sessions.get(ctx).list_tables()
+
+
+@mcp.tool()
+async def dataflow_describe_table(table_name: str, ctx: Context) -> str:
+    """Show the columns and types of a loaded table.
+
+    Args:
+        table_name: The name of the table.
+    """
+    return await sessions.get(ctx).describe_table(table_name)
+
+
+@mcp.tool()
+async def dataflow_drop_table(table_name: str, ctx: Context) -> str:
+    """Remove a loaded table from the session and free its memory.
+
+    Args:
+        table_name: The name of the table.
+    """
+    return await sessions.get(ctx).drop_table(table_name)
+
+
+@mcp.tool()
+@page_sizes
+async def dataflow_query_data(sql_query: str, ctx: Context, limit: Optional[int] = None) -> str:
+    """Query the loaded tables. The data must first be loaded using the dataflow_load_data tool; it is in the table `data` unless another table name was given. Tables can be joined.
+    Returns the total row count and the first rows as CSV; long cells are truncated. Use dataflow_fetch_page with the result_id to read more rows, and prefer aggregations over reading many rows.
 
     Args:
         sql_query: A valid SQL query.
+        limit: Number of rows to return ({page_rows} by default, at most {max_page_rows}).
     """
-    return await session.query_data(sql_query)
+    return await sessions.get(ctx).query_data(sql_query, limit)
+
+
+@mcp.tool()
+@page_sizes
+async def dataflow_fetch_page(result_id: str, offset: int, ctx: Context, limit: Optional[int] = None) -> str:
+    """Read more rows of a previous dataflow_query_data result.
+
+    Args:
+        result_id: The result_id returned by dataflow_query_data.
+        offset: Number of rows to skip from the start of the result.
+        limit: Number of rows to return ({page_rows} by default, at most {max_page_rows}).
+    """
+    return await sessions.get(ctx).fetch_page(result_id, offset, limit)
+
+
+@mcp.tool()
+async def dataflow_cache_stats(ctx: Context) -> str:
+    """Show the hits, misses and memory of the query result cache of this session."""
+    return await sessions.get(ctx).cache_stats()
 
 
 @mcp.tool()
-async def dataflow_create_new_project(project_name: str) -> str:
+async def dataflow_create_new_project(project_name: str, ctx: Context) -> str:
     """Create a new project. This will create a new directory with the project name and initialize a git repository.
 
     Args:
         project_name: The name of the project.
     """
-    return await session.create_new_project(project_name)
+    return await sessions.get(ctx).create_new_project(project_name)
 
 
 if __name__ == "__main__":
-    mcp.run(transport='stdio')
\ No newline at end of file
+    run(mcp, port=8101)
\ No newline at end of file
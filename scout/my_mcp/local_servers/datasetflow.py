@@ -2,13 +2,15 @@ import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 import scipy.stats as stats
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
 from typing import Optional
 import duckdb
 import os
 from dotenv import load_dotenv
 import subprocess
 
+from server_runtime import ClientState, run
+
 load_dotenv()
 
 mcp = FastMCP("datasetflow")
@@ -111,33 +113,33 @@ class DatasetFlowSession:
             })
         return pd.DataFrame(results).to_string(index=False)
 
-# Instancia global
-session = DatasetFlowSession()
+# Una sesión por cliente conectado
+sessions = ClientState(DatasetFlowSession)
 
 @mcp.tool()
-async def load_random_dataset() -> str:
+async def load_random_dataset(ctx: Context) -> str:
     """Carga 1000 filas aleatorias del dataset 'mpg' y devuelve descripción."""
-    return await session.load_random_dataset()
+    return await sessions.get(ctx).load_random_dataset()
 
 @mcp.tool()
-async def query_data(sql_query: str) -> str:
+async def query_data(sql_query: str, ctx: Context) -> str:
     """Ejecuta una consulta SQL sobre el dataset cargado."""
-    return await session.query_data(sql_query)
+    return await sessions.get(ctx).query_data(sql_query)
 
 @mcp.tool()
-async def visualize_variable(column: str) -> str:
+async def visualize_variable(column: str, ctx: Context) -> str:
     """Visualiza histograma, qq-plot y boxplot de la columna numérica."""
-    return await session.visualize_variable(column)
+    return await sessions.get(ctx).visualize_variable(column)
 
 @mcp.tool()
-async def visualize_correlation() -> str:
+async def visualize_correlation(ctx: Context) -> str:
     """Genera y guarda heatmap de correlaciones."""
-    return await session.visualize_correlation()
+    return await sessions.get(ctx).visualize_correlation()
 
 @mcp.tool()
-async def normality_test() -> str:
+async def normality_test(ctx: Context) -> str:
     """Aplica test de normalidad Shapiro-Wilk a todas las variables numéricas."""
-    return await session.normality_test()
+    return await sessions.get(ctx).normality_test()
 
 if __name__ == "__main__":
-    mcp.run(transport='stdio')
\ No newline at end of file
+    run(mcp, port=8102)
\ No newline at end of file
@@ -0,0 +1,88 @@
+import argparse
+import importlib.util
+import os
+from pathlib import Path
+from typing import Dict, List
+
+from mcp.server.fastmcp import FastMCP
+from mcp.types import ToolAnnotations
+from dotenv import load_dotenv
+
+from server_runtime import add_transport_args, run
+
+load_dotenv()
+
+# Local servers that can be mounted in the host, with the namespace of their tools
+LOCAL_SERVERS: Dict[str, str] = {
+    "dataflow": "dataflow",
+    "datasetflow": "datasetflow",
+    "math_mcp": "math",
+    "weather": "weather",
+    "knowledge_base": "kb",
+}
+DEFAULT_SERVERS = ["dataflow", "datasetflow", "math_mcp", "weather"]
+
+# Initialize FastMCP server
+mcp = FastMCP("local")
+
+
+def namespaced(namespace: str, tool_name: str) -> str:
+    """Prefix a tool name with its server namespace unless it already has it (dataflow_query_data)."""
+    if tool_name.startswith(f"{namespace}_"):
+        return tool_name
+    return f"{namespace}_{tool_name}"
+
+
+def load_server(name: str) -> FastMCP:
+    """Import a local server module from this directory and return its FastMCP instance."""
+    spec = importlib.util.spec_from_file_location(f"local_servers.{name}", Path(__file__).parent / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.mcp
+
+
+def mount_servers(host: FastMCP, servers: List[str]) -> Dict[str, str]:
+    """
+    Register the tools of each local server in the host. The modules share one interpreter,
+    so pandas, duckdb and the MCP runtime are imported once.
+
+    The annotations of each tool carry the server it comes from (`mounted_from`) and its
+    name there (`mounted_name`), so that the agent's settings keyed by tool or server name
+    (TOOL_TIMEOUTS, TOOL_ROUTER_ALWAYS, PREFETCH_TOOL) match in both modes.
+
+    Returns:
+        Namespaced tool name -> original tool name.
+    """
+    mounted = {}
+    for server in servers:
+        namespace = LOCAL_SERVERS[server]
+        # FastMCP has no public API to enumerate the registered functions
+        for tool in load_server(server)._tool_manager.list_tools():
+            name = namespaced(namespace, tool.name)
+            if name in mounted:
+                raise ValueError(f"Tool {name} is defined by more than one server")
+            annotations = ToolAnnotations(
+                **(tool.annotations.model_dump(exclude_none=True) if tool.annotations else {}),
+                mounted_from=server,
+                mounted_name=tool.name,
+            )
+            host.add_tool(tool.fn, name=name, description=tool.description, annotations=annotations)
+            mounted[name] = tool.name
+    return mounted
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run several local MCP servers in one process.")
+    parser.add_argument(
+        "--servers",
+        default=os.environ.get("MCP_HOST_SERVERS", ",".join(DEFAULT_SERVERS)),
+        help=f"Comma separated servers to mount, from: {', '.join(LOCAL_SERVERS)}",
+    )
+    add_transport_args(parser, port=8100)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    mount_servers(mcp, [name.strip() for name in args.servers.split(",") if name.strip()])
+    run(mcp, port=8100, args=args)
@@ -0,0 +1,71 @@
+import sys
+from pathlib import Path
+from mcp.server.fastmcp import FastMCP
+from typing import Optional
+from dotenv import load_dotenv
+
+# The MCP client runs this file as a script: make the `scout` package importable without installing it
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from scout.knowledge.retrieval import format_results, format_sections
+from scout.knowledge.store import KnowledgeBaseStore, build_filter
+from server_runtime import run
+
+load_dotenv()
+
+# Initialize FastMCP server
+mcp = FastMCP("knowledge_base")
+
+store = KnowledgeBaseStore()
+
+
+@mcp.tool()
+async def kb_search(
+        query: str,
+        area: Optional[str] = None,
+        source: Optional[str] = None,
+        drive_folder: Optional[str] = None,
+        doc_type: Optional[str] = None,
+        mime_type: Optional[str] = None,
+        modified_after: Optional[str] = None,
+        modified_before: Optional[str] = None,
+        limit: int = 5,
+        mode: str = "sections",
+        token_budget: Optional[int] = None,
+        ) -> str:
+    """Semantic search over the company knowledge base (B2B and nómina documents). Use the optional filters to scope the search.
+
+    Args:
+        query: What to search for, in natural language.
+        area: Business area, e.g. 'b2b' or 'nomina'.
+        source: Exact relative path of a document.
+        drive_folder: Google Drive folder the documents come from.
+        doc_type: File extension without dot, e.g. 'pdf', 'docx', 'md'.
+        mime_type: MIME type of the original document.
+        modified_after: Only documents modified on or after this RFC 3339 date.
+        modified_before: Only documents modified on or before this RFC 3339 date.
+        limit: Maximum number of results.
+        mode: 'sections' returns the whole document sections (markdown heading or PDF page) that contain the best matches, deduplicated; 'chunks' returns the matching fragments only.
+        token_budget: Approximate maximum size of the result in tokens ('sections' mode only).
+    """
+    try:
+        query_filter = build_filter(
+            area=area,
+            source=source,
+            drive_folder=drive_folder,
+            mime_type=mime_type,
+            doc_type=doc_type,
+            modified_after=modified_after,
+            modified_before=modified_before,
+        )
+        if mode == "chunks":
+            return format_results(store.search(query, limit=limit, query_filter=query_filter))
+        return format_sections(store.search_sections(
+            query, limit=limit, query_filter=query_filter, token_budget=token_budget
+        ))
+    except Exception as e:
+        return f"Error searching knowledge base: {str(e)}"
+
+
+if __name__ == "__main__":
+    run(mcp, port=8105)
@@ -1,5 +1,7 @@
 from mcp.server.fastmcp import FastMCP
 
+from server_runtime import run
+
 mcp = FastMCP("arith")
 
 @mcp.tool()
@@ -25,4 +27,4 @@ def div(a: float, b: float) -> float:
     return a / b
 
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
\ No newline at end of file
+    run(mcp, port=8103)
\ No newline at end of file
@@ -0,0 +1,51 @@
+import argparse
+import os
+import weakref
+from typing import Callable, Generic, Optional, TypeVar
+
+from mcp.server.fastmcp import Context, FastMCP
+
+TRANSPORTS = ("stdio", "streamable-http")
+
+T = TypeVar("T")
+
+
+def add_transport_args(parser: argparse.ArgumentParser, port: int) -> None:
+    parser.add_argument(
+        "--transport",
+        choices=TRANSPORTS,
+        default=os.environ.get("MCP_TRANSPORT", "stdio"),
+        help="stdio (one private process per client) or streamable-http (one shared server)",
+    )
+    parser.add_argument("--host", default=os.environ.get("MCP_HTTP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=port)
+
+
+def run(mcp: FastMCP, port: int, args: Optional[argparse.Namespace] = None) -> None:
+    """Run a local server over stdio or, shared by many agents, over streamable HTTP at http://host:port/mcp."""
+    if args is None:
+        parser = argparse.ArgumentParser(description=f"Run the {mcp.name} MCP server.")
+        add_transport_args(parser, port)
+        args = parser.parse_args()
+    if args.transport == "streamable-http":
+        mcp.settings.host = args.host
+        mcp.settings.port = args.port
+    mcp.run(transport=args.transport)
+
+
+class ClientState(Generic[T]):
+    """
+    State kept per MCP client session. Over streamable HTTP every agent connected to the
+    shared server gets its own state (e.g. its own loaded DataFrame); the state is dropped
+    when the client session goes away.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self.factory = factory
+        self._states: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+    def get(self, ctx: Context) -> T:
+        client = ctx.session
+        if client not in self._states:
+            self._states[client] = self.factory()
+        return self._states[client]
@@ -2,6 +2,8 @@ from typing import Any
 import httpx
 from mcp.server.fastmcp import FastMCP
 
+from server_runtime import run
+
 # Initialize FastMCP server
 mcp = FastMCP("weather")
 
@@ -91,4 +93,4 @@ Forecast: {period['detailedForecast']}
 
 if __name__ == "__main__":
     # Initialize and run the server
-    mcp.run(transport='stdio')
\ No newline at end of file
+    run(mcp, port=8104)
\ No newline at end of file
@@ -0,0 +1,215 @@
+"""
+Recuperación especulativa de la base de conocimiento.
+
+En una pregunta sobre la base de conocimiento el agente llama a Gemini, espera a que
+pida `kb_search`, ejecuta la búsqueda y vuelve a llamar a Gemini. Prefetcher lanza la
+misma búsqueda con el mensaje del usuario en paralelo con la primera llamada al LLM:
+
+- Modo 'tool': si el modelo llama a `kb_search` con una consulta parecida, la
+  herramienta devuelve el resultado ya calculado en lugar de ir al servidor MCP.
+- Modo 'context': si la búsqueda termina en `context_wait_ms`, el resultado se añade
+  al prompt de sistema y el modelo puede responder sin llamar a la herramienta.
+
+Cada búsqueda especulativa termina como acierto ('hit' o 'context') o desperdicio
+('waste'); las tasas están en `Prefetcher.stats()` y en las trazas.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool, StructuredTool
+
+from scout.knowledge.embeddings import Embedder
+from scout.tool_exec import tool_aliases
+from scout.tracing import Span, get_tracer
+
+
+# Argumentos de kb_search con los que su resultado coincide con el de la búsqueda especulativa
+PREFETCH_DEFAULT_ARGS = {"limit": 5, "mode": "sections", "token_budget": None}
+
+
+@dataclass
+class PrefetchConfig:
+    """
+    Attributes:
+        enabled: Activa la búsqueda especulativa.
+        mode: 'tool' (se entrega a la llamada a la herramienta) o 'context' (se inyecta en el prompt).
+        tool_name: Herramienta de recuperación cuyo resultado se anticipa, con cualquiera de sus
+            nombres (ver `tool_aliases`).
+        match_threshold: Similitud mínima entre la consulta del modelo y el mensaje del usuario.
+        context_wait_ms: Espera máxima por el resultado en modo 'context'.
+        workers: Hilos para las búsquedas especulativas.
+    """
+    enabled: bool = True
+    mode: str = "tool"
+    tool_name: str = "kb_search"
+    match_threshold: float = 0.8
+    context_wait_ms: float = 150.0
+    workers: int = 4
+
+    @classmethod
+    def from_env(cls) -> "PrefetchConfig":
+        return cls(
+            enabled=os.environ.get("PREFETCH_ENABLED", "true").strip().lower() in ("1", "true", "yes"),
+            mode=os.environ.get("PREFETCH_MODE", "tool").strip().lower(),
+            tool_name=os.environ.get("PREFETCH_TOOL", "kb_search"),
+            match_threshold=float(os.environ.get("PREFETCH_MATCH_THRESHOLD", 0.8)),
+            context_wait_ms=float(os.environ.get("PREFETCH_CONTEXT_WAIT_MS", 150)),
+            workers=int(os.environ.get("PREFETCH_WORKERS", 4)),
+        )
+
+
+@dataclass
+class PrefetchEntry:
+    query: str
+    future: Future
+    started: float = field(default_factory=time.perf_counter)
+    outcome: Optional[str] = None
+
+
+class Prefetcher:
+    def __init__(self, config: PrefetchConfig, embedder: Optional[Embedder] = None, store=None):
+        """
+        Args:
+            config: Modo y umbrales.
+            embedder: Modelo de embeddings compartido con el resto del agente.
+            store: KnowledgeBaseStore; por defecto se crea con la configuración del entorno.
+        """
+        self.config = config
+        self.embedder = embedder or Embedder()
+        self._store = store
+        self._executor = ThreadPoolExecutor(max_workers=config.workers, thread_name_prefix="prefetch")
+        self._pending: Dict[str, PrefetchEntry] = {}
+        self._lock = threading.Lock()
+        self.counts = {"started": 0, "hit": 0, "context": 0, "waste": 0, "error": 0}
+
+    @property
+    def store(self):
+        if self._store is None:
+            from scout.knowledge.store import KnowledgeBaseStore
+
+            self._store = KnowledgeBaseStore(embedder=self.embedder)
+        return self._store
+
+    def _search(self, query: str) -> tuple:
+        from scout.knowledge.retrieval import format_sections
+
+        # Igual que kb_search(query) con sus valores por defecto
+        text = format_sections(self.store.search_sections(query, limit=PREFETCH_DEFAULT_ARGS["limit"]))
+        vector = np.asarray(self.embedder.embed_query(query), dtype=np.float32)
+        return text, vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def start(self, thread_id: str, query: str) -> None:
+        """Lanza la búsqueda para el turno que empieza; la del turno anterior, si no se usó, se desperdicia."""
+        entry = PrefetchEntry(query=query, future=self._executor.submit(self._search, query))
+        with self._lock:
+            previous = self._pending.get(thread_id)
+            self._pending[thread_id] = entry
+            self.counts["started"] += 1
+        if previous is not None:
+            self._finish(previous, "waste")
+
+    def finish_turn(self, thread_id: str) -> None:
+        """El turno ha terminado: si el resultado no se usó, cuenta como desperdicio."""
+        with self._lock:
+            entry = self._pending.pop(thread_id, None)
+        if entry is not None:
+            self._finish(entry, "waste")
+
+    def _finish(self, entry: PrefetchEntry, outcome: str) -> None:
+        if entry.outcome is not None:
+            return
+        if outcome == "waste" and entry.future.done() and entry.future.exception() is not None:
+            outcome = "error"
+        entry.outcome = outcome
+        with self._lock:
+            self.counts[outcome] += 1
+        if tracer := get_tracer():
+            tracer.record(Span(
+                kind="prefetch",
+                name=f"{self.config.tool_name}:{outcome}",
+                start=time.time(),
+                duration_ms=(time.perf_counter() - entry.started) * 1000,
+                attributes={"query_chars": len(entry.query)},
+            ))
+
+    def context(self, thread_id: str) -> Optional[str]:
+        """Resultado para inyectar en el prompt si ya está disponible (modo 'context')."""
+        entry = self._pending.get(thread_id)
+        if entry is None or entry.outcome is not None:
+            return None
+        try:
+            text, _ = entry.future.result(timeout=self.config.context_wait_ms / 1000)
+        except FutureTimeoutError:
+            return None
+        except Exception:
+            self._finish(entry, "error")
+            return None
+        self._finish(entry, "context")
+        return text
+
+    async def take(self, thread_id: Optional[str], args: Dict[str, Any]) -> Optional[str]:
+        """Resultado especulativo para una llamada a la herramienta, si corresponde a la misma consulta."""
+        entry = self._pending.get(thread_id) if thread_id else None
+        query = args.get("query")
+        if entry is None or entry.outcome is not None or not query:
+            return None
+        # Con filtros u otros parámetros el resultado de la herramienta sería distinto
+        if any(args.get(k) not in (None, PREFETCH_DEFAULT_ARGS.get(k)) for k in args if k != "query"):
+            return None
+        try:
+            text, vector = await asyncio.wrap_future(entry.future)
+        except Exception:
+            self._finish(entry, "error")
+            return None
+        if query.strip() != entry.query.strip():
+            other = np.asarray(self.embedder.embed_query(query), dtype=np.float32)
+            if float(vector @ (other / max(float(np.linalg.norm(other)), 1e-12))) < self.config.match_threshold:
+                return None
+        self._finish(entry, "hit")
+        return text
+
+    def wrap_tools(self, tools: Sequence[BaseTool]) -> List[BaseTool]:
+        """
+        Sustituye la herramienta de recuperación por una que consulta antes el resultado
+        especulativo. Se aplica antes que ToolExecutor, para que también un acierto respete
+        sus plazos y límites de concurrencia.
+        """
+        return [self._wrap(tool) if self.config.tool_name in tool_aliases(tool) else tool for tool in tools]
+
+    def _wrap(self, tool: BaseTool) -> BaseTool:
+        async def run(config: RunnableConfig, **kwargs):
+            thread_id = config.get("configurable", {}).get("thread_id")
+            text = await self.take(thread_id, kwargs)
+            if text is None:
+                if tool.coroutine is not None:
+                    return await tool.coroutine(**kwargs)
+                return await asyncio.to_thread(tool.func, **kwargs)
+            # Las herramientas MCP devuelven (contenido, artefacto)
+            return (text, None) if tool.response_format == "content_and_artifact" else text
+
+        return StructuredTool(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            coroutine=run,
+            response_format=tool.response_format,
+            metadata=tool.metadata,
+            handle_tool_error=tool.handle_tool_error,
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+        finished = counts["hit"] + counts["context"] + counts["waste"] + counts["error"]
+        counts["hit_rate"] = round((counts["hit"] + counts["context"]) / finished, 3) if finished else 0.0
+        counts["waste_rate"] = round(counts["waste"] / finished, 3) if finished else 0.0
+        return counts
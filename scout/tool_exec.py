@@ -0,0 +1,168 @@
+"""
+Ejecución de las llamadas a herramientas con límites de concurrencia y plazos.
+
+Cuando Gemini pide varias herramientas en un mismo paso, ToolNode las lanza a la vez
+sin ningún control: un servidor lento (el tiempo, los gráficos) puede bloquear el
+turno entero y muchas llamadas simultáneas al mismo servidor stdio compiten entre sí.
+ToolExecutor envuelve cada herramienta para que:
+
+- Las llamadas independientes se ejecuten en paralelo, con un máximo global y otro
+  por servidor MCP.
+- Cada llamada tenga un plazo (por herramienta o por servidor); si se supera, el
+  modelo recibe un resultado de error estructurado en lugar de esperar indefinidamente.
+
+Así el tiempo de un paso con varias herramientas es el de la más lenta.
+"""
+
+import asyncio
+import inspect
+import json
+import os
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool, StructuredTool, ToolException
+
+
+# Servidor de las herramientas que no vienen de un servidor MCP (p. ej. read_tool_output)
+LOCAL_SERVER = "local"
+
+
+def parse_limits(value: str) -> Dict[str, float]:
+    """'weather=20,dataflow=120' -> {'weather': 20.0, 'dataflow': 120.0}"""
+    limits = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, limit = item.split("=", 1)
+            limits[name.strip()] = float(limit)
+    return limits
+
+
+@dataclass
+class ToolExecutionConfig:
+    """
+    Attributes:
+        timeout_seconds: Plazo por defecto de cada llamada.
+        timeouts: Plazos por nombre de herramienta o de servidor (la herramienta tiene prioridad);
+            ver `tool_aliases` y `server_aliases`.
+        max_concurrency: Llamadas simultáneas en total.
+        server_concurrency: Llamadas simultáneas por defecto a un mismo servidor.
+        server_limits: Llamadas simultáneas por servidor concreto.
+    """
+    timeout_seconds: float = 60.0
+    timeouts: Dict[str, float] = field(default_factory=dict)
+    max_concurrency: int = 8
+    server_concurrency: int = 4
+    server_limits: Dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_env(cls) -> "ToolExecutionConfig":
+        return cls(
+            timeout_seconds=float(os.environ.get("TOOL_TIMEOUT_SECONDS", 60)),
+            timeouts=parse_limits(os.environ.get("TOOL_TIMEOUTS", "")),
+            max_concurrency=int(os.environ.get("TOOL_MAX_CONCURRENCY", 8)),
+            server_concurrency=int(os.environ.get("TOOL_SERVER_CONCURRENCY", 4)),
+            server_limits=parse_limits(os.environ.get("TOOL_SERVER_LIMITS", "")),
+        )
+
+    def timeout_for(self, tool_names: Sequence[str], servers: Sequence[str]) -> float:
+        for name in list(tool_names) + list(servers):
+            if name in self.timeouts:
+                return self.timeouts[name]
+        return self.timeout_seconds
+
+    def limit_for(self, server: str) -> int:
+        return int(self.server_limits.get(server, self.server_concurrency))
+
+
+def tool_server(tool: BaseTool) -> str:
+    return (tool.metadata or {}).get("mcp_server", LOCAL_SERVER)
+
+
+def tool_aliases(tool: BaseTool) -> Tuple[str, ...]:
+    """
+    Nombres con los que la configuración se refiere a una herramienta. host.py añade a las
+    herramientas el prefijo de su servidor (`add` -> `math_add`) y anota el nombre original,
+    así que el nombre de la herramienta en su servidor vale tanto en modo host como con un
+    proceso por servidor.
+    """
+    metadata = tool.metadata or {}
+    return tuple(dict.fromkeys(name for name in (tool.name, metadata.get("mounted_name")) if name))
+
+
+def server_aliases(tool: BaseTool) -> Tuple[str, ...]:
+    """Servidor MCP de la herramienta y, en modo host, el servidor local del que se montó (`math_mcp`)."""
+    metadata = tool.metadata or {}
+    return tuple(dict.fromkeys(name for name in (tool_server(tool), metadata.get("mounted_from")) if name))
+
+
+async def get_server_tools(client) -> List[BaseTool]:
+    """Herramientas de un MultiServerMCPClient marcadas con su servidor en `metadata['mcp_server']`."""
+    servers = list(client.connections)
+    # Los servidores arrancan a la vez para listar sus herramientas
+    results = await asyncio.gather(*(client.get_tools(server_name=server) for server in servers))
+    tools = []
+    for server_name, server_tools in zip(servers, results):
+        for tool in server_tools:
+            tool.metadata = {**(tool.metadata or {}), "mcp_server": server_name}
+            tools.append(tool)
+    return tools
+
+
+class ToolExecutor:
+    def __init__(self, config: ToolExecutionConfig):
+        self.config = config
+        # Los semáforos de asyncio pertenecen a un bucle de eventos y Streamlit crea uno por mensaje
+        self._semaphores: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+    def _semaphore(self, key: Optional[str]) -> asyncio.Semaphore:
+        per_loop = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        if key not in per_loop:
+            limit = self.config.max_concurrency if key is None else self.config.limit_for(key)
+            per_loop[key] = asyncio.Semaphore(max(limit, 1))
+        return per_loop[key]
+
+    def wrap_tools(self, tools: Sequence[BaseTool]) -> List[BaseTool]:
+        return [self._wrap(tool) for tool in tools]
+
+    def _wrap(self, tool: BaseTool) -> BaseTool:
+        server = tool_server(tool)
+        timeout = self.config.timeout_for(tool_aliases(tool), server_aliases(tool))
+
+        # Herramientas ya envueltas (p. ej. por Prefetcher) que necesitan la configuración de la ejecución
+        wants_config = tool.coroutine is not None and "config" in inspect.signature(tool.coroutine).parameters
+
+        async def call(config: RunnableConfig, **kwargs):
+            if wants_config:
+                return await tool.coroutine(config=config, **kwargs)
+            if tool.coroutine is not None:
+                return await tool.coroutine(**kwargs)
+            return await asyncio.to_thread(tool.func, **kwargs)
+
+        async def run(config: RunnableConfig, **kwargs):
+            async with self._semaphore(None), self._semaphore(server):
+                started = time.perf_counter()
+                try:
+                    return await asyncio.wait_for(call(config, **kwargs), timeout)
+                except asyncio.TimeoutError:
+                    raise ToolException(json.dumps({
+                        "status": "timeout",
+                        "tool": tool.name,
+                        "server": server,
+                        "timeout_seconds": timeout,
+                        "elapsed_seconds": round(time.perf_counter() - started, 2),
+                        "message": "The tool did not answer in time. Retry with a smaller request or continue without this result.",
+                    }))
+
+        return StructuredTool(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            coroutine=run,
+            response_format=tool.response_format,
+            metadata=tool.metadata,
+            handle_tool_error=True,
+        )
@@ -0,0 +1,270 @@
+"""
+Compactación de las salidas grandes de herramientas.
+
+Cualquier salida de herramienta (una página de resultados de `dataflow_query_data`, una
+tabla de `datasetflow`, un documento) entra tal cual en `state.messages`, desde donde se
+reenvía a Gemini en cada llamada posterior. El nodo `compact`, justo después de `tools`, sustituye cada
+salida que supera `max_tokens` por un resumen:
+
+- Tablas (salida de `DataFrame.to_string()` o CSV, como las páginas de resultados de
+  `dataflow_query_data`): dimensiones, primeras y últimas filas y estadísticas de las
+  columnas numéricas.
+- Texto: el comienzo y el final.
+
+La salida completa se guarda en ToolOutputStore y el modelo puede leerla por páginas
+con la herramienta `read_tool_output` y la referencia que aparece en el resumen.
+"""
+
+import csv
+import io
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+import pandas as pd
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.tools import BaseTool, tool
+
+
+READ_TOOL_NAME = "read_tool_output"
+# Línea con la que dataflow presenta cada página de resultados, antes de la cabecera CSV
+PAGE_HEADER = re.compile(r"^Rows \d+-\d+ of \d+ ")
+
+
+@dataclass
+class ToolOutputConfig:
+    """
+    Attributes:
+        enabled: Si es False las salidas entran completas en el historial.
+        max_tokens: Tamaño (tokens aproximados) a partir del cual se compacta una salida.
+        preview_rows: Filas del principio y del final que se muestran de una tabla.
+        page_chars: Tamaño máximo de cada página de `read_tool_output`.
+        store_max_bytes: Memoria total para las salidas completas; se descartan las más antiguas.
+    """
+    enabled: bool = True
+    max_tokens: int = 1000
+    preview_rows: int = 5
+    page_chars: int = 4000
+    store_max_bytes: int = 64 * 1024 * 1024
+
+    @classmethod
+    def from_env(cls) -> "ToolOutputConfig":
+        return cls(
+            enabled=os.environ.get("TOOL_OUTPUT_COMPACT", "true").strip().lower() in ("1", "true", "yes"),
+            max_tokens=int(os.environ.get("TOOL_OUTPUT_MAX_TOKENS", 1000)),
+            preview_rows=int(os.environ.get("TOOL_OUTPUT_PREVIEW_ROWS", 5)),
+            page_chars=int(os.environ.get("TOOL_OUTPUT_PAGE_CHARS", 4000)),
+            store_max_bytes=int(os.environ.get("TOOL_OUTPUT_STORE_MAX_BYTES", 64 * 1024 * 1024)),
+        )
+
+
+@dataclass
+class StoredOutput:
+    tool_name: str
+    lines: List[str]
+    # Cabecera de la tabla (una o más líneas), que se repite en cada página
+    header: Optional[str] = None
+    size: int = 0
+
+
+class ToolOutputStore:
+    """Salidas completas de herramientas por referencia, con límite de memoria (LRU)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._outputs: "OrderedDict[str, StoredOutput]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, tool_name: str, content: str, header_lines: int = 0) -> str:
+        """
+        Args:
+            header_lines: Líneas de cabecera de una tabla, que se repiten en cada página (0 si no es una tabla).
+        """
+        lines = content.splitlines()
+        output = StoredOutput(
+            tool_name=tool_name,
+            lines=lines[header_lines:],
+            header="\n".join(lines[:header_lines]) if header_lines else None,
+            size=len(content.encode("utf-8")),
+        )
+        ref = f"out-{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self._outputs[ref] = output
+            self._bytes += output.size
+            while self._bytes > self.max_bytes and len(self._outputs) > 1:
+                _, dropped = self._outputs.popitem(last=False)
+                self._bytes -= dropped.size
+        return ref
+
+    def get(self, ref: str) -> Optional[StoredOutput]:
+        with self._lock:
+            output = self._outputs.get(ref)
+            if output is not None:
+                self._outputs.move_to_end(ref)
+            return output
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"outputs": len(self._outputs), "bytes": self._bytes}
+
+
+def parse_csv_table(lines: List[str]) -> Optional[Tuple[pd.DataFrame, int]]:
+    """Tabla CSV, opcionalmente precedida por la línea de página de dataflow."""
+    skip = 1 if PAGE_HEADER.match(lines[0]) else 0
+    body = lines[skip:]
+    if len(body) < 2:
+        return None
+    # Todas las filas con el mismo número de campos, al menos dos
+    widths = {len(row) for row in csv.reader(body)}
+    if len(widths) != 1 or widths.pop() < 2:
+        return None
+    try:
+        frame = pd.read_csv(io.StringIO("\n".join(body)))
+    except Exception:
+        return None
+    # Una celda entre comillas con saltos de línea descuadraría la paginación por líneas
+    if len(frame) != len(body) - 1:
+        return None
+    return frame, skip + 1
+
+
+def parse_table(content: str) -> Optional[Tuple[pd.DataFrame, int]]:
+    """
+    Vuelve a leer una tabla CSV o la salida de `DataFrame.to_string()`.
+
+    Returns:
+        La tabla y su número de líneas de cabecera, o None si el texto no es una tabla.
+    """
+    lines = content.splitlines()
+    if len(lines) < 3:
+        return None
+    if (parsed := parse_csv_table(lines)) is not None:
+        return parsed
+    try:
+        frame = pd.read_fwf(io.StringIO(content))
+    except Exception:
+        return None
+    if len(frame) != len(lines) - 1 or frame.shape[1] < 2:
+        return None
+    # La primera columna sin nombre es el índice del DataFrame
+    if str(frame.columns[0]).startswith("Unnamed"):
+        frame = frame.set_index(frame.columns[0])
+        frame.index.name = None
+    return frame, 1
+
+
+def table_preview(content: str, frame: pd.DataFrame, rows: int, header_lines: int = 1) -> str:
+    lines = content.splitlines()
+    header, body = lines[:header_lines], lines[header_lines:]
+    parts = [f"Table with {len(frame)} rows x {frame.shape[1]} columns: {', '.join(map(str, frame.columns))}"]
+    if len(body) > 2 * rows:
+        parts.append("\n".join(header + body[:rows] + ["..."] + body[-rows:]))
+    else:
+        parts.append("\n".join(lines))
+    numeric = frame.select_dtypes("number")
+    if not numeric.empty:
+        stats = numeric.agg(["min", "max", "mean"]).T
+        parts.append(f"Numeric columns:\n{stats.to_string(float_format=lambda v: f'{v:.6g}')}")
+    return "\n\n".join(parts)
+
+
+def text_preview(content: str, max_chars: int) -> str:
+    head, tail = int(max_chars * 0.7), int(max_chars * 0.2)
+    return f"{content[:head]}\n[... {len(content) - head - tail} characters omitted ...]\n{content[-tail:]}"
+
+
+def compact_output(message: ToolMessage, store: ToolOutputStore, config: ToolOutputConfig) -> Tuple[ToolMessage, str]:
+    """Sustituye (mismo id) una salida grande por su resumen y la referencia a la salida completa."""
+    content = str(message.content)
+    table = parse_table(content)
+    ref = store.put(message.name or "tool", content, header_lines=table[1] if table else 0)
+    if table is not None:
+        preview = table_preview(content, table[0], config.preview_rows, table[1])
+        unit = "rows"
+    else:
+        preview = text_preview(content, config.max_tokens * 4)
+        unit = "lines"
+    note = (
+        f"[Output compacted: {len(content)} characters, {len(store.get(ref).lines)} {unit}. "
+        f"Full output stored as ref='{ref}'; call {READ_TOOL_NAME}(ref='{ref}', offset=0, limit=50) to page through it.]"
+    )
+    compacted = ToolMessage(
+        id=message.id,
+        tool_call_id=message.tool_call_id,
+        name=message.name,
+        content=f"{preview}\n\n{note}",
+        status=message.status,
+        additional_kwargs={**message.additional_kwargs, "compacted": True, "tool_output_ref": ref},
+    )
+    return compacted, ref
+
+
+def build_read_tool(store: ToolOutputStore, config: ToolOutputConfig) -> BaseTool:
+    """Herramienta local (sin servidor MCP) para leer por páginas una salida compactada."""
+
+    @tool(READ_TOOL_NAME)
+    def read_tool_output(ref: str, offset: int = 0, limit: int = 50) -> str:
+        """Read a page of a tool output that was compacted in the conversation. Tables keep their header on every page.
+
+        Args:
+            ref: Reference shown in the compacted output, e.g. 'out-1a2b3c4d5e6f'.
+            offset: First line (or table row) to return, starting at 0.
+            limit: Maximum number of lines (or table rows) to return.
+        """
+        output = store.get(ref)
+        if output is None:
+            return f"Error: unknown or expired output reference '{ref}'."
+        offset, limit = max(offset, 0), max(limit, 1)
+        page, size = [], 0
+        for line in output.lines[offset:offset + limit]:
+            if page and size + len(line) + 1 > config.page_chars:
+                break
+            page.append(line[:config.page_chars])
+            size += len(line) + 1
+        end = offset + len(page)
+        footer = f"[{output.tool_name} output, lines {offset}-{max(end - 1, offset)} of {len(output.lines)}"
+        footer += f"; next offset={end}]" if end < len(output.lines) else "; end of output]"
+        body = ([output.header] if output.header else []) + page
+        return "\n".join(body + [footer])
+
+    return read_tool_output
+
+
+def build_compact_node(store: ToolOutputStore, config: ToolOutputConfig) -> Callable:
+    """Crea el nodo que compacta las salidas de herramientas del último paso."""
+
+    def compact_tool_outputs(state) -> dict:
+        new_outputs: List[BaseMessage] = []
+        for message in reversed(state.messages):
+            if isinstance(message, AIMessage):
+                break
+            new_outputs.append(message)
+
+        updates = []
+        for message in new_outputs:
+            if (
+                isinstance(message, ToolMessage)
+                and message.name != READ_TOOL_NAME
+                and not message.additional_kwargs.get("compacted")
+                and count_tokens_approximately([message]) > config.max_tokens
+            ):
+                updates.append(compact_output(message, store, config)[0])
+        return {"messages": updates} if updates else {}
+
+    return compact_tool_outputs
+
+
+_stores: dict = {}
+
+
+def build_tool_output_store(config: ToolOutputConfig) -> ToolOutputStore:
+    """Almacén del proceso, compartido por todos los grafos (p. ej. al reconstruir el agente en Streamlit)."""
+    if config.store_max_bytes not in _stores:
+        _stores[config.store_max_bytes] = ToolOutputStore(config.store_max_bytes)
+    return _stores[config.store_max_bytes]
@@ -0,0 +1,131 @@
+"""
+Selección de herramientas por turno.
+
+Con todos los servidores MCP activos, enlazar todas las herramientas al LLM y listarlas
+en el prompt de sistema supone un coste fijo de tokens en cada llamada. ToolRouter
+mantiene un índice de embeddings sobre las descripciones de las herramientas y en cada
+turno elige solo las `top_k` más parecidas a la petición del usuario, más las que ya se
+están usando en la conversación.
+"""
+
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+import numpy as np
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.tools import BaseTool
+
+from scout.knowledge.embeddings import Embedder
+from scout.tool_exec import tool_aliases
+
+
+@dataclass
+class ToolRouterConfig:
+    """
+    Attributes:
+        enabled: Si es False se enlazan siempre todas las herramientas.
+        top_k: Herramientas elegidas por similitud en cada turno.
+        always_include: Herramientas que se enlazan siempre (p. ej. las de proyectos), con
+            cualquiera de sus nombres (ver `tool_aliases`).
+        sticky_turns: Turnos del usuario cuyas herramientas usadas se mantienen enlazadas.
+        cache_size: Conjuntos de herramientas enlazadas que se guardan en caché.
+    """
+    enabled: bool = True
+    top_k: int = 8
+    always_include: List[str] = field(default_factory=list)
+    sticky_turns: int = 2
+    cache_size: int = 32
+
+    @classmethod
+    def from_env(cls) -> "ToolRouterConfig":
+        return cls(
+            enabled=os.environ.get("TOOL_ROUTER_ENABLED", "true").strip().lower() in ("1", "true", "yes"),
+            top_k=int(os.environ.get("TOOL_ROUTER_TOP_K", 8)),
+            always_include=[
+                name.strip() for name in os.environ.get("TOOL_ROUTER_ALWAYS", "").split(",") if name.strip()
+            ],
+            sticky_turns=int(os.environ.get("TOOL_ROUTER_STICKY_TURNS", 2)),
+            cache_size=int(os.environ.get("TOOL_ROUTER_CACHE_SIZE", 32)),
+        )
+
+
+def tool_document(tool: BaseTool) -> str:
+    """Texto con el que se indexa una herramienta."""
+    return f"{tool.name.replace('_', ' ')}: {tool.description}"
+
+
+class ToolRouter:
+    def __init__(
+            self,
+            tools: Sequence[BaseTool],
+            config: Optional[ToolRouterConfig] = None,
+            embedder: Optional[Embedder] = None,
+            ):
+        """
+        Args:
+            tools: Todas las herramientas disponibles, en el orden en que se enlazan.
+            config: Parámetros de selección; por defecto los del entorno.
+            embedder: Modelo de embeddings; por defecto el de la base de conocimiento.
+        """
+        self.tools = list(tools)
+        self.config = config or ToolRouterConfig.from_env()
+        self.embedder = embedder or Embedder()
+        self._names = [tool.name for tool in self.tools]
+        self._always = {
+            tool.name for tool in self.tools if set(tool_aliases(tool)) & set(self.config.always_include)
+        }
+        self._matrix: Optional[np.ndarray] = None
+        self._query_cache: "OrderedDict[str, List[str]]" = OrderedDict()
+
+        self.active = self.config.enabled and len(self.tools) > self.config.top_k + len(self._always)
+        if self.active:
+            try:
+                self._matrix = self._normalize(self.embedder.embed_documents([tool_document(t) for t in self.tools]))
+            except Exception as e:
+                # Sin modelo de embeddings el agente funciona igual, solo que con todas las herramientas
+                print(f"No se pudo indexar las herramientas, se enlazarán todas: {e}")
+                self.active = False
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        return matrix / np.maximum(np.linalg.norm(matrix, axis=-1, keepdims=True), 1e-12)
+
+    def rank(self, query: str) -> List[str]:
+        """Nombres de las `top_k` herramientas más parecidas a la consulta."""
+        if query in self._query_cache:
+            self._query_cache.move_to_end(query)
+            return self._query_cache[query]
+        scores = self._matrix @ self._normalize(self.embedder.embed_query(query))
+        names = [self._names[i] for i in np.argsort(-scores)[:self.config.top_k]]
+        self._query_cache[query] = names
+        if len(self._query_cache) > self.config.cache_size:
+            self._query_cache.popitem(last=False)
+        return names
+
+    def select(self, messages: Sequence[BaseMessage]) -> List[BaseTool]:
+        """
+        Herramientas a enlazar para el siguiente paso de la conversación.
+
+        Returns:
+            Un subconjunto de `tools` en su orden original, de modo que la misma
+            selección produce siempre la misma firma (y el mismo prompt).
+        """
+        if not self.active:
+            return self.tools
+
+        human_indexes = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+        if not human_indexes:
+            return self.tools
+        query = str(messages[human_indexes[-1]].content)
+
+        selected = self._always | set(self.rank(query))
+        # Las herramientas que ya se están usando siguen disponibles en los pasos siguientes
+        if self.config.sticky_turns > 0:
+            start = human_indexes[-min(self.config.sticky_turns, len(human_indexes))]
+            for message in messages[start:]:
+                if isinstance(message, AIMessage):
+                    selected.update(call["name"] for call in message.tool_calls)
+        return [tool for tool in self.tools if tool.name in selected]
@@ -0,0 +1,239 @@
+"""
+Trazas de latencia del agente.
+
+TracingCallbackHandler se engancha al grafo como callback de LangChain y registra un
+span por cada ejecución de nodo (`history`, `scout`, `tools`), cada llamada al LLM
+(tokens y tiempo hasta el primer fragmento) y cada llamada a una herramienta MCP
+(tamaño de la entrada y de la salida). Los spans se guardan en memoria para el panel de
+métricas de Streamlit y se añaden a un fichero JSONL para analizarlos después.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+
+
+@dataclass
+class TracingConfig:
+    """
+    Attributes:
+        enabled: Si es False el grafo no registra spans.
+        path: Fichero JSONL donde se añaden los spans; vacío para no exportar.
+        buffer_size: Spans que se mantienen en memoria para las métricas.
+    """
+    enabled: bool = True
+    path: str = "traces/spans.jsonl"
+    buffer_size: int = 5000
+
+    @classmethod
+    def from_env(cls) -> "TracingConfig":
+        return cls(
+            enabled=os.environ.get("TRACE_ENABLED", "true").strip().lower() in ("1", "true", "yes"),
+            path=os.environ.get("TRACE_FILE", "traces/spans.jsonl"),
+            buffer_size=int(os.environ.get("TRACE_BUFFER_SIZE", 5000)),
+        )
+
+
+@dataclass
+class Span:
+    """
+    Attributes:
+        kind: 'node', 'llm', 'tool' o 'mcp'.
+        name: Nombre del nodo, del modelo o de la herramienta.
+        start: Inicio (epoch, segundos).
+        duration_ms: Duración en milisegundos.
+        thread_id: Hilo de conversación, si se conoce.
+        attributes: Tokens, tamaños en caracteres, tiempo hasta el primer token, error...
+    """
+    kind: str
+    name: str
+    start: float
+    duration_ms: float
+    thread_id: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+class Tracer:
+    def __init__(self, path: Optional[str] = None, buffer_size: int = 5000):
+        self.path = Path(path) if path else None
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.spans: deque = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+            if self.path:
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(json.dumps(asdict(span), ensure_ascii=False, default=str) + "\n")
+
+    @contextmanager
+    def span(self, name: str, kind: str = "mcp", thread_id: Optional[str] = None, **attributes) -> Iterator[dict]:
+        """Mide un bloque de código; los atributos se pueden completar dentro del bloque."""
+        start, started = time.time(), time.perf_counter()
+        try:
+            yield attributes
+        except BaseException as e:
+            attributes["error"] = type(e).__name__
+            raise
+        finally:
+            self.record(Span(
+                kind=kind,
+                name=name,
+                start=start,
+                duration_ms=(time.perf_counter() - started) * 1000,
+                thread_id=thread_id,
+                attributes=attributes,
+            ))
+
+    def stats(self, kind: Optional[str] = None) -> List[dict]:
+        """Latencia por (tipo, nombre): número de spans, p50, p95, máximo y errores."""
+        with self._lock:
+            spans = [s for s in self.spans if kind is None or s.kind == kind]
+        grouped: Dict[tuple, List[Span]] = {}
+        for span in spans:
+            grouped.setdefault((span.kind, span.name), []).append(span)
+
+        rows = []
+        for (span_kind, name), group in sorted(grouped.items()):
+            durations = np.array([s.duration_ms for s in group])
+            rows.append({
+                "kind": span_kind,
+                "name": name,
+                "count": len(group),
+                "p50_ms": round(float(np.percentile(durations, 50)), 1),
+                "p95_ms": round(float(np.percentile(durations, 95)), 1),
+                "max_ms": round(float(durations.max()), 1),
+                "errors": sum(1 for s in group if "error" in s.attributes),
+            })
+        return rows
+
+
+def payload_size(value: Any) -> int:
+    if isinstance(value, BaseMessage):
+        return len(str(value.content))
+    return len(value) if isinstance(value, str) else len(str(value))
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Convierte los callbacks de LangChain/LangGraph en spans."""
+
+    # Se ejecuta en el mismo hilo que el grafo para que los tiempos no incluyan colas del executor
+    run_inline = True
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        self._runs: Dict[UUID, tuple] = {}
+
+    def _start(self, run_id: UUID, kind: str, name: str, metadata: Optional[dict], **attributes) -> None:
+        thread_id = (metadata or {}).get("thread_id")
+        self._runs[run_id] = (kind, name, time.time(), time.perf_counter(), thread_id, attributes)
+
+    def _end(self, run_id: UUID, **attributes) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        kind, name, start, started, thread_id, span_attributes = run
+        span_attributes.update(attributes)
+        self.tracer.record(Span(
+            kind=kind,
+            name=name,
+            start=start,
+            duration_ms=(time.perf_counter() - started) * 1000,
+            thread_id=str(thread_id) if thread_id is not None else None,
+            attributes=span_attributes,
+        ))
+
+    # Nodos del grafo
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, metadata=None, name=None, **kwargs) -> Any:
+        node = (metadata or {}).get("langgraph_node")
+        # Solo la ejecución del propio nodo, no los runnables internos (escrituras de canales, etc.)
+        if node and name == node:
+            self._start(run_id, "node", node, metadata, step=metadata.get("langgraph_step"))
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs) -> Any:
+        self._end(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> Any:
+        self._end(run_id, error=type(error).__name__)
+
+    # Llamadas al LLM
+    def on_chat_model_start(self, serialized, messages: List[List[BaseMessage]], *, run_id: UUID, metadata=None, **kwargs) -> Any:
+        name = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name") or "llm"
+        self._start(
+            run_id, "llm", name, metadata,
+            node=(metadata or {}).get("langgraph_node"),
+            messages=len(messages[0]),
+            request_chars=sum(payload_size(m) for m in messages[0]),
+        )
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs) -> Any:
+        run = self._runs.get(run_id)
+        if run is not None and "first_token_ms" not in run[5]:
+            run[5]["first_token_ms"] = round((time.perf_counter() - run[3]) * 1000, 1)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs) -> Any:
+        attributes = {}
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        message = getattr(generation, "message", None)
+        if message is not None:
+            usage = getattr(message, "usage_metadata", None) or {}
+            attributes = {
+                "input_tokens": usage.get("input_tokens"),
+                "output_tokens": usage.get("output_tokens"),
+                "response_chars": payload_size(message),
+                "tool_calls": len(getattr(message, "tool_calls", []) or []),
+                "cache": message.response_metadata.get("cache"),
+            }
+        self._end(run_id, **attributes)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> Any:
+        self._end(run_id, error=type(error).__name__)
+
+    # Herramientas (llamadas a los servidores MCP)
+    def on_tool_start(self, serialized, input_str: str, *, run_id: UUID, metadata=None, **kwargs) -> Any:
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self._start(run_id, "tool", name, metadata, input_chars=len(input_str or ""))
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs) -> Any:
+        self._end(run_id, output_chars=payload_size(output))
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> Any:
+        self._end(run_id, error=type(error).__name__)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer(config: Optional[TracingConfig] = None) -> Optional[Tracer]:
+    """Tracer del proceso, compartido por el grafo, el cliente y Streamlit; None si está desactivado."""
+    global _tracer
+    config = config or TracingConfig.from_env()
+    if not config.enabled:
+        return None
+    if _tracer is None:
+        _tracer = Tracer(path=config.path or None, buffer_size=config.buffer_size)
+    return _tracer
+
+
+@contextmanager
+def trace(name: str, kind: str = "mcp", **attributes) -> Iterator[dict]:
+    """`Tracer.span` sobre el tracer del proceso; no mide nada si las trazas están desactivadas."""
+    tracer = get_tracer()
+    if tracer is None:
+        yield attributes
+        return
+    with tracer.span(name, kind=kind, **attributes) as span_attributes:
+        yield span_attributes
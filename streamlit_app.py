@@ -21,9 +21,12 @@ import json
 nest_asyncio.apply()
 
 # Importar componentes del agente
-from langchain_mcp_adapters.client import MultiServerMCPClient
-from scout.my_mcp.config import mcp_config
+from scout.my_mcp.config import mcp_config, mcp_server_options
 from scout.graph import build_agent_graph, AgentState
+from scout.knowledge.ingest import ingest_directory
+from scout.mcp_pool import load_tools
+from scout.tracing import get_tracer, trace
+from scout.fastpath import SEARCH_PROMPT
 from langchain_core.messages import HumanMessage, AIMessageChunk
 
 
@@ -139,8 +142,9 @@ async def stream_graph_response_with_tools(
 def initialize_agent():
     """Inicializa el agente MCP una sola vez usando cache."""
     async def _init():
-        cliente = MultiServerMCPClient(connections=mcp_config)
-        herramientas = await cliente.get_tools()
+        with trace("get_tools") as span:
+            herramientas = await load_tools(mcp_config, server_options=mcp_server_options)
+            span["tools"] = len(herramientas)
         grafo = build_agent_graph(tools=herramientas)
         return grafo
     
@@ -198,6 +202,34 @@ def display_tool_history():
         st.rerun()
 
 
+def display_latency_metrics():
+    """Muestra en la barra lateral la latencia p50/p95 de los nodos, el LLM y cada herramienta."""
+    st.sidebar.header("⏱️ Latencias")
+
+    tracer = get_tracer()
+    stats = tracer.stats() if tracer else []
+    if not stats:
+        st.sidebar.info("Todavía no hay métricas.")
+        return
+
+    tipos = {"node": "Nodo", "llm": "LLM", "tool": "Herramienta", "mcp": "MCP"}
+    st.sidebar.dataframe(
+        [
+            {
+                "Tipo": tipos.get(fila["kind"], fila["kind"]),
+                "Nombre": fila["name"],
+                "N": fila["count"],
+                "p50 (ms)": fila["p50_ms"],
+                "p95 (ms)": fila["p95_ms"],
+                "Errores": fila["errors"],
+            }
+            for fila in stats
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+
 def display_chat_history():
     """Muestra el historial de chat."""
     for message in st.session_state.messages:
@@ -215,12 +247,11 @@ def handle_special_commands(user_input: str, grafo) -> bool:
     if user_input == "/cargar":
         with st.spinner("Cargando documentos a Qdrant..."):
             try:
-                result = asyncio.run(cargar_documentos_a_qdrant(
-                    grafo, 
+                report = ingest_directory(
                     carpeta_datos="data", 
                     nombre_coleccion="knowledge_base"
-                ))
-                st.success("✅ Documentos cargados exitosamente en Qdrant")
+                )
+                st.success(f"✅ Documentos cargados exitosamente en Qdrant\n\n{report.summary()}")
                 return True
             except Exception as e:
                 st.error(f"❌ Error al cargar documentos: {str(e)}")
@@ -269,7 +300,7 @@ async def process_user_message(user_input: str, grafo):
     # Crear mensaje de entrada
     if user_input.startswith("/buscar "):
         consulta = user_input[8:].strip()
-        prompt = f"Busca en la base de datos vectorial Qdrant en la colección 'knowledge_base' información relacionada con: {consulta}"
+        prompt = SEARCH_PROMPT.format(query=consulta)
         entrada = AgentState(messages=[HumanMessage(content=prompt)])
     else:
         entrada = AgentState(messages=[HumanMessage(content=user_input)])
@@ -341,6 +372,11 @@ def main():
         
         # Mostrar historial de herramientas
         display_tool_history()
+
+        st.sidebar.markdown("---")
+
+        # Mostrar latencias por nodo y herramienta
+        display_latency_metrics()
     
     with col1:
         # Área principal del chat
@@ -0,0 +1,59 @@
+"""
+Configuración común de las pruebas.
+
+test_google.py, test_qdrant.py y test_service_account.py son scripts manuales que llaman
+a servicios reales con las credenciales del .env; pytest no los recoge.
+"""
+
+import hashlib
+import sys
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pytest
+
+from scout.knowledge.embeddings import Embedder
+
+collect_ignore = ["test_google.py", "test_qdrant.py", "test_service_account.py"]
+
+# Los servidores locales se ejecutan como scripts e importan sus módulos hermanos (server_runtime)
+LOCAL_SERVERS_DIR = Path(__file__).resolve().parents[1] / "scout" / "my_mcp" / "local_servers"
+sys.path.insert(0, str(LOCAL_SERVERS_DIR))
+
+
+class BagOfWordsEmbedder(Embedder):
+    """Embeddings deterministas por palabras, sin descargar el modelo de fastembed."""
+
+    size = 64
+
+    @property
+    def vector_size(self) -> int:
+        return self.size
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.size, dtype=np.float32)
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.size] += 1.0
+        norm = float(np.linalg.norm(vector)) or 1.0
+        return (vector / norm).tolist()
+
+    def embed_documents(self, texts) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+@pytest.fixture
+def embedder() -> BagOfWordsEmbedder:
+    return BagOfWordsEmbedder()
+
+
+@pytest.fixture
+def sales_csv(tmp_path) -> Path:
+    """CSV de 200 filas: region (4 valores), units (0-199) y price."""
+    path = tmp_path / "sales.csv"
+    rows = ["region,units,price"] + [f"{['north', 'south', 'east', 'west'][i % 4]},{i},{i * 1.5}" for i in range(200)]
+    path.write_text("\n".join(rows) + "\n", encoding="utf-8")
+    return path
@@ -0,0 +1,28 @@
+"""Servidor MCP mínimo para las pruebas del pool: cuenta las llamadas del proceso."""
+
+import asyncio
+import os
+
+from mcp.server.fastmcp import FastMCP
+
+mcp = FastMCP("counter")
+calls = 0
+
+
+@mcp.tool()
+async def bump() -> str:
+    """Cuenta una llamada y devuelve el total y el pid del proceso."""
+    global calls
+    calls += 1
+    return f"{calls} pid={os.getpid()}"
+
+
+@mcp.tool()
+async def sleepy(seconds: float) -> str:
+    """Espera los segundos indicados."""
+    await asyncio.sleep(seconds)
+    return "slept"
+
+
+if __name__ == "__main__":
+    mcp.run(transport="stdio")
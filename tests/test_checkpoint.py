@@ -0,0 +1,97 @@
+import operator
+import sqlite3
+import time
+from typing import Annotated, TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+
+from scout.checkpoint import SQLiteCheckpointSaver
+
+
+class CounterState(TypedDict):
+    steps: Annotated[list, operator.add]
+
+
+def build_graph(saver):
+    builder = StateGraph(CounterState)
+    builder.add_node("step", lambda state: {"steps": [len(state["steps"]) + 1]})
+    builder.add_edge(START, "step")
+    builder.add_edge("step", END)
+    return builder.compile(checkpointer=saver)
+
+
+def thread(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def stored_checkpoints(path, thread_id: str) -> int:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT count(*) FROM checkpoints WHERE thread_id = ?", (thread_id,)).fetchone()[0]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "checkpoints" / "scout.sqlite")
+
+
+def test_state_survives_restart(db_path):
+    saver = SQLiteCheckpointSaver(db_path, flush_seconds=3600)
+    graph = build_graph(saver)
+    graph.invoke({"steps": []}, thread("a"))
+    graph.invoke({"steps": []}, thread("a"))
+    saver.close()
+
+    reopened = SQLiteCheckpointSaver(db_path, flush_seconds=3600)
+    assert build_graph(reopened).get_state(thread("a")).values["steps"] == [1, 2]
+    reopened.close()
+
+
+def test_keeps_last_checkpoints(db_path):
+    saver = SQLiteCheckpointSaver(db_path, keep_last=3, flush_seconds=3600)
+    graph = build_graph(saver)
+    for _ in range(5):
+        graph.invoke({"steps": []}, thread("a"))
+    saver.flush()
+
+    assert stored_checkpoints(db_path, "a") == 3
+    assert len(list(saver.list(thread("a")))) == 3
+    assert graph.get_state(thread("a")).values["steps"] == [1, 2, 3, 4, 5]
+    saver.close()
+
+
+def test_writes_are_batched(db_path):
+    saver = SQLiteCheckpointSaver(db_path, batch_size=1000, flush_seconds=3600)
+    graph = build_graph(saver)
+    graph.invoke({"steps": []}, thread("a"))
+
+    # Sin llegar al lote ni al intervalo, los checkpoints siguen en memoria
+    assert stored_checkpoints(db_path, "a") == 0
+    assert graph.get_state(thread("a")).values["steps"] == [1]
+
+    saver.flush()
+    assert stored_checkpoints(db_path, "a") > 0
+    saver.close()
+
+
+def test_full_batch_is_written(db_path):
+    saver = SQLiteCheckpointSaver(db_path, batch_size=1, flush_seconds=3600)
+    build_graph(saver).invoke({"steps": []}, thread("a"))
+
+    assert stored_checkpoints(db_path, "a") > 0
+    saver.close()
+
+
+def test_idle_threads_are_evicted(db_path):
+    saver = SQLiteCheckpointSaver(db_path, ttl_seconds=60, flush_seconds=3600)
+    graph = build_graph(saver)
+    graph.invoke({"steps": []}, thread("old"))
+    graph.invoke({"steps": []}, thread("new"))
+    saver.flush()
+    saver.conn.execute("UPDATE threads SET last_access = ? WHERE thread_id = 'old'", (time.time() - 3600,))
+
+    assert saver.evict_idle() == 1
+    assert stored_checkpoints(db_path, "old") == 0
+    assert saver.get_tuple(thread("old")) is None
+    assert graph.get_state(thread("new")).values["steps"] == [1]
+    saver.close()
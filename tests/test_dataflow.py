@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+
+import dataflow
+from dataflow import DataFlowSession
+
+
+@pytest.fixture
+def session(sales_csv):
+    session = DataFlowSession()
+    asyncio.run(session.load_data(str(sales_csv), "sales"))
+    return session
+
+
+def test_load_data_registers_table(session, sales_csv):
+    info = session.tables["sales"]
+
+    assert info.kind == "table"
+    assert info.row_count == 200
+    assert [column for column, _ in info.columns] == ["region", "units", "price"]
+    assert "sales (table, 200 rows, 3 columns)" in asyncio.run(session.list_tables())
+
+
+def test_write_refreshes_catalog(session):
+    asyncio.run(session.query_data("DELETE FROM sales WHERE units >= 150"))
+    asyncio.run(session.query_data("ALTER TABLE sales ADD COLUMN note VARCHAR"))
+
+    assert session.tables["sales"].row_count == 150
+    assert "note: VARCHAR" in asyncio.run(session.describe_table("sales"))
+
+
+def test_sql_drop_removes_table_from_catalog(session):
+    asyncio.run(session.query_data("DROP TABLE sales"))
+
+    assert asyncio.run(session.list_tables()) == "No data loaded."
+
+
+def test_write_after_read_refreshes_catalog(session):
+    version = session.tables["sales"].version
+    asyncio.run(session.query_data("SELECT count(*) FROM sales; DELETE FROM sales WHERE units >= 150"))
+
+    assert session.tables["sales"].row_count == 150
+    assert session.tables["sales"].version != version
+
+    asyncio.run(session.query_data("SELECT count(*) FROM sales; DROP TABLE sales"))
+
+    assert asyncio.run(session.list_tables()) == "No data loaded."
+
+
+def test_load_replaces_table_created_by_sql(session, sales_csv):
+    asyncio.run(session.query_data("CREATE TABLE other AS SELECT 1 AS a"))
+
+    result = asyncio.run(session.load_data(str(sales_csv), "other"))
+
+    assert result.startswith("Data loaded into other (table, 200 rows")
+    names = [row[0] for row in session.con.execute("SELECT table_name FROM duckdb_tables()").fetchall()]
+    assert sorted(names) == ["other", "sales"]
+
+
+def test_drop_table_replaced_by_sql_with_other_kind(session, tmp_path):
+    parquet = tmp_path / "sales.parquet"
+    session.con.execute(f"COPY sales TO '{parquet}' (FORMAT parquet)")
+    asyncio.run(session.load_data(str(parquet), "archive"))
+    assert session.tables["archive"].kind == "view"
+
+    asyncio.run(session.query_data("DROP VIEW archive; CREATE TABLE archive AS SELECT 1 AS a"))
+
+    assert session.tables["archive"].kind == "table"
+    assert asyncio.run(session.drop_table("archive")) == "Table archive dropped."
+
+
+def test_query_pages_and_fetch(session):
+    first = asyncio.run(session.query_data("SELECT * FROM sales ORDER BY units", 20))
+    lines = first.splitlines()
+
+    assert lines[0].startswith("Rows 1-20 of 200 (result_id: res_1).")
+    assert "dataflow_fetch_page(result_id='res_1', offset=20)" in lines[0]
+    assert len(lines) == 22
+
+    last = asyncio.run(session.fetch_page("res_1", 190, 50))
+    assert last.splitlines()[0] == "Rows 191-200 of 200 (result_id: res_1)."
+    assert last.splitlines()[-1].split(",")[1] == "199"
+
+
+def test_repeated_query_hits_cache(session):
+    asyncio.run(session.query_data("SELECT region, sum(units) FROM sales GROUP BY region"))
+    page = asyncio.run(session.query_data("select region,  SUM(units) from sales group by region;"))
+
+    assert (session.hits, session.misses) == (1, 1)
+    assert "(result_id: res_1)" in page
+
+
+def test_write_invalidates_cache(session):
+    query = "SELECT count(*) AS n FROM sales"
+    assert asyncio.run(session.query_data(query)).splitlines()[-1] == "200"
+
+    asyncio.run(session.query_data("INSERT INTO sales VALUES ('north', 1000, 1.0)"))
+
+    assert asyncio.run(session.query_data(query)).splitlines()[-1] == "201"
+    assert session.hits == 0
+
+
+def test_write_after_read_invalidates_cache(session):
+    query = "SELECT count(*) AS n FROM sales"
+    asyncio.run(session.query_data(query))
+
+    asyncio.run(session.query_data("SELECT 1 FROM sales LIMIT 1; DELETE FROM sales"))
+
+    assert asyncio.run(session.query_data(query)).splitlines()[-1] == "0"
+    assert session.hits == 0
+
+def test_result_rows_are_capped(session, monkeypatch):
+    monkeypatch.setattr(dataflow, "MAX_RESULT_ROWS", 120)
+
+    page = asyncio.run(session.query_data("SELECT * FROM sales ORDER BY units", 10))
+
+    assert page.startswith("Rows 1-10 of 120 (result_id: res_1). The query returned more rows")
+    assert session.results["res_1"].truncated
+    tail = asyncio.run(session.fetch_page("res_1", 110, 50))
+    assert tail.splitlines()[0].startswith("Rows 111-120 of 120")
+    assert tail.splitlines()[-1].split(",")[1] == "119"
+
+
+def test_result_over_budget_is_read_again(session, monkeypatch):
+    monkeypatch.setattr(dataflow, "RESULT_CACHE_BYTES", 0)
+
+    asyncio.run(session.query_data("SELECT * FROM sales ORDER BY units", 10))
+    result = session.results["res_1"]
+
+    assert result.query is not None and result.nbytes == 0
+    assert session.con.execute(f"SELECT count(*) FROM duckdb_tables() WHERE schema_name = '{dataflow.RESULTS_SCHEMA}'").fetchone()[0] == 0
+    assert asyncio.run(session.fetch_page("res_1", 10, 5)).splitlines()[-1].split(",")[1] == "14"
+
+    asyncio.run(session.query_data("DELETE FROM sales WHERE units < 5"))
+    assert "expired" in asyncio.run(session.fetch_page("res_1", 10, 5))
+
+
+def test_results_read_again_can_be_evicted(session, monkeypatch):
+    monkeypatch.setattr(dataflow, "RESULT_CACHE_BYTES", 0)
+    monkeypatch.setattr(dataflow, "KEEP_RESULTS", 1)
+
+    asyncio.run(session.query_data("SELECT * FROM sales ORDER BY units", 10))
+    asyncio.run(session.query_data("SELECT * FROM sales ORDER BY price", 10))
+
+    assert list(session.results) == ["res_2"] and session.evictions == 1
+
+
+def test_oldest_results_are_evicted(session, monkeypatch):
+    monkeypatch.setattr(dataflow, "KEEP_RESULTS", 2)
+
+    for units in range(3):
+        asyncio.run(session.query_data(f"SELECT * FROM sales WHERE units > {units}"))
+
+    assert list(session.results) == ["res_2", "res_3"]
+    assert "expired" in asyncio.run(session.fetch_page("res_1", 0, 5))
+    asyncio.run(session.query_data("SELECT * FROM sales WHERE units > 0"))
+    assert session.hits == 0
+
+
+def test_normalize_sql_keeps_literals():
+    assert dataflow.normalize_sql("SELECT *\n  FROM Sales -- all\nWHERE region = 'North';") == "select * from sales where region = 'North'"
+    assert dataflow.normalize_sql('select "Units" from sales') != dataflow.normalize_sql('select "units" from sales')
+
+
+def test_tool_docstrings_show_page_sizes():
+    assert f"({dataflow.PAGE_ROWS} by default, at most {dataflow.MAX_PAGE_ROWS})" in dataflow.dataflow_query_data.__doc__
+    assert "{page_rows}" not in dataflow.dataflow_fetch_page.__doc__
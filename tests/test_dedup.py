@@ -0,0 +1,109 @@
+import numpy as np
+from qdrant_client import QdrantClient
+
+from scout.knowledge.dedup import NearDuplicateDetector, Representative, optimal_bands
+from scout.knowledge.documents import DocumentChunk
+from scout.knowledge.store import KnowledgeBaseStore, chunk_point_id
+
+
+POLICY = (
+    "Los empleados tienen derecho a quince días hábiles de vacaciones remuneradas por cada año de "
+    "servicio. Las vacaciones se solicitan con al menos treinta días de anticipación a través del "
+    "portal de recursos humanos y deben contar con la aprobación del jefe inmediato. "
+)
+
+
+def chunk(text: str, source: str) -> DocumentChunk:
+    return DocumentChunk(text=text, metadata={"source": source})
+
+
+def test_optimal_bands_use_the_signature():
+    bands, rows = optimal_bands(0.85, 128)
+
+    assert bands * rows <= 128
+    assert 1 < bands < 128
+
+
+def test_signature_ignores_case_and_accents():
+    detector = NearDuplicateDetector()
+
+    assert np.array_equal(detector.signature("Política de Nómina"), detector.signature("politica de nomina"))
+
+
+def test_near_duplicates_are_grouped_under_one_representative():
+    detector = NearDuplicateDetector(threshold=0.8)
+
+    assert detector.add(chunk(POLICY * 2, "politicas/vacaciones_v1.docx"))
+    # Otra versión del documento con una palabra cambiada
+    assert not detector.add(chunk(POLICY + POLICY.replace("treinta", "quince"), "politicas/vacaciones_v2.docx"))
+    assert not detector.add(chunk(POLICY * 2, "copias/vacaciones.docx"))
+    assert detector.add(chunk("El pago de la nómina se realiza el último día hábil de cada mes.", "nomina.docx"))
+
+    [(representative, sources)] = detector.duplicate_sources()
+    assert representative.source == "politicas/vacaciones_v1.docx"
+    assert sources == ["politicas/vacaciones_v2.docx", "copias/vacaciones.docx"]
+    assert detector.stats.chunks_seen == 4
+    assert detector.stats.duplicates == 2
+    assert detector.stats.vector_bytes_saved == 2 * 384 * 4
+
+
+def test_different_chunks_are_kept():
+    detector = NearDuplicateDetector()
+    texts = [
+        "La facturación a clientes B2B se emite el primer día de cada mes.",
+        "Las horas extra se pagan con un recargo del veinticinco por ciento.",
+        "El soporte técnico atiende de lunes a viernes de ocho a seis.",
+    ]
+
+    assert all(detector.add(chunk(text, f"doc{i}.docx")) for i, text in enumerate(texts))
+    assert detector.stats.duplicates == 0
+    assert detector.duplicate_sources() == []
+
+
+def test_representatives_keep_no_text():
+    detector = NearDuplicateDetector(threshold=0.8)
+    detector.add(DocumentChunk(text=POLICY * 2, metadata={"source": "v1.docx", "chunk_index": 3}))
+    detector.add(chunk(POLICY * 2, "v2.docx"))
+
+    [(representative, sources)] = detector.duplicate_sources()
+
+    assert representative == Representative("v1.docx", 3)
+    assert sources == ["v2.docx"]
+    assert detector.signature(POLICY).dtype == np.uint32
+
+
+def test_max_representatives_bounds_the_index():
+    detector = NearDuplicateDetector(max_representatives=1)
+
+    assert detector.add(chunk(POLICY, "a.docx"))
+    assert detector.add(chunk("El pago de la nómina se realiza el último día hábil de cada mes.", "b.docx"))
+    # b.docx no se recordó: su copia también se indexa; la de a.docx sigue detectándose
+    assert detector.add(chunk("El pago de la nómina se realiza el último día hábil de cada mes.", "c.docx"))
+    assert not detector.add(chunk(POLICY, "d.docx"))
+
+
+def test_reset_forgets_representatives_and_stats():
+    detector = NearDuplicateDetector()
+    detector.add(chunk(POLICY, "a.docx"))
+    detector.add(chunk(POLICY, "b.docx"))
+
+    detector.reset()
+
+    assert detector.duplicate_sources() == []
+    assert detector.stats.chunks_seen == 0
+    assert detector.add(chunk(POLICY, "b.docx"))
+
+
+def test_duplicates_are_recorded_on_the_representative_point(embedder):
+    store = KnowledgeBaseStore(client=QdrantClient(":memory:"), embedder=embedder, collection_name="kb")
+    store.ensure_collection()
+    detector = NearDuplicateDetector(threshold=0.8)
+    chunks = [
+        DocumentChunk(text=POLICY * 2, metadata={"source": "v1.docx", "chunk_index": 0}),
+        DocumentChunk(text=POLICY * 2, metadata={"source": "v2.docx", "chunk_index": 0}),
+    ]
+
+    assert store.ingest(chunks, detector=detector) == 1
+
+    [point] = store.client.retrieve("kb", [chunk_point_id(chunks[0])])
+    assert point.payload["metadata"]["duplicate_sources"] == ["v2.docx"]
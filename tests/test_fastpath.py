@@ -0,0 +1,78 @@
+import pytest
+from langchain_core.messages import HumanMessage
+
+from scout.fastpath import (
+    SEARCH_PROMPT,
+    FastPathConfig,
+    IntentClassifier,
+    build_fastpath_node,
+    evaluate_arithmetic,
+    format_number,
+    parse_arithmetic,
+    parse_search,
+)
+from scout.graph import AgentState
+
+
+@pytest.mark.parametrize("text, expression", [
+    ("¿Cuánto es 7 por 8?", "7 * 8"),
+    ("calcula (2 + 3) x 4", "(2 + 3) * 4"),
+    ("3,5 * 2", "3.5 * 2"),
+    ("0.125 * 8", "0.125 * 8"),
+    ("10 dividido entre 4", "10 / 4"),
+    ("what is 5 minus 9", "5 - 9"),
+    ("12 ÷ 4 =", "12 / 4"),
+])
+def test_parse_arithmetic(text, expression):
+    assert parse_arithmetic(text) == expression
+
+
+@pytest.mark.parametrize("text", [
+    "1.500 * 3",
+    "1,500 + 2",
+    "1.000.000 / 2",
+    "2024-10-19",
+    "19/10/2024",
+    "carga los datos de 2024",
+    "42",
+    "hola",
+])
+def test_parse_arithmetic_leaves_other_text_to_the_llm(text):
+    assert parse_arithmetic(text) is None
+
+
+def test_evaluate_arithmetic():
+    assert format_number(evaluate_arithmetic("(2 + 3) * 4")) == "20"
+    assert format_number(evaluate_arithmetic("10 / 4")) == "2.5"
+    assert evaluate_arithmetic("-3 * -2") == 6
+    with pytest.raises(ValueError):
+        evaluate_arithmetic("2 ** 10")
+
+
+def test_parse_search():
+    assert parse_search("/buscar política de vacaciones") == "política de vacaciones"
+    assert parse_search(SEARCH_PROMPT.format(query="nómina")) == "nómina"
+    assert parse_search("/buscar ") is None
+    assert parse_search("busca algo") is None
+
+
+def test_node_answers_arithmetic_and_passes_the_rest():
+    node = build_fastpath_node(FastPathConfig(search=False))
+
+    handled = node(AgentState(messages=[HumanMessage(content="cuánto es 7 por 8")]))
+    assert handled["fastpath_handled"]
+    assert handled["messages"][0].content == "7 * 8 = 56"
+    assert handled["messages"][0].response_metadata["cache"] == "fastpath:math"
+
+    assert node(AgentState(messages=[HumanMessage(content="5 / 0")]))["messages"][0].content.endswith("división por cero")
+    assert node(AgentState(messages=[HumanMessage(content="1.500 * 3")])) == {"fastpath_handled": False}
+    assert build_fastpath_node(FastPathConfig(enabled=False))(
+        AgentState(messages=[HumanMessage(content="2 + 2")])
+    ) == {"fastpath_handled": False}
+
+
+def test_intent_classifier(embedder):
+    classifier = IntentClassifier(embedder)
+
+    assert classifier.classify("busca información sobre la política de vacaciones")[0] == "search"
+    assert classifier.classify("genera un gráfico de ventas por mes")[0] == "other"
@@ -0,0 +1,134 @@
+from types import SimpleNamespace
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, START, StateGraph
+
+from scout.graph import AgentState
+from scout.history import HistoryConfig, build_history_node, elide_tool_result, keep_summary
+
+
+class PromptRecorder(BaseCallbackHandler):
+    def __init__(self):
+        self.prompts = []
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.prompts.append(messages[0][0].content)
+
+
+def summarizer(*summaries):
+    recorder = PromptRecorder()
+    llm = GenericFakeChatModel(messages=iter(AIMessage(content=s) for s in summaries), callbacks=[recorder])
+    return llm, recorder
+
+
+def turn(n: int, tool_chars: int = 400) -> list:
+    """Un turno con una llamada a herramienta: pregunta, llamada, resultado y respuesta."""
+    return [
+        HumanMessage(id=f"h{n}", content=f"pregunta {n}"),
+        AIMessage(id=f"a{n}", content="", tool_calls=[{"id": f"c{n}", "name": "query", "args": {"n": n}}]),
+        ToolMessage(id=f"t{n}", tool_call_id=f"c{n}", name="query", content="x" * tool_chars),
+        AIMessage(id=f"r{n}", content=f"respuesta {n}"),
+    ]
+
+
+def conversation(turns: int) -> list:
+    return [message for n in range(turns) for message in turn(n)]
+
+
+def apply(messages, update):
+    """Lo que add_messages hace con la actualización del nodo: reemplazar por id y eliminar."""
+    removed = {m.id for m in update.get("messages", []) if isinstance(m, RemoveMessage)}
+    replaced = {m.id: m for m in update.get("messages", []) if not isinstance(m, RemoveMessage)}
+    return [replaced.get(m.id, m) for m in messages if m.id not in removed]
+
+
+def test_elided_tool_result_keeps_status_and_artifact():
+    message = ToolMessage(
+        id="t0", tool_call_id="c0", content="e" * 500, status="error", artifact={"rows": 3},
+        additional_kwargs={"tool_output_ref": "out_1"},
+    )
+
+    elided = elide_tool_result(message, 100)
+
+    assert (elided.id, elided.status, elided.artifact) == ("t0", "error", {"rows": 3})
+    assert elided.additional_kwargs["elided"]
+    assert elided.content.startswith("e" * 100) and "ref='out_1'" in elided.content
+
+
+def test_old_tool_results_are_elided_but_not_the_current_turn():
+    llm, _ = summarizer()
+    manage_history = build_history_node(llm, HistoryConfig(max_tokens=100_000, tool_result_max_chars=100))
+    messages = conversation(2) + turn(2)[:3]
+
+    update = manage_history(SimpleNamespace(messages=messages, summary=""))
+
+    assert [m.id for m in update["messages"]] == ["t0", "t1"]
+    assert "summary" not in update
+
+
+def test_cut_keeps_tool_calls_with_their_results():
+    llm, _ = summarizer("resumen")
+    manage_history = build_history_node(llm, HistoryConfig(max_tokens=300, keep_tokens=350, tool_result_max_chars=10_000))
+    messages = conversation(6)
+
+    update = manage_history(SimpleNamespace(messages=messages, summary=""))
+    kept = apply(messages, update)
+
+    removed = [m.id for m in update["messages"] if isinstance(m, RemoveMessage)]
+    # Se eliminan los turnos más antiguos completos, en orden
+    assert removed == [m.id for m in messages[:len(removed)]] and 0 < len(removed) < len(messages)
+    assert isinstance(kept[0], HumanMessage) and kept[-1].id == "r5"
+    calls = {call["id"] for m in kept if isinstance(m, AIMessage) for call in m.tool_calls}
+    assert all(m.tool_call_id in calls for m in kept if isinstance(m, ToolMessage))
+    assert update["summary"] == "resumen"
+
+
+def test_summary_prompt_carries_previous_summary_and_truncates_messages():
+    llm, recorder = summarizer("resumen nuevo")
+    config = HistoryConfig(max_tokens=300, keep_tokens=350, tool_result_max_chars=10_000, transcript_max_chars=50)
+    manage_history = build_history_node(llm, config)
+
+    update = manage_history(SimpleNamespace(messages=conversation(6), summary="resumen anterior"))
+
+    [prompt] = recorder.prompts
+    assert "resumen anterior" in prompt and "x" * 50 in prompt and "x" * 51 not in prompt
+    assert update["summary"] == "resumen nuevo"
+
+
+def test_sliding_window_keeps_summary_without_calling_the_llm():
+    llm, recorder = summarizer()
+    manage_history = build_history_node(llm, HistoryConfig(max_tokens=300, keep_tokens=350, summarize=False))
+
+    update = manage_history(SimpleNamespace(messages=conversation(6), summary="resumen anterior"))
+
+    assert update["summary"] == "resumen anterior"
+    assert recorder.prompts == []
+
+
+def test_summary_survives_later_turns():
+    assert keep_summary("resumen", "") == "resumen"
+    assert keep_summary("resumen", "otro") == "otro"
+
+    llm, _ = summarizer("resumen 1")
+    builder = StateGraph(AgentState)
+    builder.add_node("history", build_history_node(llm, HistoryConfig(max_tokens=300, keep_tokens=350)))
+    builder.add_edge(START, "history")
+    builder.add_edge("history", END)
+    graph = builder.compile(checkpointer=MemorySaver())
+    thread = {"configurable": {"thread_id": "1"}}
+
+    graph.invoke({"messages": conversation(6)}, thread)
+    # Cada entrada trae summary="" por defecto; keep_summary no debe borrar el resumen
+    state = graph.invoke({"messages": [HumanMessage(id="h6", content="otra pregunta")]}, thread)
+
+    assert state["summary"] == "resumen 1"
+    assert state["messages"][-1].id == "h6"
+
+
+def test_transcript_max_chars_from_env(monkeypatch):
+    monkeypatch.setenv("HISTORY_TRANSCRIPT_MAX_CHARS", "500")
+
+    assert HistoryConfig.from_env().transcript_max_chars == 500
@@ -0,0 +1,51 @@
+import asyncio
+
+from langchain_core.messages import HumanMessage
+from langchain_mcp_adapters.tools import load_mcp_tools
+from mcp.server.fastmcp import FastMCP
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from host import load_server, mount_servers
+from scout.tool_exec import ToolExecutionConfig, server_aliases, tool_aliases
+from scout.tool_router import ToolRouter, ToolRouterConfig
+
+
+async def list_tools(server: FastMCP, server_name: str):
+    """Herramientas tal como las recibe el agente de un servidor, marcadas como en get_server_tools."""
+    async with create_connected_server_and_client_session(server._mcp_server) as session:
+        tools = await load_mcp_tools(session)
+    for tool in tools:
+        tool.metadata = {**(tool.metadata or {}), "mcp_server": server_name}
+    return {tool.name: tool for tool in tools}
+
+
+def test_host_tools_keep_their_server_names():
+    host = FastMCP("local")
+    mounted = mount_servers(host, ["math_mcp"])
+    assert mounted["math_add"] == "add"
+
+    hosted = asyncio.run(list_tools(host, "local"))["math_add"]
+    alone = asyncio.run(list_tools(load_server("math_mcp"), "math_mcp"))["add"]
+
+    assert tool_aliases(hosted) == ("math_add", "add")
+    assert server_aliases(hosted) == ("local", "math_mcp")
+    assert tool_aliases(alone) == ("add",)
+    assert server_aliases(alone) == ("math_mcp",)
+
+
+def test_settings_match_in_both_modes(embedder):
+    host = FastMCP("local")
+    mount_servers(host, ["math_mcp"])
+    hosted = asyncio.run(list_tools(host, "local"))
+    alone = asyncio.run(list_tools(load_server("math_mcp"), "math_mcp"))
+    config = ToolExecutionConfig(timeout_seconds=60, timeouts={"add": 5, "math_mcp": 10})
+
+    for tools, add in ((hosted, "math_add"), (alone, "add")):
+        sub = tools[add.replace("add", "sub")]
+        assert config.timeout_for(tool_aliases(tools[add]), server_aliases(tools[add])) == 5
+        assert config.timeout_for(tool_aliases(sub), server_aliases(sub)) == 10
+
+        router = ToolRouter(list(tools.values()), ToolRouterConfig(top_k=1, always_include=["add"]), embedder)
+        selected = [tool.name for tool in router.select([HumanMessage(content="divide 3 entre 4")])]
+        assert router.active
+        assert add in selected and len(selected) == 2
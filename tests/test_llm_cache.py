@@ -0,0 +1,95 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from scout.llm_cache import ExactTier, ReplayChatModel, ResponseCache, SemanticTier, exact_key
+
+
+QUESTION = "Cuál es la política de vacaciones de la empresa"
+
+
+def test_exact_key_ignores_ids_and_whitespace():
+    first = [SystemMessage(content="prompt"), HumanMessage(content="hola  mundo", id="a")]
+    second = [SystemMessage(content="prompt"), HumanMessage(content="hola mundo\n", id="b")]
+
+    assert exact_key("ctx", first) == exact_key("ctx", second)
+    assert exact_key("ctx", first) != exact_key("otro", first)
+
+
+def test_exact_tier_expires_and_keeps_most_recent():
+    tier = ExactTier(ttl_seconds=60, max_entries=2)
+    tier.put("a", AIMessage(content="A"))
+    tier.put("b", AIMessage(content="B"))
+    tier.get("a")
+    tier.put("c", AIMessage(content="C"))
+
+    assert tier.get("b") is None
+    assert tier.get("a").content == "A"
+    assert len(tier) == 2
+
+    expired = ExactTier(ttl_seconds=-1, max_entries=2)
+    expired.put("a", AIMessage(content="A"))
+    assert expired.get("a") is None
+
+
+def test_semantic_tier_matches_similar_questions_per_context(embedder):
+    tier = SemanticTier(ttl_seconds=60, max_entries=10, threshold=0.9, embedder=embedder)
+    tier.put("ctx", QUESTION, AIMessage(content="15 días hábiles"))
+
+    assert tier.get("ctx", "la política de vacaciones de la empresa, cuál es").content == "15 días hábiles"
+    assert tier.get("ctx", "cómo cargo un archivo csv") is None
+    assert tier.get("otro", QUESTION) is None
+
+
+def test_semantic_tier_drops_least_recently_used(embedder):
+    tier = SemanticTier(ttl_seconds=60, max_entries=2, threshold=0.9, embedder=embedder)
+    tier.put("ctx", "pregunta uno", AIMessage(content="1"))
+    tier.put("ctx", "pregunta dos", AIMessage(content="2"))
+    tier.get("ctx", "pregunta uno")
+    tier.put("ctx", "pregunta tres", AIMessage(content="3"))
+
+    assert len(tier) == 2
+    assert tier.get("ctx", "pregunta dos") is None
+    assert tier.get("ctx", "pregunta uno").content == "1"
+
+
+def test_response_cache_serves_exact_then_semantic(embedder):
+    cache = ResponseCache(
+        exact=ExactTier(60, 10),
+        semantic=SemanticTier(60, 10, threshold=0.9, embedder=embedder),
+    )
+    messages = [SystemMessage(content="prompt"), HumanMessage(content=QUESTION)]
+    cache.update("ctx", messages, AIMessage(content="15 días hábiles"), question=QUESTION)
+
+    response, tier = cache.lookup("ctx", messages, question=QUESTION)
+    assert (response.content, tier) == ("15 días hábiles", "exact")
+
+    other = [SystemMessage(content="prompt"), HumanMessage(content=QUESTION.lower() + "?")]
+    response, tier = cache.lookup("ctx", other, question=QUESTION.lower() + "?")
+    assert (response.content, tier) == ("15 días hábiles", "semantic")
+    assert cache.stats()["hits"] == {"exact": 1, "semantic": 1}
+
+
+def test_semantic_tier_skips_tool_answers(embedder):
+    cache = ResponseCache(semantic=SemanticTier(60, 10, threshold=0.9, embedder=embedder))
+    call = AIMessage(content="", tool_calls=[{"name": "dataflow_query_data", "args": {}, "id": "1"}])
+    messages = [HumanMessage(content=QUESTION), call, ToolMessage(content="datos del usuario", tool_call_id="1")]
+
+    cache.update("ctx", messages, AIMessage(content="según tus datos..."), question=QUESTION)
+    cache.update("ctx", messages[:1], call, question=QUESTION)
+
+    assert cache.stats()["semantic_entries"] == 0
+
+
+def test_replay_model_streams_cached_response():
+    response = AIMessage(
+        content="Hola, ¿en qué te ayudo?",
+        tool_calls=[{"name": "kb_search", "args": {"query": "vacaciones"}, "id": "call-1"}],
+    )
+    model = ReplayChatModel(response=response, cache_tier="semantic")
+
+    chunks = list(model.stream([]))
+    merged = sum(chunks[1:], chunks[0])
+
+    assert len(chunks) > 2
+    assert merged.content == response.content
+    assert merged.tool_calls[0]["args"] == {"query": "vacaciones"}
+    assert model.invoke([]).response_metadata["cache"] == "semantic"
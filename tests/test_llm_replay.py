@@ -0,0 +1,47 @@
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+from scout.llm_replay import LLMModeConfig, LLMRecorder, RecordedChatModel, load_recordings, recorded_questions
+
+
+def record(path, answers):
+    """Graba una llamada en streaming por respuesta, cada una para la pregunta 'pregunta N'."""
+    model = GenericFakeChatModel(messages=iter(answers), callbacks=[LLMRecorder(str(path))])
+    for n in range(len(answers)):
+        list(model.stream([HumanMessage(content=f"pregunta {n}")]))
+
+
+def test_recorder_writes_one_line_per_call(tmp_path):
+    path = tmp_path / "recordings" / "llm.jsonl"
+    record(path, [AIMessage(content="uno dos tres"), AIMessage(content="cuatro")])
+
+    recordings = load_recordings(str(path))
+
+    assert len(recordings) == 2
+    assert recordings[0]["response"]["data"]["content"] == "uno dos tres"
+    assert "".join(chunk["content"] for chunk in recordings[0]["chunks"]) == "uno dos tres"
+    assert recorded_questions(recordings) == ["pregunta 0", "pregunta 1"]
+
+
+def test_replay_serves_recording_for_same_request(tmp_path):
+    path = tmp_path / "llm.jsonl"
+    record(path, [AIMessage(content="primera respuesta"), AIMessage(content="segunda respuesta")])
+    model = RecordedChatModel.from_config(LLMModeConfig(mode="replay", path=str(path), time_scale=0))
+
+    assert model.invoke([HumanMessage(content="pregunta 1")]).content == "segunda respuesta"
+    assert "".join(chunk.content for chunk in model.stream([HumanMessage(content="pregunta 0")])) == "primera respuesta"
+    # Una petición que no se grabó recibe la siguiente grabación en orden
+    assert model.invoke([HumanMessage(content="otra cosa")]).content == "primera respuesta"
+
+
+def test_replay_uses_fixed_token_latency(tmp_path):
+    path = tmp_path / "llm.jsonl"
+    record(path, [AIMessage(content="a b c")])
+    model = RecordedChatModel.from_config(
+        LLMModeConfig(mode="replay", path=str(path), token_latency_ms=5, first_token_ms=50)
+    )
+
+    delays = [delay for delay, _ in model._chunks(model.recordings[0])]
+
+    assert delays[0] == 0.05
+    assert all(delay == 0.005 for delay in delays[1:])
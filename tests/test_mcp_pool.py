@@ -0,0 +1,111 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from scout import tracing
+from scout.mcp_pool import MCPPoolConfig, MCPSessionPool
+from scout.tracing import Tracer
+
+
+SERVER = str(Path(__file__).parent / "mcp_counter_server.py")
+CONNECTIONS = {
+    "eager": {"command": sys.executable, "args": [SERVER], "transport": "stdio"},
+    "lazy": {"command": sys.executable, "args": [SERVER], "transport": "stdio"},
+}
+
+
+@pytest.fixture
+def make_pool(tmp_path):
+    pools = []
+
+    def make(**config) -> MCPSessionPool:
+        pool = MCPSessionPool(
+            CONNECTIONS,
+            MCPPoolConfig(schema_cache_dir=str(tmp_path / "schemas"), **config),
+            server_options={"lazy": {"lazy": True, "idle_timeout": 1}},
+        )
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def load_tools(pool: MCPSessionPool) -> dict:
+    return {(tool.metadata["mcp_server"], tool.name): tool for tool in asyncio.run(pool.get_tools())}
+
+
+def call(tool, **arguments) -> str:
+    # Un asyncio.run por llamada, como un mensaje de Streamlit
+    content = asyncio.run(tool.ainvoke(arguments))
+    return content if isinstance(content, str) else content[0]
+
+
+def stats(pool: MCPSessionPool) -> dict:
+    return {entry["server"]: entry for entry in pool.stats()}
+
+
+def test_session_persists_between_calls(make_pool):
+    tools = load_tools(make_pool())
+
+    first, second = call(tools[("eager", "bump")]), call(tools[("eager", "bump")])
+
+    assert first.startswith("1 pid=")
+    assert second == "2 " + first.split(" ", 1)[1]
+
+
+def test_lazy_server_starts_on_first_call_and_stops_when_idle(make_pool):
+    pool = make_pool()
+    tools = load_tools(pool)
+
+    # Se arrancó solo para listar sus herramientas
+    assert not stats(pool)["lazy"]["alive"]
+
+    first = call(tools[("lazy", "bump")])
+    assert first.startswith("1 pid=")
+    assert stats(pool)["lazy"]["alive"]
+
+    # idle_timeout de 1 s; el chequeo se hace cada medio idle_timeout
+    deadline = time.monotonic() + 5
+    while stats(pool)["lazy"]["alive"] and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert not stats(pool)["lazy"]["alive"]
+    assert stats(pool)["eager"]["alive"]
+
+    # La siguiente llamada arranca un proceso nuevo; una parada no cuenta como reinicio
+    assert call(tools[("lazy", "bump")]).startswith("1 pid=")
+    assert stats(pool)["lazy"]["restarts"] == 0
+
+
+def test_cached_schemas_skip_lazy_servers(make_pool):
+    load_tools(make_pool())
+
+    pool = make_pool()
+    tools = load_tools(pool)
+
+    assert ("lazy", "bump") in tools
+    assert not stats(pool)["lazy"]["alive"]
+
+
+def test_health_check_spares_long_calls(make_pool):
+    pool = make_pool(health_interval_seconds=0.2, ping_timeout_seconds=0.1)
+    tools = load_tools(pool)
+
+    assert call(tools[("eager", "sleepy")], seconds=1.5) == "slept"
+    assert stats(pool)["eager"]["restarts"] == 0
+
+
+def test_tool_calls_are_traced(make_pool, monkeypatch, tmp_path):
+    tracer = Tracer(path=str(tmp_path / "spans.jsonl"))
+    monkeypatch.setenv("TRACE_ENABLED", "true")
+    monkeypatch.setattr(tracing, "_tracer", tracer)
+    tools = load_tools(make_pool())
+
+    call(tools[("eager", "bump")])
+
+    [span] = [span for span in tracer.spans if span.name.startswith("mcp:")]
+    assert span.name == "mcp:eager/bump" and span.duration_ms > 0
@@ -0,0 +1,70 @@
+from qdrant_client import QdrantClient, models
+
+from scout.knowledge.documents import build_metadata, chunk_document
+from scout.knowledge.store import PAYLOAD_INDEXES, KnowledgeBaseStore, build_filter
+
+
+def conditions(query_filter: models.Filter) -> dict:
+    return {condition.key: condition for condition in query_filter.must}
+
+
+def test_empty_filter_is_none():
+    assert build_filter() is None
+    assert build_filter(area="", doc_type=[]) is None
+
+
+def test_keyword_fields_match_normalized_values():
+    query_filter = build_filter(area="Nómina", doc_type=".PDF", source="rrhh/politicas.pdf")
+
+    by_key = conditions(query_filter)
+    assert set(by_key) == {"metadata.area", "metadata.doc_type", "metadata.source"}
+    assert by_key["metadata.area"].match == models.MatchValue(value="nomina")
+    assert by_key["metadata.doc_type"].match == models.MatchValue(value="pdf")
+
+
+def test_lists_match_any_value():
+    by_key = conditions(build_filter(doc_type=["pdf", ".DOCX"], drive_folder=["RRHH"]))
+
+    assert by_key["metadata.doc_type"].match == models.MatchAny(any=["pdf", "docx"])
+    # Una lista de un solo valor es una coincidencia exacta
+    assert by_key["metadata.drive_folder"].match == models.MatchValue(value="RRHH")
+
+
+def test_dates_become_a_range():
+    by_key = conditions(build_filter(modified_after="2024-01-01T00:00:00Z"))
+
+    date_range = by_key["metadata.modified_time"].range
+    assert isinstance(date_range, models.DatetimeRange)
+    assert date_range.gte.year == 2024 and date_range.lte is None
+
+
+def test_metadata_has_every_indexed_field():
+    metadata = build_metadata(
+        "Nómina/2024/politica.pdf", modified_time="2024-03-01T10:00:00Z", drive_folder="Unidad RRHH",
+    )
+    [chunk, *_] = chunk_document("Texto de la política.", metadata)
+
+    assert set(PAYLOAD_INDEXES) <= set(chunk.metadata)
+    assert metadata["doc_type"] == "pdf" and metadata["mime_type"] == "application/pdf"
+    # El área se deduce de la carpeta de Drive o de la ruta
+    assert metadata["area"] == "nomina"
+
+
+def test_metadata_defaults():
+    metadata = build_metadata("otros/LEEME", area="B2B")
+
+    assert (metadata["source"], metadata["file_name"]) == ("otros/LEEME", "LEEME")
+    assert metadata["doc_type"] == "bin" and metadata["mime_type"] == "application/octet-stream"
+    assert metadata["area"] == "b2b"
+    assert build_metadata("otros/leeme.txt")["area"] == "general"
+
+
+def test_filtered_search(embedder):
+    store = KnowledgeBaseStore(client=QdrantClient(":memory:"), embedder=embedder, collection_name="kb")
+    store.ensure_collection()
+    for path in ("b2b/tarifas.pdf", "nomina/pagos.docx", "nomina/pagos.md"):
+        store.upsert_chunks(chunk_document("Calendario de pagos del mes.", build_metadata(path)))
+
+    points = store.search("pagos", limit=10, query_filter=build_filter(area="nomina", doc_type=["docx", "pdf"]))
+
+    assert [point.payload["metadata"]["source"] for point in points] == ["nomina/pagos.docx"]
@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+from scout.knowledge.dedup import NearDuplicateDetector
+from scout.knowledge.pipeline import PipelineConfig, RemoteDocument, StreamingIngestPipeline
+
+
+TEXTS = {
+    f"rrhh/politica_{i}.txt": f"Política número {i}. " + " ".join(f"palabra{i}_{j}" for j in range(60))
+    for i in range(12)
+}
+
+
+class FakeStore:
+    """Lo que el pipeline usa de KnowledgeBaseStore, sin Qdrant."""
+
+    def __init__(self, embedder):
+        self.embedder = embedder
+        self.points = []
+        self.duplicates_recorded = False
+
+    def ensure_collection(self):
+        pass
+
+    def upsert_chunks(self, chunks, vectors=None):
+        self.points.extend(zip(chunks, vectors))
+        return len(chunks)
+
+    def record_duplicates(self, detector):
+        self.duplicates_recorded = True
+
+
+def fetch(document: RemoteDocument) -> bytes:
+    return TEXTS[document.relative_path].encode("utf-8")
+
+
+def documents():
+    return [RemoteDocument(path) for path in TEXTS] + [RemoteDocument("imagen.png")]
+
+
+def run(pipeline, timeout=20):
+    """Ejecuta el pipeline en otro hilo para que un bloqueo haga fallar la prueba en lugar de colgarla."""
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(stats=pipeline.run(documents())), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "the pipeline did not finish"
+    return result["stats"]
+
+
+@pytest.fixture
+def config():
+    # Colas pequeñas: un hilo que deja de leer bloquea enseguida a la etapa anterior
+    return PipelineConfig(fetch_workers=2, extract_workers=2, queue_size=1, embed_batch_size=4, chunk_size=200, chunk_overlap=0)
+
+
+def test_pipeline_writes_every_chunk(embedder, config):
+    store = FakeStore(embedder)
+
+    stats = run(StreamingIngestPipeline(store, lambda: fetch, config, detector=NearDuplicateDetector()))
+
+    assert (stats.documents_listed, stats.documents_skipped, stats.documents_fetched) == (13, 1, 12)
+    assert stats.points_upserted == len(store.points) == stats.chunks > 12
+    assert {chunk.metadata["source"] for chunk, _ in store.points} == set(TEXTS)
+    assert all(len(vector) == embedder.vector_size for _, vector in store.points)
+    assert stats.errors == [] and store.duplicates_recorded
+
+
+def test_failing_fetcher_factory_does_not_block(embedder, config):
+    calls = []
+
+    def factory():
+        calls.append(1)
+        # El primer cliente no se puede crear; el hilo lo reintenta con el siguiente documento
+        if len(calls) == 1:
+            raise RuntimeError("no credentials")
+        return fetch
+
+    stats = run(StreamingIngestPipeline(FakeStore(embedder), factory, config))
+
+    assert len(stats.errors) == 1 and "no credentials" in stats.errors[0]
+    assert stats.documents_fetched == 11
+
+
+def test_failing_chunk_is_counted_and_the_rest_continue(embedder, config):
+    class FailingDetector(NearDuplicateDetector):
+        def add(self, chunk):
+            if chunk.metadata["source"] == "rrhh/politica_3.txt":
+                raise ValueError("bad chunk")
+            return super().add(chunk)
+
+    store = FakeStore(embedder)
+
+    stats = run(StreamingIngestPipeline(store, lambda: fetch, config, detector=FailingDetector()))
+
+    assert len(stats.errors) == 1 and "politica_3" in stats.errors[0]
+    assert {chunk.metadata["source"] for chunk, _ in store.points} == set(TEXTS) - {"rrhh/politica_3.txt"}
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from langchain_core.tools import StructuredTool
+
+from scout.knowledge.retrieval import RetrievedSection
+from scout.prefetch import PrefetchConfig, Prefetcher
+
+
+THREAD = {"configurable": {"thread_id": "t1"}}
+
+
+class FakeStore:
+    """search_sections de KnowledgeBaseStore; `release` permite retrasar la búsqueda."""
+
+    def __init__(self):
+        self.queries = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def search_sections(self, query, limit):
+        self.release.wait(5)
+        self.queries.append(query)
+        return [RetrievedSection(text=f"resultado para {query}", score=0.9, metadata={"source": "rrhh/vacaciones.docx"})]
+
+
+class KbSearch:
+    """La herramienta real, que anota sus llamadas."""
+
+    def __init__(self):
+        self.calls = []
+
+    def tool(self, name="kb_search", metadata=None) -> StructuredTool:
+        async def kb_search(query: str, limit: int = 5) -> str:
+            self.calls.append((query, limit))
+            return f"real: {query}"
+
+        return StructuredTool.from_function(coroutine=kb_search, name=name, description="Search.", metadata=metadata)
+
+
+@pytest.fixture
+def store():
+    return FakeStore()
+
+
+@pytest.fixture
+def prefetcher(embedder, store):
+    return Prefetcher(PrefetchConfig(context_wait_ms=150), embedder=embedder, store=store)
+
+
+def call(tool, **args):
+    return asyncio.run(tool.ainvoke(args, config=THREAD))
+
+
+def test_hit_is_served_by_the_wrapped_tool(prefetcher):
+    kb = KbSearch()
+    [tool] = prefetcher.wrap_tools([kb.tool()])
+
+    prefetcher.start("t1", "política de vacaciones")
+    # Las mismas palabras en otro orden: la similitud supera el umbral
+    result = call(tool, query="vacaciones política de")
+
+    assert result.endswith("resultado para política de vacaciones")
+    assert kb.calls == []
+    assert prefetcher.stats()["hit"] == 1 and prefetcher.stats()["hit_rate"] == 1.0
+
+
+def test_host_mode_name_is_wrapped(prefetcher):
+    kb = KbSearch()
+    tools = [kb.tool("knowledge_base_kb_search", {"mounted_name": "kb_search"}), KbSearch().tool("other")]
+
+    wrapped = prefetcher.wrap_tools(tools)
+
+    assert wrapped[0] is not tools[0] and wrapped[1] is tools[1]
+
+
+def test_miss_falls_through_to_the_real_tool(prefetcher):
+    kb = KbSearch()
+    [tool] = prefetcher.wrap_tools([kb.tool()])
+
+    prefetcher.start("t1", "política de vacaciones")
+    assert call(tool, query="precio del dólar hoy") == "real: precio del dólar hoy"
+    # Otros argumentos darían un resultado distinto al especulativo
+    assert call(tool, query="política de vacaciones", limit=10) == "real: política de vacaciones"
+
+    assert kb.calls == [("precio del dólar hoy", 5), ("política de vacaciones", 10)]
+    assert prefetcher.stats()["hit"] == 0
+
+
+def test_unused_results_count_as_waste(prefetcher):
+    prefetcher.start("t1", "primera pregunta")
+    # Un turno nuevo en el mismo hilo desperdicia la búsqueda anterior
+    prefetcher.start("t1", "segunda pregunta")
+    prefetcher.finish_turn("t1")
+    prefetcher.finish_turn("t1")
+
+    stats = prefetcher.stats()
+    assert (stats["started"], stats["waste"], stats["hit"]) == (2, 2, 0)
+    assert stats["waste_rate"] == 1.0
+
+
+def test_context_wait_times_out(prefetcher, store):
+    store.release.clear()
+    prefetcher.start("t1", "política de vacaciones")
+
+    started = time.perf_counter()
+    assert prefetcher.context("t1") is None
+    assert 0.14 <= time.perf_counter() - started < 1
+
+    store.release.set()
+    assert "resultado para política de vacaciones" in prefetcher.context("t1")
+    assert prefetcher.stats()["context"] == 1
+    # Ya entregado en el prompt: no cuenta también como desperdicio ni como acierto de la herramienta
+    prefetcher.finish_turn("t1")
+    assert prefetcher.stats()["waste"] == 0
@@ -2,6 +2,8 @@ from qdrant_client import QdrantClient, models
 from dotenv import load_dotenv
 import os
 
+from scout.knowledge.store import KnowledgeBaseStore, CollectionSettings
+
 load_dotenv()
 
 qdrant_client = QdrantClient(
@@ -14,10 +16,18 @@ print(qdrant_client.get_collections())
 collection_name = "knowledge_base"
 model_name = "BAAI/bge-small-en-v1.5"
 
-# qdrant_client.create_collection(
-#     collection_name=collection_name,
-#     vectors_config=models.VectorParams(size=384, distance=models.Distance.COSINE)
-# )
+# Crea la colección (si no existe) con la configuración de almacenamiento de QDRANT_*
+store = KnowledgeBaseStore(
+    client=qdrant_client,
+    collection_name=collection_name,
+    settings=CollectionSettings.from_env(),
+)
+store.ensure_collection()
+
+info = qdrant_client.get_collection(collection_name)
+print(info.config.params.vectors)
+print(info.config.quantization_config)
+print(info.config.hnsw_config)
 
 
 # # Uploading data to the collection
@@ -0,0 +1,90 @@
+from qdrant_client import QdrantClient
+
+from scout.knowledge.documents import build_metadata, chunk_document, split_sections
+from scout.knowledge.retrieval import CHARS_PER_TOKEN, RetrievedSection, compact_sections
+from scout.knowledge.store import KnowledgeBaseStore
+
+
+VACATIONS = "Los empleados tienen quince días de vacaciones pagadas por año trabajado. " * 15
+PAYROLL = "La nómina se paga el último día hábil de cada mes por transferencia. " * 15
+POLICIES = f"Introducción a las políticas.\n# Vacaciones\n{VACATIONS}\n## Nómina\n{PAYROLL}"
+
+
+def section(text: str, score: float, source: str = "doc.md") -> RetrievedSection:
+    return RetrievedSection(text=text, score=score, metadata={"source": source})
+
+
+def test_markdown_is_split_by_heading():
+    sections = split_sections(POLICIES, "md")
+
+    assert [label for label, _ in sections] == ["", "Vacaciones", "Nómina"]
+    assert sections[0][1] == "Introducción a las políticas."
+    assert sections[1][1].startswith("# Vacaciones\nLos empleados")
+
+
+def test_pdf_is_split_by_page():
+    sections = split_sections("Página uno.\fPágina dos.\f  \fPágina cuatro.", "pdf")
+
+    # Las páginas vacías no son secciones
+    assert sections == [("página 1", "Página uno."), ("página 2", "Página dos."), ("página 4", "Página cuatro.")]
+
+
+def test_long_sections_are_subdivided_with_their_label():
+    sections = split_sections(VACATIONS, "docx", max_chars=300)
+
+    assert len(sections) > 1
+    assert all(label == "" and len(text) <= 300 for label, text in sections)
+
+
+def test_overlapping_chunks_share_their_parent():
+    chunks = chunk_document(POLICIES, build_metadata("rrhh/politicas.md"), chunk_size=200, chunk_overlap=50)
+
+    parents = {chunk.metadata["parent_id"]: chunk.parent for chunk in chunks}
+    assert [parent.metadata["section"] for parent in parents.values()] == ["", "Vacaciones", "Nómina"]
+    assert all(chunk.text in chunk.parent.text for chunk in chunks)
+    assert [chunk.metadata["chunk_index"] for chunk in chunks] == list(range(len(chunks)))
+
+
+def test_repeated_sections_count_once():
+    sections = [
+        section(VACATIONS, 0.7, "rrhh/vacaciones.md"),
+        section(PAYROLL, 0.9),
+        # La misma plantilla en otra carpeta, con otras mayúsculas, tildes y espacios
+        section("  " + VACATIONS.upper().replace("DÍAS", "DIAS"), 0.8, "copias/vacaciones.md"),
+    ]
+
+    result = compact_sections(sections, token_budget=10_000)
+
+    assert [s.score for s in result] == [0.9, 0.8]
+    assert result[1].metadata["source"] == "copias/vacaciones.md"
+
+
+def test_sections_are_trimmed_to_the_budget():
+    budget = (len(PAYROLL) + len(VACATIONS) // 2) // CHARS_PER_TOKEN
+
+    result = compact_sections([section(VACATIONS, 0.5), section(PAYROLL, 0.9)], token_budget=budget)
+
+    assert [s.truncated for s in result] == [False, True]
+    assert result[1].text.endswith(" ...") and len(result[1].text) < len(VACATIONS)
+
+
+def test_remainder_below_minimum_is_dropped():
+    budget = len(PAYROLL) // CHARS_PER_TOKEN + 10
+
+    result = compact_sections([section(VACATIONS, 0.5), section(PAYROLL, 0.9)], token_budget=budget)
+
+    assert [s.score for s in result] == [0.9]
+
+
+def test_search_returns_each_section_once(embedder):
+    store = KnowledgeBaseStore(client=QdrantClient(":memory:"), embedder=embedder, collection_name="kb")
+    store.ensure_collection()
+    for source in ("rrhh/politicas.md", "copias/politicas.md"):
+        store.upsert_chunks(chunk_document(POLICIES, build_metadata(source), chunk_size=200, chunk_overlap=50))
+
+    sections = store.search_sections("vacaciones pagadas de los empleados", limit=10, token_budget=10_000)
+
+    # Muchos fragmentos solapados de la misma sección, en dos copias del documento: una sola sección
+    assert [s.metadata["section"] for s in sections].count("Vacaciones") == 1
+    assert sections[0].metadata["section"] == "Vacaciones"
+    assert sections[0].text.startswith("# Vacaciones")
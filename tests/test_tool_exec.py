@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from langchain_core.tools import StructuredTool
+
+from scout.tool_exec import ToolExecutionConfig, ToolExecutor, parse_limits
+
+
+class SlowTool:
+    """Herramienta falsa que duerme y anota cuántas llamadas hay en curso a la vez."""
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+
+    def tool(self, name: str, server: str) -> StructuredTool:
+        async def sleep(seconds: float) -> str:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                self.running -= 1
+            return f"slept {seconds}"
+
+        return StructuredTool.from_function(
+            coroutine=sleep, name=name, description="Sleep.", metadata={"mcp_server": server},
+        )
+
+
+def run_all(calls):
+    async def main():
+        return await asyncio.gather(*(tool.ainvoke({"seconds": seconds}) for tool, seconds in calls))
+    return asyncio.run(main())
+
+
+def test_parse_limits():
+    assert parse_limits("weather=20, dataflow=120,bad") == {"weather": 20.0, "dataflow": 120.0}
+
+
+def test_timeout_returns_structured_error():
+    slow = SlowTool()
+    config = ToolExecutionConfig(timeout_seconds=5, timeouts={"weather": 0.1})
+    [tool] = ToolExecutor(config).wrap_tools([slow.tool("forecast", "weather")])
+
+    [result] = run_all([(tool, 2)])
+
+    payload = json.loads(result)
+    assert payload["status"] == "timeout"
+    assert (payload["tool"], payload["server"], payload["timeout_seconds"]) == ("forecast", "weather", 0.1)
+    assert payload["elapsed_seconds"] < 1
+    assert slow.running == 0
+
+
+def test_tool_timeout_takes_precedence_over_server():
+    config = ToolExecutionConfig(timeouts={"weather": 0.1, "forecast": 1})
+    [tool] = ToolExecutor(config).wrap_tools([SlowTool().tool("forecast", "weather")])
+
+    assert run_all([(tool, 0.3)]) == ["slept 0.3"]
+
+
+def test_server_limit_bounds_concurrent_calls():
+    slow, other = SlowTool(), SlowTool()
+    config = ToolExecutionConfig(server_concurrency=4, server_limits={"dataflow": 2})
+    query, forecast = ToolExecutor(config).wrap_tools([slow.tool("query", "dataflow"), other.tool("forecast", "weather")])
+
+    results = run_all([(query, 0.1)] * 6 + [(forecast, 0.1)] * 6)
+
+    assert results == ["slept 0.1"] * 12
+    assert slow.max_running == 2
+    assert other.max_running == 4
+
+
+def test_global_limit_bounds_all_servers():
+    slow = SlowTool()
+    config = ToolExecutionConfig(max_concurrency=3, server_concurrency=4)
+    tools = ToolExecutor(config).wrap_tools([slow.tool(f"tool_{server}", server) for server in ("a", "b")])
+
+    run_all([(tool, 0.1) for tool in tools for _ in range(4)])
+
+    assert slow.max_running == 3
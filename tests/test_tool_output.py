@@ -0,0 +1,64 @@
+import asyncio
+
+from langchain_core.messages import ToolMessage
+
+from dataflow import DataFlowSession
+from scout.tool_output import (
+    ToolOutputConfig,
+    ToolOutputStore,
+    build_read_tool,
+    compact_output,
+    parse_table,
+)
+
+
+def query_page(sales_csv, sql: str, limit: int) -> str:
+    session = DataFlowSession()
+
+    async def run():
+        await session.load_data(str(sales_csv), "sales")
+        return await session.query_data(sql, limit)
+
+    return asyncio.run(run())
+
+
+def test_parse_table_reads_dataflow_csv_page(sales_csv):
+    page = query_page(sales_csv, "SELECT * FROM sales ORDER BY units", 100)
+    assert page.startswith("Rows 1-100 of 200")
+
+    frame, header_lines = parse_table(page)
+
+    assert header_lines == 2
+    assert list(frame.columns) == ["region", "units", "price"]
+    assert len(frame) == 100
+    assert frame["units"].iloc[-1] == 99
+
+
+def test_parse_table_reads_to_string_output():
+    content = "   a    b\n0  1  2.0\n1  3  4.0\n2  5  6.0"
+
+    frame, header_lines = parse_table(content)
+
+    assert header_lines == 1
+    assert frame.shape == (3, 2)
+
+
+def test_compact_dataflow_page_keeps_headers(sales_csv):
+    page = query_page(sales_csv, "SELECT * FROM sales ORDER BY units", 100)
+    config = ToolOutputConfig(max_tokens=100, preview_rows=3)
+    store = ToolOutputStore(config.store_max_bytes)
+    message = ToolMessage(content=page, tool_call_id="call-1", name="dataflow_query_data")
+
+    compacted, ref = compact_output(message, store, config)
+
+    assert compacted.content.startswith("Table with 100 rows x 3 columns: region, units, price")
+    assert "Rows 1-100 of 200" in compacted.content
+    assert "Numeric columns:" in compacted.content
+    assert compacted.additional_kwargs["tool_output_ref"] == ref
+
+    read = build_read_tool(store, config)
+    second_page = read.invoke({"ref": ref, "offset": 10, "limit": 5})
+    lines = second_page.splitlines()
+    assert lines[0].startswith("Rows 1-100 of 200")
+    assert lines[1] == "region,units,price"
+    assert lines[2].split(",")[1] == "10"
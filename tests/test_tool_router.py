@@ -0,0 +1,83 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import StructuredTool
+
+from scout.tool_router import ToolRouter, ToolRouterConfig
+
+
+DESCRIPTIONS = {
+    "weather_forecast": "pronóstico del clima lluvia temperatura",
+    "sales_chart": "gráfico de ventas por mes",
+    "payroll_lookup": "consulta de nómina salario empleados",
+    "kb_search": "buscar documentos política vacaciones",
+    "create_project": "crear proyecto nuevo repositorio git",
+    "load_file": "cargar archivo csv datos",
+}
+
+
+def make_tool(name: str, description: str) -> StructuredTool:
+    return StructuredTool.from_function(func=lambda: "", name=name, description=description)
+
+
+def build_router(embedder, **config) -> ToolRouter:
+    tools = [make_tool(name, description) for name, description in DESCRIPTIONS.items()]
+    return ToolRouter(tools, ToolRouterConfig(**{"top_k": 2, **config}), embedder)
+
+
+def names(tools) -> list:
+    return [tool.name for tool in tools]
+
+
+def test_selects_most_similar_tools_in_original_order(embedder):
+    router = build_router(embedder)
+
+    selected = names(router.select([HumanMessage(content="pronóstico del clima y la temperatura")]))
+
+    assert len(selected) == 2
+    assert "weather_forecast" in selected
+    assert selected == [name for name in DESCRIPTIONS if name in selected]
+
+
+def test_always_includes_configured_tools(embedder):
+    router = build_router(embedder, always_include=["create_project"])
+
+    selected = names(router.select([HumanMessage(content="consulta de nómina")]))
+
+    assert "create_project" in selected and "payroll_lookup" in selected
+
+
+def test_keeps_tools_used_in_recent_turns(embedder):
+    router = build_router(embedder, sticky_turns=2)
+    call = AIMessage(content="", tool_calls=[{"name": "load_file", "args": {}, "id": "1"}])
+    messages = [
+        HumanMessage(content="cargar archivo csv"),
+        call,
+        ToolMessage(content="ok", tool_call_id="1"),
+        AIMessage(content="Listo."),
+        HumanMessage(content="pronóstico del clima"),
+    ]
+
+    assert "load_file" in names(router.select(messages))
+    assert "load_file" not in names(build_router(embedder, sticky_turns=0).select(messages))
+
+
+def test_binds_every_tool_when_inactive(embedder):
+    few = build_router(embedder, top_k=10)
+    disabled = build_router(embedder, enabled=False)
+    message = [HumanMessage(content="clima")]
+
+    assert not few.active and len(few.select(message)) == len(DESCRIPTIONS)
+    assert not disabled.active and len(disabled.select(message)) == len(DESCRIPTIONS)
+
+
+def test_caches_rankings(embedder):
+    router = build_router(embedder, cache_size=1)
+    calls = []
+    embed_query = embedder.embed_query
+    embedder.embed_query = lambda text: calls.append(text) or embed_query(text)
+
+    router.rank("clima")
+    router.rank("clima")
+    router.rank("nómina")
+    router.rank("clima")
+
+    assert calls == ["clima", "nómina", "clima"]
@@ -0,0 +1,80 @@
+import json
+from typing import Annotated, List, TypedDict
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import tool
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+
+from scout.tracing import Tracer, TracingCallbackHandler
+
+
+@tool
+def word_count(text: str) -> int:
+    """Count the words of a text."""
+    return len(text.split())
+
+
+class State(TypedDict):
+    messages: Annotated[List, add_messages]
+
+
+def build_graph():
+    llm = GenericFakeChatModel(messages=iter([AIMessage(content="una respuesta corta")]))
+
+    def scout(state: State) -> dict:
+        return {"messages": [llm.invoke(state["messages"])]}
+
+    def tools(state: State) -> dict:
+        return {"messages": [AIMessage(content=str(word_count.invoke({"text": state["messages"][-1].content})))]}
+
+    builder = StateGraph(State)
+    builder.add_node("scout", scout)
+    builder.add_node("tools", tools)
+    builder.add_edge(START, "scout")
+    builder.add_edge("scout", "tools")
+    builder.add_edge("tools", END)
+    return builder.compile()
+
+
+def end(span) -> float:
+    return span.start + span.duration_ms / 1000
+
+
+def test_span_is_written_as_jsonl(tmp_path):
+    path = tmp_path / "traces" / "spans.jsonl"
+    tracer = Tracer(path=str(path))
+
+    with tracer.span("get_tools", servers=3) as attributes:
+        attributes["tools"] = 12
+    with pytest.raises(ValueError):
+        with tracer.span("mcp:dataflow/query"):
+            raise ValueError("bad query")
+
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [line["name"] for line in lines] == ["get_tools", "mcp:dataflow/query"]
+    assert lines[0]["attributes"] == {"servers": 3, "tools": 12}
+    assert lines[1]["attributes"] == {"error": "ValueError"}
+    assert {row["name"]: row["errors"] for row in tracer.stats("mcp")} == {"get_tools": 0, "mcp:dataflow/query": 1}
+
+
+def test_graph_spans_nest_within_their_node(tmp_path):
+    tracer = Tracer(path=str(tmp_path / "spans.jsonl"))
+    graph = build_graph()
+
+    graph.invoke(
+        {"messages": [HumanMessage(content="hola")]},
+        {"callbacks": [TracingCallbackHandler(tracer)], "configurable": {"thread_id": "t1"}},
+    )
+
+    spans = {(span.kind, span.name): span for span in tracer.spans}
+    assert set(spans) == {("node", "scout"), ("node", "tools"), ("llm", "GenericFakeChatModel"), ("tool", "word_count")}
+    for inner, node in ((("llm", "GenericFakeChatModel"), "scout"), (("tool", "word_count"), "tools")):
+        outer = spans[("node", node)]
+        assert outer.start <= spans[inner].start and end(spans[inner]) <= end(outer) + 1e-3
+    assert spans[("llm", "GenericFakeChatModel")].attributes["node"] == "scout"
+    assert spans[("tool", "word_count")].attributes["output_chars"] == 1
+    assert all(span.thread_id == "t1" for span in tracer.spans)
+    assert len((tmp_path / "spans.jsonl").read_text(encoding="utf-8").splitlines()) == 4